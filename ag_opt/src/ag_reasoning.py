@@ -327,26 +327,46 @@
 
 import itertools
 import tracemalloc
-from angluin import DFA, Learner, Teacher
+from concurrent.futures import ProcessPoolExecutor
+from angluin import DFA, BudgetExhausted, Learner, ObservationTable, Teacher
 from counterexample_reuse import learn_dfa as learn_dfa_reuse
 from selective_membership_query import learn_dfa as learn_dfa_selective
 from assumption_alphabet_minimisation import learn_dfa as learn_dfa_minimised
-
-def learn_dfa(teacher, system_alphabet):
+from lsharp import learn_dfa as learn_dfa_lsharp
+from warm_start import learn_dfa as learn_dfa_warm, stale_word_filter
+from query_cache import MembershipCache, discard_shared_cache, shared_cache
+from query_inference import ClosureInference
+from equivalence_oracles import build_oracle
+from counterexample_minimisation import build_shortener
+from answer_store import AnswerStore
+from product_check import ProductExplorer
+from sharded_enumeration import ShardedEnumerator
+from weakest_assumption import SymmetricAssumptionTeacher, WeakestAssumptionTeacher, find_symmetric_violation
+
+def learn_dfa(teacher, system_alphabet, counterexample_mode="prefix"):
     # Initialises the learner and previous counterexamples
-    learner = Learner(teacher, system_alphabet)
+    learner = Learner(teacher, system_alphabet, counterexample_mode)
     previous_counterexamples = set()
     iteration = 0
 
     while True:
-        # Iteratively learns the DFA
+        # Iteratively learns the DFA - an exhausted query budget ends learning with the latest hypothesis
         iteration += 1
         dfa = learner.learn()
-        counterexample = teacher.find_counterexample(dfa)
-        if not counterexample:
+        if not learner.verified:
             return dfa, iteration, learner.table
-
-        process_counterexample(counterexample, learner.table, teacher.membership_query)
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                return dfa, iteration, learner.table
+
+            if counterexample_mode == "suffix":
+                # Prefixes added to S directly would break the consistency guaranteed by suffix mode
+                learner.handle_counterexample(counterexample)
+            else:
+                process_counterexample(counterexample, learner.table, teacher.membership_query)
+        except BudgetExhausted:
+            return learner.unverified_hypothesis(), iteration, learner.table
 
 def process_counterexample(counterexample, table, membership_query):
     # Processes counterexamples by updating the observation table
@@ -358,32 +378,187 @@ def process_counterexample(counterexample, table, membership_query):
             if (prefix, e) not in table.T:
                 table.T[(prefix, e)] = membership_query(prefix + e)
 
+def learn_with_method(teacher, system_alphabet, optimisation_method="reuse", selective_threshold=0.5,
+                      counterexample_mode="prefix"):
+    # Learns a single component with the selected optimisation method
+    if optimisation_method == "reuse":
+        return learn_dfa_reuse(teacher, system_alphabet, counterexample_mode=counterexample_mode)
+    elif optimisation_method == "selective":
+        return learn_dfa_selective(teacher, system_alphabet, selective_threshold)
+    elif optimisation_method == "minimised":
+        return learn_dfa_minimised(teacher, system_alphabet)
+    elif optimisation_method == "lsharp":
+        return learn_dfa_lsharp(teacher, system_alphabet)
+    return learn_dfa(teacher, system_alphabet, counterexample_mode)
+
+def build_teacher(component, search_depth, budget=None, cache=None, closure=None, oracle_settings=None,
+                  shortening=None, answer_store=None):
+    # Teacher construction shared by sequential learning and worker processes
+    inference = ClosureInference(**closure) if closure else None
+    return Teacher(target_dfa=component, depth=search_depth, budget=budget, cache=cache, inference=inference,
+                   oracle=build_oracle(oracle_settings), shortener=build_shortener(shortening),
+                   store=answer_store.component(component) if answer_store is not None else None)
+
+def learn_component_job(job):
+    """
+    Worker process entry point - learns one component and returns only plain data
+
+    The hypothesis travels back in compact form together with the teacher counters, so no live
+    Teacher, Learner or table objects cross the process boundary. A cache arrives as a snapshot of its
+    answers and only the answers added by this worker travel back. A persistent answer store is opened
+    again from its settings and written by the worker itself
+    """
+    index, compact_component, system_alphabet, search_depth, optimisation_method, selective_threshold, \
+        counterexample_mode, budget, cache_settings, closure, oracle_settings, shortening, store_settings = job
+    cache = None
+    if cache_settings is not None:
+        cache = MembershipCache(cache_settings['max_size'], cache_settings['policy'])
+        for word, answer in cache_settings['answers'].items():
+            cache.put(word, answer)
+    answer_store = AnswerStore(**store_settings) if store_settings is not None else None
+    teacher = build_teacher(DFA.from_compact(compact_component), search_depth, budget, cache, closure, oracle_settings,
+                            shortening, answer_store)
+    try:
+        assumption_dfa, iterations, _ = learn_with_method(teacher, system_alphabet, optimisation_method,
+                                                          selective_threshold, counterexample_mode)
+    finally:
+        if answer_store is not None:
+            answer_store.close()
+        if teacher.oracle is not None:
+            teacher.oracle.close()
+    counters = {
+        'iterations': iterations,
+        'membership_queries': teacher.membership_query_count,
+        'membership_symbols': teacher.membership_symbol_count,
+        'equivalence_queries': teacher.equivalence_query_count,
+        'cache_hits': cache.hits if cache is not None else 0,
+        'new_answers': {word: answer for word, answer in cache.answers.items()
+                        if word not in cache_settings['answers']} if cache is not None else {},
+        'inferred_queries': teacher.inference.saved_queries if teacher.inference is not None else 0,
+        'symbols_saved': teacher.shortener.symbols_saved if teacher.shortener is not None else 0,
+        'store_hits': teacher.store.hits if teacher.store is not None else 0,
+        'guarantee': teacher.oracle.guarantee() if teacher.oracle is not None else None,
+        'verified': not teacher.budget_exhausted(),
+        'budget': budget # The worker's share, charged back to the shared budget by the parent
+    }
+    return index, assumption_dfa.to_compact(), counters
+
+def learn_symmetric_assumption_job(job):
+    """
+    Learns the symmetric-rule assumption of one component - run in a worker process or in turn
+
+    Components and property arrive in compact form and the assumption travels back in compact form with the
+    teacher counters, as for learn_component_job
+    """
+    index, compact_components, compact_property, optimisation_method, selective_threshold, counterexample_mode, \
+        budget = job
+    components = [DFA.from_compact(compact) for compact in compact_components]
+    teacher = SymmetricAssumptionTeacher(components[index], components[:index] + components[index + 1:],
+                                         DFA.from_compact(compact_property), budget=budget)
+    assumption_dfa, iterations, _ = learn_with_method(teacher, teacher.interface, optimisation_method,
+                                                      selective_threshold, counterexample_mode)
+    counters = {
+        'iterations': iterations,
+        'membership_queries': teacher.membership_query_count,
+        'membership_symbols': teacher.membership_symbol_count,
+        'equivalence_queries': teacher.equivalence_query_count,
+        'product_states': teacher.product_states,
+        'verified': not teacher.budget_exhausted(),
+        'budget': budget
+    }
+    return index, assumption_dfa.to_compact(), counters
+
 class AssumeGuarantee:
     """
     Implements Assume-Guarantee reasoning framework to verify system properties.
+
+    Assumption rules:
+    - component: one assumption per component, learned as the component's own language
+    - weakest: the rule <A> M1 <P>, <true> M2 <A> with M1 the first component and M2 the others in parallel -
+      a single assumption is learned over the interface alphabet by a WeakestAssumptionTeacher, and learning
+      stops as soon as the property is proven or refuted (property_holds, violation)
+    - symmetric: the n-component rule <A_i> M_i <P> for every i plus L(coA_1 || ... || coA_n) within L(P) -
+      one assumption per component, each depending only on its component and the property, so they are learned
+      independently (in parallel_workers processes when set) and the cost grows with the sum of their sizes.
+      The last premise is checked on the product of the assumptions and the property
+
+    Property checks compare the composition with the property (and assumptions with their components) either
+    bounded, on every word up to max_length, or exact, by an on-the-fly search of their product for a word they
+    disagree on (see ProductExplorer) - search_strategy bfs finds the shortest such word, dfs may find one sooner.
+    With enumeration_workers, bounded checks are sharded over that many processes (see ShardedEnumerator)
     """
 
-    def __init__(self, system_components, system_alphabet, property_to_verify, search_depth, max_length):
+    ASSUMPTION_RULES = ("component", "weakest", "symmetric")
+    PROPERTY_CHECKS = ("bounded", "exact")
+
+    def __init__(self, system_components, system_alphabet, property_to_verify, search_depth, max_length,
+                 counterexample_mode="prefix", warm_start=False, parallel_workers=0, budget=None,
+                 use_query_cache=False, cache_size=None, cache_policy="lru", component_closures=None,
+                 oracle_settings=None, shortening=None, answer_store=None, assumption_rule="component",
+                 property_check="bounded", search_strategy="bfs", enumeration_workers=0, shard_prefix_length=1):
         # Initialise system components, alphabet, property to verify, search depth, and max length
+        if assumption_rule not in self.ASSUMPTION_RULES:
+            raise ValueError(f"Unknown assumption rule: {assumption_rule}")
+        if property_check not in self.PROPERTY_CHECKS:
+            raise ValueError(f"Unknown property check: {property_check}")
+        if search_strategy not in ProductExplorer.STRATEGIES:
+            raise ValueError(f"Unknown search strategy: {search_strategy}")
         self.system_components = system_components
         self.system_alphabet = system_alphabet
         self.property_to_verify = property_to_verify
         self.search_depth = search_depth
         self.max_length = max_length
+        self.counterexample_mode = counterexample_mode # Learner counterexample handling: prefix or suffix
+        self.warm_start = warm_start # Relearn from the previous run of each component when available
+        self.previous_runs = {} # Component index to (component, assumption DFA, table) of its last learning run
+        self.parallel_workers = parallel_workers # Process pool size for per-component learning, 0 to learn in turn
+        self.budget = budget # QueryBudget shared by every teacher (split into equal shares across worker processes)
+        self.use_query_cache = use_query_cache # Answer repeated membership queries from a per-component cache
+        self.cache_size = cache_size # Answers kept per component cache, None for no bound
+        self.cache_policy = cache_policy # Cache eviction policy: lru or fifo
+        # Component index to its declared closure properties (ClosureInference arguments)
+        self.component_closures = component_closures or {}
+        self.oracle_settings = oracle_settings # Equivalence oracle settings (see build_oracle), None for exhaustive
+        self.shortening = shortening # Counterexample shortening settings (see build_shortener), None to disable
+        self.answer_store = answer_store # AnswerStore persisting answers across runs, None to keep them in memory
+        self.assumption_rule = assumption_rule
+        self.property_holds = None # Weakest rule - whether the property was proven, None while undecided
+        self.violation = None # Weakest rule - shortest system trace violating the property
+        self.product_states = 0 # Product states searched by premise checks and exact property checks
+        self.property_check = property_check
+        self.search_strategy = search_strategy # Exact checks - bfs or dfs product exploration
+        self.disagreement = None # Word the last failed exact check found
+        self.peak_visited = 0 # Exact checks - largest visited set of a product exploration
+        self.enumeration_workers = enumeration_workers # Processes per bounded check, 0 to enumerate in turn
+        self.shard_prefix_length = shard_prefix_length # Symbols fixing the shard of a word
         self.assumptions = []
+        self.unverified_assumptions = [] # Indices of components whose assumption was cut short by the budget
+        self.assumption_guarantees = {} # Component index to the (epsilon, delta) of a PAC-checked assumption
 
         self.total_iterations = 0
         self.total_membership_queries = 0
+        self.total_membership_symbols = 0
         self.total_equivalence_queries = 0
+        self.total_cache_hits = 0
+        self.total_inferred_queries = 0
+        self.total_symbols_saved = 0 # Counterexample symbols removed before reaching a learner
+        self.total_store_hits = 0 # Membership answers read from the persistent answer store
         self.hypothesis_dfa_size = 0
         self.counterexamples = []
 
-    def create_teacher_for(self, target_component):
+    def create_teacher_for(self, target_component, index=None):
         # Creates a teacher for a given target component
-        return Teacher(target_dfa=target_component, depth=self.search_depth)
+        # Teachers of the same component share one cache, across learning methods and AssumeGuarantee instances
+        cache = shared_cache(target_component, self.cache_size, self.cache_policy) if self.use_query_cache else None
+        return build_teacher(target_component, self.search_depth, self.budget, cache, self.component_closures.get(index),
+                             self.oracle_settings, self.shortening, self.answer_store)
 
     def verify_individual_assumption(self, assumption_dfa, target_component):
         # Verifies if an individual assumption DFA is correct for a given component
+        if self.property_check == "exact":
+            return self.check_exactly([assumption_dfa], target_component, "Assumption verification")
+        if self.enumeration_workers:
+            return self.check_sharded([assumption_dfa], target_component, "Assumption verification")
         for input_sequence in self.generate_input_sequences(self.system_alphabet, self.max_length):
             target_accepts = target_component.accepts(input_sequence)
             assumption_accepts = assumption_dfa.accepts(input_sequence)
@@ -399,8 +574,38 @@ class AssumeGuarantee:
             for seq in itertools.product(alphabet, repeat=length):
                 yield ''.join(seq)
 
+    def check_exactly(self, components, reference, check):
+        # Exact counterpart of the bounded loops - the product of every component and the reference has no
+        # reachable state where they disagree
+        explorer = ProductExplorer(components, reference, self.system_alphabet, strategy=self.search_strategy,
+                                   check="disagreement")
+        self.disagreement = explorer.run()
+        self.product_states += explorer.states_visited
+        self.peak_visited = max(self.peak_visited, explorer.peak_visited)
+        if self.disagreement is not None:
+            print(f"{check} failed for input {self.disagreement!r} ({explorer.states_visited} product states visited)")
+            return False
+        print(f"{check} succeeded for every input ({explorer.states_visited} product states visited)")
+        return True
+
+    def check_sharded(self, components, reference, check):
+        # Bounded loops over enumeration_workers processes - the same words, with the shortest, lexicographically
+        # smallest failing word reported whichever shard finishes first
+        with ShardedEnumerator(list(components) + [reference], self.system_alphabet, self.enumeration_workers,
+                               self.shard_prefix_length) as enumerator:
+            self.disagreement = enumerator.find(self.max_length)
+        if self.disagreement is not None:
+            print(f"{check} failed for input {self.disagreement!r}")
+            return False
+        print(f"{check} succeeded for all input sequences up to length {self.max_length}.")
+        return True
+
     def verify_system_property(self):
         # Verifies if the overall system property is satisfied
+        if self.property_check == "exact":
+            return self.check_exactly(self.system_components, self.property_to_verify, "Property verification")
+        if self.enumeration_workers:
+            return self.check_sharded(self.system_components, self.property_to_verify, "Property verification")
         for input_sequence in self.generate_input_sequences(self.system_alphabet, self.max_length):
             expected_behaviour = all(component.accepts(input_sequence) for component in self.system_components)
             actual_property_response = self.property_to_verify.accepts(input_sequence)
@@ -412,37 +617,258 @@ class AssumeGuarantee:
     def learn_assumptions(self, optimisation_method="reuse", selective_threshold=0.5):
         # Learns assumptions for the system components
         print("Learning assumptions...")
-        for component in self.system_components:
-            teacher = self.create_teacher_for(component)
-            if optimisation_method == "reuse":
-                assumption_dfa, iterations, table = learn_dfa_reuse(teacher, self.system_alphabet)
-            elif optimisation_method == "selective":
-                assumption_dfa, iterations, table = learn_dfa_selective(teacher, self.system_alphabet, selective_threshold)
-            elif optimisation_method == "minimised":
-                assumption_dfa, iterations, table = learn_dfa_minimised(teacher, self.system_alphabet)
+        if self.assumption_rule == "weakest":
+            return self.learn_weakest_assumption(optimisation_method, selective_threshold)
+        if self.assumption_rule == "symmetric":
+            return self.learn_symmetric_assumptions(optimisation_method, selective_threshold)
+        warm_relearning = self.warm_start and any(index in self.previous_runs
+                                                  for index in range(len(self.system_components)))
+        if self.parallel_workers and len(self.system_components) > 1:
+            if not warm_relearning:
+                return self.learn_assumptions_parallel(optimisation_method, selective_threshold)
+            # Previous tables live in this process, so warm relearning stays sequential
+            print("Warm start relearning runs sequentially - parallel_workers is ignored for this run")
+
+        for index, component in enumerate(self.system_components):
+            teacher = self.create_teacher_for(component, index)
+            cache_hits = teacher.cache.hits if teacher.cache is not None else 0
+            if self.warm_start and index in self.previous_runs:
+                assumption_dfa, iterations, table = self.relearn_component(index, teacher)
             else:
-                assumption_dfa, iterations, table = learn_dfa(teacher, self.system_alphabet)
+                assumption_dfa, iterations, table = learn_with_method(teacher, self.system_alphabet, optimisation_method,
+                                                                      selective_threshold, self.counterexample_mode)
 
             self.total_iterations += iterations
             self.total_membership_queries += teacher.membership_query_count
+            self.total_membership_symbols += teacher.membership_symbol_count
             self.total_equivalence_queries += teacher.equivalence_query_count
+            if teacher.cache is not None:
+                self.total_cache_hits += teacher.cache.hits - cache_hits
+            if teacher.inference is not None:
+                self.total_inferred_queries += teacher.inference.saved_queries
+            if teacher.shortener is not None:
+                self.total_symbols_saved += teacher.shortener.symbols_saved
+            if teacher.store is not None:
+                self.total_store_hits += teacher.store.hits
+                self.answer_store.flush()
+            if teacher.oracle is not None:
+                teacher.oracle.close()
             self.hypothesis_dfa_size = len(assumption_dfa.states)
             self.counterexamples.append(teacher.equivalence_query_count)
+            self.record_guarantee(index, teacher.oracle.guarantee() if teacher.oracle is not None else None)
 
-            if not self.verify_individual_assumption(assumption_dfa, component):
+            if teacher.budget_exhausted():
+                # Best hypothesis so far is kept as a usable, but unverified, assumption
+                print(f"Query budget exhausted - assumption for component {component} is unverified")
+            elif not self.verify_individual_assumption(assumption_dfa, component):
                 print(f"Verification failed for component {component}")
                 return False
+            else:
+                print(f"Assumption for component {component} learned successfully: {assumption_dfa}")
+                print(f"Assumption DFA transitions: {assumption_dfa.transition_function}")
+
+            # Only observation tables can seed a warm start cell by cell - other artefacts fall back to the hypothesis
+            self.previous_runs[index] = (component, assumption_dfa,
+                                         table if isinstance(table, ObservationTable) else None)
+            self.store_assumption(index, assumption_dfa, verified=not teacher.budget_exhausted())
+        return True
 
-            print(f"Assumption for component {component} learned successfully: {assumption_dfa}")
-            print(f"Assumption DFA transitions: {assumption_dfa.transition_function}")
+    def learn_weakest_assumption(self, optimisation_method="reuse", selective_threshold=0.5):
+        # Learns the interface assumption of the first component against the others - a spent budget leaves the
+        # property undecided and the assumption unverified
+        teacher = WeakestAssumptionTeacher(self.system_components[0], self.system_components[1:],
+                                           self.property_to_verify, budget=self.budget)
+        assumption_dfa, iterations, _ = learn_with_method(teacher, teacher.interface, optimisation_method,
+                                                          selective_threshold, self.counterexample_mode)
+        self.total_iterations += iterations
+        self.total_membership_queries += teacher.membership_query_count
+        self.total_membership_symbols += teacher.membership_symbol_count
+        self.total_equivalence_queries += teacher.equivalence_query_count
+        self.hypothesis_dfa_size = len(assumption_dfa.states)
+        self.counterexamples.append(teacher.equivalence_query_count)
+        self.product_states += teacher.product_states
+        self.property_holds = None if teacher.outcome is None else teacher.outcome == "holds"
+        self.violation = teacher.violation
+        if teacher.outcome is None:
+            print("Query budget exhausted - the property is undecided")
+        elif self.property_holds:
+            print(f"Property proven with a {len(assumption_dfa.states)}-state assumption over {sorted(teacher.interface)}")
+        else:
+            print(f"Property violated by trace {self.violation!r}")
+        self.store_assumption(0, assumption_dfa, verified=teacher.outcome is not None)
+        return True
 
+    def learn_symmetric_assumptions(self, optimisation_method="reuse", selective_threshold=0.5):
+        # Learns one assumption per component, then checks the last premise of the symmetric rule - each job gets
+        # an equal share of the budget, and a spent share leaves the property undecided
+        shares = self.budget.split(len(self.system_components)) if self.budget is not None \
+            else [None] * len(self.system_components)
+        compact_components = [component.to_compact() for component in self.system_components]
+        jobs = [(index, compact_components, self.property_to_verify.to_compact(), optimisation_method,
+                 selective_threshold, self.counterexample_mode, shares[index])
+                for index in range(len(self.system_components))]
+        if self.parallel_workers and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.parallel_workers) as executor:
+                results = list(executor.map(learn_symmetric_assumption_job, jobs))
+        else:
+            results = [learn_symmetric_assumption_job(job) for job in jobs]
+
+        verified = True
+        for index, compact_assumption, counters in results:
+            assumption_dfa = DFA.from_compact(compact_assumption)
+            self.total_iterations += counters['iterations']
+            self.total_membership_queries += counters['membership_queries']
+            self.total_membership_symbols += counters['membership_symbols']
+            self.total_equivalence_queries += counters['equivalence_queries']
+            self.product_states += counters['product_states']
+            self.counterexamples.append(counters['equivalence_queries'])
+            if self.budget is not None:
+                self.budget.absorb(counters['budget'])
+            verified = verified and counters['verified']
+            self.store_assumption(index, assumption_dfa, verified=counters['verified'])
+        self.hypothesis_dfa_size = sum(len(assumption.states) for assumption in self.assumptions)
+
+        self.property_holds, self.violation = None, None
+        if not verified:
+            print("Query budget exhausted - the property is undecided")
+            return True
+        teachers = [SymmetricAssumptionTeacher(component, self.system_components[:index] +
+                                               self.system_components[index + 1:], self.property_to_verify)
+                    for index, component in enumerate(self.system_components)]
+        self.violation, explored = find_symmetric_violation(teachers, self.assumptions, self.property_to_verify)
+        self.product_states += explored
+        self.property_holds = self.violation is None
+        if self.property_holds:
+            print(f"Property proven with assumptions of {[len(a.states) for a in self.assumptions]} states")
+        else:
+            print(f"Property violated by trace {self.violation!r}")
+        return True
+
+    def store_assumption(self, index, assumption_dfa, verified=True):
+        # Assumptions are kept one per component index - relearning replaces the previous assumption
+        if index < len(self.assumptions):
+            self.assumptions[index] = assumption_dfa
+        else:
             self.assumptions.append(assumption_dfa)
+        if verified and index in self.unverified_assumptions:
+            self.unverified_assumptions.remove(index)
+        elif not verified and index not in self.unverified_assumptions:
+            self.unverified_assumptions.append(index)
+
+    def record_guarantee(self, index, guarantee):
+        # Keeps the PAC bound of a component's assumption, replacing the bound of an earlier learning run
+        self.assumption_guarantees.pop(index, None)
+        if guarantee is not None:
+            epsilon, delta = guarantee
+            self.assumption_guarantees[index] = guarantee
+            print(f"Assumption for component {index} errs on at most {epsilon:.2%} of sampled words "
+                  f"with confidence {1 - delta:.2%}")
+
+    def confidence(self):
+        # (epsilon, confidence) holding for every assumption at once - each errs on at most epsilon of its word
+        # distribution, all of them with probability at least 1 - sum of deltas (union bound). None unless every
+        # assumption passed a PAC oracle
+        if not self.assumptions or len(self.assumption_guarantees) < len(self.assumptions):
+            return None
+        epsilon = max(epsilon for epsilon, _ in self.assumption_guarantees.values())
+        return epsilon, max(0.0, 1 - sum(delta for _, delta in self.assumption_guarantees.values()))
+
+    def learn_assumptions_parallel(self, optimisation_method="reuse", selective_threshold=0.5):
+        # Learns every component in its own worker process, largest components scheduled first
+        # A budget cannot be shared across processes, so every component gets an equal share of what is left -
+        # a share left unused by one component is not passed on to the others
+        shares = self.budget.split(len(self.system_components)) if self.budget is not None \
+            else [None] * len(self.system_components)
+        # Workers open the answer store themselves, so everything buffered here has to be on disk first
+        store_settings = None
+        if self.answer_store is not None:
+            self.answer_store.flush()
+            store_settings = {'path': self.answer_store.path, 'max_entries': self.answer_store.max_entries,
+                              'batch_size': self.answer_store.batch_size}
+        jobs = [(index, component.to_compact(), set(self.system_alphabet), self.search_depth, optimisation_method,
+                 selective_threshold, self.counterexample_mode, shares[index], self.cache_snapshot(component),
+                 self.component_closures.get(index), self.oracle_settings, self.shortening, store_settings)
+                for index, component in enumerate(self.system_components)]
+        # L* cost grows with states x transitions, so the largest components start first
+        jobs.sort(key=lambda job: len(job[1]['states']) * len(job[1]['transitions']), reverse=True)
+
+        with ProcessPoolExecutor(max_workers=self.parallel_workers) as executor:
+            results = sorted(executor.map(learn_component_job, jobs), key=lambda result: result[0])
+
+        for index, compact_assumption, counters in results:
+            component = self.system_components[index]
+            assumption_dfa = DFA.from_compact(compact_assumption)
+            self.total_iterations += counters['iterations']
+            self.total_membership_queries += counters['membership_queries']
+            self.total_membership_symbols += counters['membership_symbols']
+            self.total_equivalence_queries += counters['equivalence_queries']
+            self.hypothesis_dfa_size = len(assumption_dfa.states)
+            self.counterexamples.append(counters['equivalence_queries'])
+            self.total_cache_hits += counters['cache_hits']
+            self.total_inferred_queries += counters['inferred_queries']
+            self.total_symbols_saved += counters['symbols_saved']
+            self.total_store_hits += counters['store_hits']
+            self.record_guarantee(index, counters['guarantee'])
+            if self.budget is not None:
+                self.budget.absorb(counters['budget'])
+            if self.use_query_cache:
+                cache = shared_cache(component, self.cache_size, self.cache_policy)
+                for word, answer in counters['new_answers'].items():
+                    cache.put(word, answer)
+
+            if not counters['verified']:
+                print(f"Query budget exhausted - assumption for component {component} is unverified")
+            elif not self.verify_individual_assumption(assumption_dfa, component):
+                print(f"Verification failed for component {component}")
+                return False
+            else:
+                print(f"Assumption for component {component} learned successfully: {assumption_dfa}")
+            self.previous_runs[index] = (component, assumption_dfa, None)
+            self.store_assumption(index, assumption_dfa, verified=counters['verified'])
         return True
 
+    def cache_snapshot(self, component):
+        # Settings and answers of a component's shared cache, in a form that can be sent to a worker process
+        if not self.use_query_cache:
+            return None
+        cache = shared_cache(component, self.cache_size, self.cache_policy)
+        return {'max_size': cache.max_size, 'policy': cache.policy, 'answers': dict(cache.answers)}
+
+    def extend_alphabet(self, new_symbols, optimisation_method="reuse", selective_threshold=0.5):
+        # Grows the system alphabet at runtime - components (already updated with the new events) are relearned
+        # from their previous runs, so only cells involving the new symbols are queried
+        self.system_alphabet = self.system_alphabet | set(new_symbols)
+        warm_start, self.warm_start = self.warm_start, True
+        try:
+            return self.learn_assumptions(optimisation_method, selective_threshold)
+        finally:
+            self.warm_start = warm_start
+
+    def update_component(self, index, new_component):
+        # Replaces a system component - with warm start enabled, the next learning run starts from the previous one
+        # The cached answers of the replaced version can never be hit again, so its cache is released
+        if self.use_query_cache:
+            discard_shared_cache(self.system_components[index])
+        self.system_components[index] = new_component
+
+    def relearn_component(self, index, teacher):
+        # Warm-started learning: reuse previous answers unaffected by the change, else the previous hypothesis
+        # Warm relearning always uses L* - the optimisation method only decides how a component is first learned
+        previous_component, previous_hypothesis, previous_table = self.previous_runs[index]
+        component = self.system_components[index]
+        if previous_table is not None:
+            return learn_dfa_warm(teacher, self.system_alphabet, previous_table=previous_table,
+                                  is_stale=stale_word_filter(previous_component, component),
+                                  counterexample_mode=self.counterexample_mode)
+        return learn_dfa_warm(teacher, self.system_alphabet, previous_hypothesis=previous_hypothesis,
+                              counterexample_mode=self.counterexample_mode)
+
     def verify(self, optimisation_method="reuse", selective_threshold=0.5):
         # Verifies the system using the learned assumptions
         if not self.learn_assumptions(optimisation_method, selective_threshold):
             return False
+        if self.assumption_rule != "component":
+            return bool(self.property_holds)
 
         if self.verify_system_property():
             print("System satisfies property under learnt assumptions")
@@ -453,7 +879,13 @@ class AssumeGuarantee:
 
     def verify_with_combined_assumptions(self, optimisation_method="reuse", selective_threshold=0.5):
         # Verifies the system with combined assumptions
-        if self.verify(optimisation_method, selective_threshold):
+        if self.assumption_rule != "component":
+            # The interface assumptions already decide the property - there is nothing to combine
+            if self.verify(optimisation_method, selective_threshold):
+                print("System satisfies property under the learnt interface assumptions")
+            else:
+                print("System does not satisfy property under the learnt interface assumptions")
+        elif self.verify(optimisation_method, selective_threshold):
             combined_assumption = self.combine_assumptions()
             if combined_assumption and self.verify_system_property_with_combined_assumptions(combined_assumption):
                 print("System satisfies property under combined learnt assumptions")
@@ -472,6 +904,12 @@ class AssumeGuarantee:
 
     def verify_system_property_with_combined_assumptions(self, combined_assumption):
         # Verifies the system property using the combined assumptions DFA
+        if self.property_check == "exact":
+            return self.check_exactly([combined_assumption], self.property_to_verify,
+                                      "Combined assumption verification")
+        if self.enumeration_workers:
+            return self.check_sharded([combined_assumption], self.property_to_verify,
+                                      "Combined assumption verification")
         for input_sequence in self.generate_input_sequences(self.system_alphabet, self.max_length):
             combined_accepts = combined_assumption.accepts(input_sequence)
             property_accepts = self.property_to_verify.accepts(input_sequence)
@@ -1,9 +1,10 @@
 
 # IMPLEMENTATION OF ANGLUIN'S L* ALGORITHM
 
-import itertools
 import os
+import time
 from dfa import DFA
+from equivalence_oracles import ExhaustiveOracle
 
 import hydra
 import yaml
@@ -25,46 +26,114 @@ class ObservationTable:
 
     T is hence iteratively expanded and refined based on responses from Learner until it satisfies the properties
     of being both closed and consistent
+
+    In lazy mode fill_table only records the membership oracle - a cell is queried the first time a closedness,
+    consistency or hypothesis construction decision reads it. Rows are compared column by column, stopping at
+    the first difference, and S + a rows only read the columns on which the remaining candidate rows disagree
     """
 
-    def __init__(self, alphabet):
+    def __init__(self, alphabet, lazy=False):
         self.S = ['']  # Initial set of prefixes
         self.E = ['']  # Initial set of suffixes
         self.T = {}    # Observation table
         self.alphabet = alphabet # Input alphabet for DFA in process
+        self.lazy = lazy # Query cells on demand rather than filling the whole table
+        self.membership_query = None # Oracle used to answer cells on demand in lazy mode
+        self.cell_query = None # Optional (prefix, suffix) oracle, used instead of membership_query(prefix + suffix)
+        self.batch_query = None # Optional oracle answering every missing cell of a fill in one concurrent batch
 
     def fill_table(self, membership_query):
         # Expand the observation table based on S, E, and alphabet
         # Updated to avoid redundant queries
-        for s in self.S + [s + a for s in self.S for a in self.alphabet]:
-            for e in self.E:
-                if (s, e) not in self.T:
-                    self.T[(s, e)] = membership_query(s + e)
+        if self.lazy:
+            self.membership_query = membership_query
+        elif self.batch_query is not None:
+            cells = list(dict.fromkeys((s, e) for s in self.S + [s + a for s in self.S for a in self.alphabet]
+                                       for e in self.E if (s, e) not in self.T))
+
+            def record(i, answer):
+                self.T[cells[i]] = answer
+
+            self.batch_query([s + e for s, e in cells], record)
+        else:
+            for s in self.S + [s + a for s in self.S for a in self.alphabet]:
+                for e in self.E:
+                    if (s, e) not in self.T:
+                        self.T[(s, e)] = self.query_cell(s, e, membership_query)
         self.display_table()
 
+    def query_cell(self, s, e, membership_query):
+        # Cells go to the cell oracle when one is set, so a white-box teacher can reuse the run of prefix s
+        if self.cell_query is not None:
+            return self.cell_query(s, e)
+        return membership_query(s + e)
+
     def is_closed(self):
         # Check if the table is closed
         # Updated to consider extensions not in S
+        representatives = self.representatives()
         for s in self.S:
             for a in self.alphabet:
                 extended_s = s + a
-                if not any(self.get_row(extended_s) == self.get_row(s2) for s2 in self.S):
+                if self.classify_row(extended_s, representatives) is None:
                     return False, extended_s
         return True, None
 
     def is_consistent(self):
         # Check if the table is consistent
+        # Returns the distinguishing suffix a + e, as a alone may already be in E
         for s1 in self.S:
             for s2 in self.S:
-                if s1 != s2 and self.get_row(s1) == self.get_row(s2):
+                if s1 != s2 and self.rows_equal(s1, s2):
                     for a in self.alphabet:
-                        if self.get_row(s1 + a) != self.get_row(s2 + a):
-                            return False, s1, s2, a
+                        for e in self.E:
+                            if self.get_value(s1 + a, e) != self.get_value(s2 + a, e):
+                                return False, s1, s2, a + e
         return True, None, None, None
 
+    def get_value(self, s, e):
+        # Single cell of the observation table - queried on first use in lazy mode
+        if (s, e) not in self.T:
+            if not self.lazy or self.membership_query is None:
+                return False
+            self.T[(s, e)] = self.query_cell(s, e, self.membership_query)
+        return self.T[(s, e)]
+
     def get_row(self, s):
         # Get row from observation table
-        return tuple(self.T.get((s, e), False) for e in self.E)
+        return tuple(self.get_value(s, e) for e in self.E)
+
+    def rows_equal(self, s1, s2):
+        # Compare two rows column by column - no further cells are read after the first difference
+        return all(self.get_value(s1, e) == self.get_value(s2, e) for e in self.E)
+
+    def find_equal_row(self, s, candidates):
+        # First candidate prefix whose row equals the row of s, or None
+        for candidate in candidates:
+            if self.rows_equal(s, candidate):
+                return candidate
+        return None
+
+    def representatives(self):
+        # One prefix of S per distinct row, in order of S
+        representatives = []
+        for s in self.S:
+            if self.find_equal_row(s, representatives) is None:
+                representatives.append(s)
+        return representatives
+
+    def classify_row(self, s, representatives):
+        # Representative whose row matches the row of s, or None
+        # In lazy mode a column of s is only queried when the remaining candidates disagree on it - answers that are
+        # already known are always checked, other mismatches surface as counterexamples instead
+        if not self.lazy:
+            return self.find_equal_row(s, representatives)
+        candidates = list(representatives)
+        for e in self.E:
+            if (s, e) in self.T or (len(candidates) > 1 and len({self.get_value(c, e) for c in candidates}) > 1):
+                value = self.get_value(s, e)
+                candidates = [c for c in candidates if self.get_value(c, e) == value]
+        return candidates[0] if candidates else None
 
     def add_to_S(self, s):
         # Add prefix to S
@@ -76,6 +145,15 @@ class ObservationTable:
         if e not in self.E:
             self.E.append(e)
 
+    def add_symbols(self, symbols):
+        # Grow the input alphabet - existing answers are kept and fill_table only queries the new s + a cells
+        new_symbols = [a for a in symbols if a not in self.alphabet]
+        if isinstance(self.alphabet, set):
+            self.alphabet = self.alphabet | set(new_symbols)
+        else:
+            self.alphabet = list(self.alphabet) + new_symbols
+        return new_symbols
+
     def display_table(self):
         # Check current state of observation table
         print("After expansion of observation table:")
@@ -84,57 +162,254 @@ class ObservationTable:
         print("T:", [(k, self.T[k]) for k in sorted(self.T.keys(), key=lambda x: (x[0], x[1]))])
 
 
+# QUERY BUDGET CLASS DEFINITION
+
+class BudgetExhausted(Exception):
+    """
+    Raised by a Teacher once its query budget is spent - learners catch it and return their best hypothesis
+    """
+
+
+class QueryBudget:
+    """
+    Caps the cost of learning by membership queries, membership query symbols and wall time
+
+    Every limit is optional. A single budget may be shared by several teachers, in which case the caps apply to
+    their combined queries. Teachers in other processes cannot share it - split() hands out shares of what is
+    left and absorb() charges their use back. The deadline starts counting when the budget is created
+    """
+
+    def __init__(self, max_queries=None, max_symbols=None, max_seconds=None):
+        self.max_queries = max_queries # Membership queries allowed in total
+        self.max_symbols = max_symbols # Symbols over all membership queries allowed in total
+        self.deadline = None if max_seconds is None else time.time() + max_seconds # Absolute wall time limit
+        self.queries = 0
+        self.symbols = 0
+        self.exhausted = False # Set once any limit has been hit
+
+    def charge(self, string):
+        # Account for one membership query - raises instead when it would exceed a limit
+        if self.max_queries is not None and self.queries + 1 > self.max_queries:
+            self.stop("membership query limit reached")
+        if self.max_symbols is not None and self.symbols + len(string) > self.max_symbols:
+            self.stop("membership symbol limit reached")
+        self.check_deadline()
+        self.queries += 1
+        self.symbols += len(string)
+
+    def split(self, parts):
+        # Independent budgets that together stay within what is left of this one - all share its deadline
+        shares = []
+        for i in range(parts):
+            share = QueryBudget()
+            share.deadline = self.deadline
+            if self.max_queries is not None:
+                remaining = max(self.max_queries - self.queries, 0)
+                share.max_queries = remaining // parts + (1 if i < remaining % parts else 0)
+            if self.max_symbols is not None:
+                remaining = max(self.max_symbols - self.symbols, 0)
+                share.max_symbols = remaining // parts + (1 if i < remaining % parts else 0)
+            shares.append(share)
+        return shares
+
+    def absorb(self, share):
+        # Charge the use of a share handed out by split() back to this budget
+        self.queries += share.queries
+        self.symbols += share.symbols
+        self.exhausted = self.exhausted or share.exhausted
+
+    def check_deadline(self):
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.stop("deadline passed")
+
+    def stop(self, reason):
+        self.exhausted = True
+        raise BudgetExhausted(reason)
+
+
 # TEACHER / ORACLE CLASS DEFINITION
 
 class Teacher:
     """
     Performs membership queries to determine if strings belong to the language of the specified target DFA.
     Performs equivalence queries to check if the hypothesis DFA is equivalent to the specified target DFA.
+
+    With a QueryBudget, queries raise BudgetExhausted once the budget is spent - equivalence searches only
+    check the deadline, as they do not query the target through membership_query
+
+    With a MembershipCache, repeated words are answered from the cache - only the words that reach the target
+    count as membership queries and against the budget. With a ClosureInference, words whose answer follows
+    from earlier answers on a prefix-closed, suffix-closed or sink-based component are not asked at all
+
+    As the teacher owns the target, it memoises the state reached by every table prefix and the acceptance of
+    every (state, suffix) pair - cell_query answers a table cell with one step from the parent prefix plus a
+    lookup, so a new suffix column costs one run per distinct target state. target_step_count counts the
+    transitions actually taken on the target
+
+    With an equivalence oracle (see equivalence_oracles), equivalence queries run its test suite through
+    test_query instead of enumerating every word up to depth. Either way every hypothesis is checked once -
+    its verdict is kept by fingerprint for later equivalence queries and find_counterexample calls. With a
+    CounterexampleShortener, counterexamples are shortened through membership queries before the learner sees them
+
+    With a store (see answer_store), answers and reproducible verdicts are also kept on disk across runs -
+    the store is consulted after the in-memory cache and answers found there fill the cache
     """
 
-    def __init__(self, target_dfa, depth=20):
+    concurrent = False # Whether membership_queries(words, record) answers whole batches of table cells concurrently
+
+    def __init__(self, target_dfa, depth=20, budget=None, cache=None, inference=None, memoise=True,
+                 oracle=None, shortener=None, store=None):
         self.target_dfa = target_dfa
         self.depth = depth
+        self.budget = budget
+        self.cache = cache
+        self.inference = inference
+        self.store = store # Persistent answers of this target (AnswerStore.component), None to keep answers in memory
+        # Answer table cells through cell_query, from the prefix-state memo and the state x suffix matrix
+        self.memoise = memoise
+        self.prefix_states = {} # Table prefix to the target state it reaches (None once a transition is missing)
+        self.suffix_answers = {} # (target state, suffix) to acceptance
+        self.memo_target = None # Target the memo was built for - a replaced target starts a new memo
+        self.oracle = oracle # Equivalence oracle, None for exhaustive search up to depth
+        self.shortener = shortener # CounterexampleShortener applied to oracle counterexamples, None to keep them
+        self.verdicts = {} # Hypothesis fingerprint to its counterexample (None when it passed)
+        self.verdict_target = None # Target the verdicts were recorded for
         self.membership_query_count = 0
+        self.membership_symbol_count = 0
         self.equivalence_query_count = 0
-
-    def membership_query(self, string):
+        self.target_step_count = 0
+        self.test_query_count = 0
+        self.verdict_hit_count = 0
+
+    def cell_query(self, prefix, suffix):
+        # Membership query for the observation table cell (prefix, suffix)
+        return self.membership_query(prefix + suffix, split=len(prefix))
+
+    def membership_query(self, string, split=None):
+        answer = self.known_answer(string)
+        if answer is None:
+            answer = self.ask_target(string, split)
+            self.record_answer(string, answer)
+        return answer
+
+    def known_answer(self, string):
+        # Answer implied by closure inference or held by the cache or store - None when the target has to be asked
+        if self.inference is not None:
+            answer = self.inference.infer(string)
+            if answer is not None:
+                return answer
+        answer = self.cache.get(string) if self.cache is not None else None
+        if answer is None and self.store is not None:
+            answer = self.store.get(string)
+            if answer is not None and self.cache is not None:
+                self.cache.put(string, answer)
+        if answer is not None and self.inference is not None:
+            self.inference.record(string, answer)
+        return answer
+
+    def record_answer(self, string, answer):
+        # Keeps an answer given by the target for later queries
+        if self.cache is not None:
+            self.cache.put(string, answer)
+        if self.store is not None:
+            self.store.put(string, answer)
+        if self.inference is not None:
+            self.inference.record(string, answer)
+
+    def ask_target(self, string, split=None):
+        # Membership query that actually reaches the target
+        if self.budget is not None:
+            self.budget.charge(string)
         self.membership_query_count += 1
+        self.membership_symbol_count += len(string)
+        if not self.memoise:
+            self.target_step_count += len(string)
+            return self.target_dfa.accepts(string)
+        if self.memo_target is not self.target_dfa:
+            self.prefix_states, self.suffix_answers, self.memo_target = {}, {}, self.target_dfa
+        if split is None:
+            return self.run_target(string, self.target_dfa.start_state) in self.target_dfa.accept_states
+
+        state = self.reach(string[:split])
+        suffix = string[split:]
+        if (state, suffix) not in self.suffix_answers:
+            self.suffix_answers[(state, suffix)] = self.run_target(suffix, state) in self.target_dfa.accept_states
+        return self.suffix_answers[(state, suffix)]
+
+    def reach(self, prefix):
+        # Target state reached by a table prefix - extends the memoised parent prefix by one step when possible
+        if prefix not in self.prefix_states:
+            if prefix == '':
+                self.prefix_states[prefix] = self.target_dfa.start_state
+            elif prefix[:-1] in self.prefix_states:
+                self.prefix_states[prefix] = self.run_target(prefix[-1], self.prefix_states[prefix[:-1]])
+            else:
+                self.prefix_states[prefix] = self.run_target(prefix, self.target_dfa.start_state)
+        return self.prefix_states[prefix]
+
+    def run_target(self, string, state):
+        # Runs the target from the given state, counting the transitions taken
+        for symbol in string:
+            if state is None:
+                break
+            self.target_step_count += 1
+            state = self.target_dfa.transition_function.get((state, symbol))
+        return state
+
+    def budget_exhausted(self):
+        return self.budget is not None and self.budget.exhausted
+
+    def input_alphabet(self):
+        return self.target_dfa.alphabet
+
+    def test_query(self, string):
+        # Runs one equivalence oracle test word on the target
+        if self.budget is not None:
+            self.budget.check_deadline()
+        self.test_query_count += 1
         return self.target_dfa.accepts(string)
 
+    def test_queries(self, words):
+        # Runs a batch of test words - concurrent teachers run the whole batch at once
+        return [self.test_query(word) for word in words]
+
     def equivalence_query(self, hypothesis):
         self.equivalence_query_count += 1
-        for depth in range(1, self.depth + 1):
-            for string in self.generate_test_strings(depth):
-                if self.target_dfa.accepts(string) != hypothesis.accepts(string):
-                    print(f"Counterexample found: {string}")
-                    return string
-        return None
-
-    def generate_test_strings(self, depth, prefix='', alphabet=None):
-        if alphabet is None:
-            alphabet = self.target_dfa.alphabet
-        if depth == 0:
-            return [prefix]
-        strings = []
-        for a in alphabet:
-            strings.extend(self.generate_test_strings(depth - 1, prefix + a, alphabet))
-        return strings
+        counterexample = self.check_hypothesis(hypothesis)
+        if counterexample is not None:
+            print(f"Counterexample found: {counterexample}")
+        return counterexample
 
     def find_counterexample(self, hypothesis_dfa):
         """
         Finds a counterexample for the given hypothesis DFA.
         Returns the counterexample if found, otherwise returns None.
         """
-        for input_sequence in self.generate_input_sequences(self.target_dfa.alphabet, self.depth):
-            if self.target_dfa.accepts(input_sequence) != hypothesis_dfa.accepts(input_sequence):
-                return input_sequence
-        return None
-
-    def generate_input_sequences(self, alphabet, max_length):
-        for length in range(1, max_length + 1):
-            for seq in itertools.product(alphabet, repeat=length):
-                yield ''.join(seq)
+        return self.check_hypothesis(hypothesis_dfa)
+
+    def check_hypothesis(self, hypothesis):
+        # Single oracle pipeline behind equivalence_query and find_counterexample - a hypothesis that was already
+        # checked (the learner's final one, rechecked by the learn_dfa loops) gets its recorded verdict
+        if self.verdict_target is not self.target_dfa:
+            self.verdicts, self.verdict_target = {}, self.target_dfa
+        fingerprint = hypothesis.fingerprint()
+        if fingerprint in self.verdicts:
+            self.verdict_hit_count += 1
+            return self.verdicts[fingerprint]
+        oracle = self.oracle if self.oracle is not None else ExhaustiveOracle(self.depth, self.input_alphabet())
+        oracle_key = oracle.key() if self.store is not None else None
+        if oracle_key is not None:
+            known, counterexample = self.store.get_verdict(fingerprint, oracle_key)
+            if known:
+                self.verdicts[fingerprint] = counterexample
+                return counterexample
+        counterexample = oracle.find_counterexample(self, hypothesis)
+        if counterexample is not None and self.shortener is not None:
+            counterexample = self.shortener.shorten(counterexample, hypothesis, self.membership_query)
+        self.verdicts[fingerprint] = counterexample
+        if oracle_key is not None:
+            self.store.put_verdict(fingerprint, oracle_key, counterexample)
+        return counterexample
 
 
 # L* LEARNER CLASS DEFINITION
@@ -149,96 +424,215 @@ class Learner:
 
     Constructs observation table to record direct response and then determines when consistent and closed 
     hypothesis DFA has been detected
+
+    Counterexample modes:
+    - prefix: All prefixes of a counterexample are added to S (original L*)
+    - suffix: All suffixes of a counterexample are added to E (Maler & Pnueli) - S then only grows through
+      closedness, its rows stay pairwise distinct and the table is consistent by construction, so the
+      consistency check is skipped entirely
+
+    With a query budget on the teacher, learn() stops once the budget is spent and returns the latest hypothesis
+    with verified set to False
+
+    With a lazy table, suffix mode adds only the single suffix located by a Rivest & Schapire binary search
+    rather than every suffix of the counterexample, keeping the number of columns - and cells - small
     """
 
-    def __init__(self, teacher, alphabet):
+    COUNTEREXAMPLE_MODES = ("prefix", "suffix")
+
+    def __init__(self, teacher, alphabet, counterexample_mode="prefix", lazy_table=False):
+        if counterexample_mode not in self.COUNTEREXAMPLE_MODES:
+            raise ValueError(f"Unknown counterexample mode: {counterexample_mode}")
         self.teacher = teacher
-        self.table = ObservationTable(alphabet)
+        self.table = ObservationTable(alphabet, lazy=lazy_table)
+        if teacher.memoise:
+            self.table.cell_query = teacher.cell_query
+        if teacher.concurrent:
+            self.table.batch_query = teacher.membership_queries
         self.alphabet = alphabet
+        self.counterexample_mode = counterexample_mode
         self.previous_counterexamples = set()
+        self.hypothesis = None
+        self.state_access = {} # Hypothesis state name to its representative prefix in S
+        self.verified = False # Whether the last hypothesis returned by learn() passed the equivalence query
 
     def set_previous_counterexamples(self, counterexamples):
         self.previous_counterexamples = counterexamples
 
-    def learn(self):
-        # Execution of L* until hypothesis DFA is equivalent to target DFA
-        while True:
+    def add_symbols(self, symbols):
+        """
+        Extends a live learner with symbols that appeared at runtime
+
+        Only the S + a boundary for the new symbols is queried, every existing answer is kept - calling
+        learn() afterwards closes the table and relearns incrementally
+        """
+        new_symbols = self.table.add_symbols(symbols)
+        self.alphabet = self.table.alphabet
+        if new_symbols:
             self.table.fill_table(self.teacher.membership_query)
-            
-            # Check for closure and consistency
-            closed, unclosed_s = self.table.is_closed()
-            while not closed:
-                self.table.add_to_S(unclosed_s)
-                self.table.fill_table(self.teacher.membership_query)
-                closed, unclosed_s = self.table.is_closed()
+        return new_symbols
 
-            consistent, s1, s2, a = self.table.is_consistent()
-            while not consistent:
-                self.table.add_to_E(a)
+    def warm_start(self, previous_table=None, previous_hypothesis=None, is_stale=None):
+        """
+        Seeds the observation table from an earlier run instead of starting from S = E = {''}
+
+        From a previous table, S, E and every answer for which is_stale(word) is False are kept - only stale
+        cells are queried again. From a previous hypothesis, S becomes its access sequences and E its
+        characterising set. The learner's own alphabet is used, so a grown alphabet only adds the new s + a
+        cells. In suffix mode, S rows that became equal are dropped to keep the table consistent by construction,
+        without breaking the prefix closure of S
+        """
+        if previous_table is not None:
+            self.table.S = list(previous_table.S)
+            self.table.E = list(previous_table.E)
+            self.table.T = {(s, e): answer for (s, e), answer in previous_table.T.items()
+                            if is_stale is None or not is_stale(s + e)}
+        elif previous_hypothesis is not None:
+            self.table.S = sorted(previous_hypothesis.access_sequences().values(), key=lambda s: (len(s), s))
+            self.table.E = previous_hypothesis.characterising_set()
+        self.table.fill_table(self.teacher.membership_query)
+
+        if self.counterexample_mode == "suffix":
+            # Keep S prefix-closed: a prefix is only kept when its parent is, and only when its row is new - rows
+            # dropped here are found again through closedness
+            kept = []
+            for s in sorted(self.table.S, key=lambda s: (len(s), s)):
+                if (s == '' or s[:-1] in kept) and self.table.find_equal_row(s, kept) is None:
+                    kept.append(s)
+            self.table.S = kept
+
+    def learn(self):
+        # Execution of L* until hypothesis DFA is equivalent to target DFA, or until the query budget is spent
+        self.verified = False
+        try:
+            while True:
                 self.table.fill_table(self.teacher.membership_query)
-                consistent, s1, s2, a = self.table.is_consistent()
 
-            # Construct DFA hypothesis and check for equivalence
-            hypothesis_dfa = self.construct_dfa()
-            counterexample = self.teacher.equivalence_query(hypothesis_dfa)
-            if counterexample:
-                self.handle_counterexample(counterexample)
-            else:
-                return hypothesis_dfa
+                # Check for closure and consistency
+                closed, unclosed_s = self.table.is_closed()
+                while not closed:
+                    self.table.add_to_S(unclosed_s)
+                    self.table.fill_table(self.teacher.membership_query)
+                    closed, unclosed_s = self.table.is_closed()
+
+                if self.counterexample_mode == "prefix":
+                    self.make_consistent()
+
+                # Construct DFA hypothesis and check for equivalence
+                hypothesis_dfa = self.construct_dfa()
+                counterexample = self.teacher.equivalence_query(hypothesis_dfa)
+                if counterexample:
+                    self.handle_counterexample(counterexample)
+                else:
+                    self.verified = True
+                    return hypothesis_dfa
+        except BudgetExhausted as reason:
+            print(f"Query budget exhausted ({reason}) - returning unverified hypothesis")
+            return self.unverified_hypothesis()
+
+    def unverified_hypothesis(self):
+        # Hypothesis rebuilt from the current table once the budget is spent, so it reflects every answer paid for -
+        # including the counterexample that refuted the last hypothesis
+        self.table.membership_query = None # No further queries - unknown cells read as rejecting
+        return self.construct_dfa()
 
     def construct_dfa(self):
         # Constructs DFA from current state of observation table
-        unique_rows = {}
-        for s in self.table.S:
-            row = self.table.get_row(s)
-            if row not in unique_rows:
-                unique_rows[row] = "state_" + str(len(unique_rows))
+        # One representative prefix per distinct row - rows are only compared as far as their first difference
+        unique_rows = {s: "state_" + str(i) for i, s in enumerate(self.table.representatives())}
 
         states = set(unique_rows.values())
         alphabet = self.alphabet
         transition_function = {}
-        start_state = unique_rows[self.table.get_row('')]
+        start_state = unique_rows['']
         accept_states = set()
 
-        for s in self.table.S:
-            if self.table.T.get((s, ''), False):
-                accept_states.add(unique_rows[self.table.get_row(s)])
-        
-        for s in self.table.S:
+        for s in unique_rows:
+            if self.table.get_value(s, ''):
+                accept_states.add(unique_rows[s])
+
+        for s in unique_rows:
             for a in self.alphabet:
-                sa_row = self.table.get_row(s + a)
-                if sa_row in unique_rows:
-                    transition_function[(unique_rows[self.table.get_row(s)], a)] = unique_rows[sa_row]
+                if s + a in self.table.S:
+                    sa_representative = self.table.find_equal_row(s + a, unique_rows)
+                else:
+                    sa_representative = self.table.classify_row(s + a, unique_rows)
+                if sa_representative is not None:
+                    transition_function[(unique_rows[s], a)] = unique_rows[sa_representative]
 
         dfa = DFA(states=states, alphabet=alphabet,
                   transition_function=transition_function,
                   start_state=start_state, accept_states=accept_states)
+        self.hypothesis = dfa
+        self.state_access = {name: s for s, name in unique_rows.items()}
         return dfa
 
     def handle_counterexample(self, counterexample):
         added = False
-        for i in range(1, len(counterexample) + 1):
-            prefix = counterexample[:i]
-            if prefix not in self.table.S:
-                self.table.S.append(prefix)
-                added = True
+        if self.counterexample_mode == "suffix" and self.table.lazy and self.hypothesis is not None:
+            # A lazy table may never read the cell that refutes the hypothesis, so it is located explicitly and
+            # only its suffix becomes a new column
+            self.locate_distinguishing_cell(counterexample)
+            added = True
+        elif self.counterexample_mode == "suffix":
+            for i in range(len(counterexample)):
+                suffix = counterexample[i:]
+                if suffix not in self.table.E:
+                    self.table.E.append(suffix)
+                    added = True
+        else:
+            for i in range(1, len(counterexample) + 1):
+                prefix = counterexample[:i]
+                if prefix not in self.table.S:
+                    self.table.S.append(prefix)
+                    added = True
                 
         if added:
             self.table.fill_table(self.teacher.membership_query)
             self.check_and_resolve_table_issues()
 
+    def locate_distinguishing_cell(self, counterexample):
+        """
+        Binary search (Rivest & Schapire) for the transition the hypothesis gets wrong on the counterexample
+
+        Word i replaces the first i symbols by the representative of the hypothesis state they lead to. Words i
+        and i + 1 disagree for some i, and word i is also the cell (representative + symbol, remaining suffix) -
+        recording it there lets the lazy closedness check separate that row from its current representative
+        """
+        def split_access(i):
+            return self.state_access[self.hypothesis.run(counterexample[:i])]
+
+        def split_answer(i):
+            return self.table.get_value(split_access(i), counterexample[i:])
+
+        target = split_answer(0)
+        low, high = 0, len(counterexample)
+        while high - low > 1:
+            mid = (low + high) // 2
+            if split_answer(mid) == target:
+                low = mid
+            else:
+                high = mid
+        self.table.add_to_E(counterexample[low + 1:])
+        self.table.T[(split_access(low) + counterexample[low], counterexample[low + 1:])] = split_answer(low)
+
     def check_and_resolve_table_issues(self):
         closed, unclosed_s = self.table.is_closed()
         while not closed:
             self.table.add_to_S(unclosed_s)
             self.table.fill_table(self.teacher.membership_query)
             closed, unclosed_s = self.table.is_closed()
-        
-        consistent, s1, s2, a = self.table.is_consistent()
+
+        if self.counterexample_mode == "prefix":
+            self.make_consistent()
+
+    def make_consistent(self):
+        # Resolve inconsistencies by adding distinguishing suffixes - only needed in prefix mode
+        consistent, s1, s2, e = self.table.is_consistent()
         while not consistent:
-            self.table.add_to_E(a)
+            self.table.add_to_E(e)
             self.table.fill_table(self.teacher.membership_query)
-            consistent, s1, s2, a = self.table.is_consistent()
+            consistent, s1, s2, e = self.table.is_consistent()
 
 
 def load_dfa_config(dfa_path):
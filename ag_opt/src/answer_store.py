@@ -0,0 +1,122 @@
+# PERSISTENT ANSWER STORE
+
+import sqlite3
+
+class AnswerStore:
+    """
+    On-disk store of membership answers and equivalence verdicts, shared by every run that opens the same file
+
+    Answers are keyed by the component's DFA.fingerprint() and the word, so a changed component never sees
+    answers recorded for another version. Verdicts are keyed by component, hypothesis fingerprint and the
+    oracle that gave them - only oracles whose verdicts are reproducible (see ConformanceOracle.key) store them
+
+    Writes are buffered and committed batch_size at a time (and on flush/close). Once more than max_entries
+    answers are stored, compaction drops the oldest ones down to max_entries and reclaims the file space
+    """
+
+    def __init__(self, path, max_entries=None, batch_size=256):
+        self.path = path
+        self.max_entries = max_entries # Answers kept at most, None for no cap
+        self.batch_size = batch_size # Buffered writes per commit
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (component TEXT, word TEXT, answer INTEGER,
+                                                PRIMARY KEY (component, word));
+            CREATE TABLE IF NOT EXISTS verdicts (component TEXT, hypothesis TEXT, oracle TEXT, counterexample TEXT,
+                                                 PRIMARY KEY (component, hypothesis, oracle));
+        """)
+        self.pending_answers = {} # (component, word) to answer, not yet written
+        self.pending_verdicts = {} # (component, hypothesis, oracle) to counterexample, not yet written
+        self.compactions = 0
+
+    def get(self, component, word):
+        answer = self.pending_answers.get((component, word))
+        if answer is not None:
+            return answer
+        row = self.connection.execute("SELECT answer FROM answers WHERE component = ? AND word = ?",
+                                      (component, word)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def put(self, component, word, answer):
+        self.pending_answers[(component, word)] = answer
+        self.flush_if_full()
+
+    def get_verdict(self, component, hypothesis, oracle):
+        # (True, counterexample) for a recorded verdict - None as counterexample meaning the hypothesis passed -
+        # or (False, None) when the hypothesis was never checked with this oracle
+        key = (component, hypothesis, oracle)
+        if key in self.pending_verdicts:
+            return True, self.pending_verdicts[key]
+        row = self.connection.execute("SELECT counterexample FROM verdicts WHERE component = ? AND hypothesis = ? "
+                                      "AND oracle = ?", key).fetchone()
+        return (False, None) if row is None else (True, row[0])
+
+    def put_verdict(self, component, hypothesis, oracle, counterexample):
+        self.pending_verdicts[(component, hypothesis, oracle)] = counterexample
+        self.flush_if_full()
+
+    def flush_if_full(self):
+        if len(self.pending_answers) + len(self.pending_verdicts) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Writes every buffered answer and verdict in one transaction, then compacts if over the cap
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                                        [(component, word, int(answer))
+                                         for (component, word), answer in self.pending_answers.items()])
+            self.connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)",
+                                        [key + (counterexample,) for key, counterexample in self.pending_verdicts.items()])
+        self.pending_answers.clear()
+        self.pending_verdicts.clear()
+        if self.max_entries is not None and self.size() > self.max_entries:
+            self.compact()
+
+    def size(self):
+        return self.connection.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def compact(self):
+        # Keeps the max_entries most recently written answers and shrinks the file
+        with self.connection:
+            self.connection.execute("DELETE FROM answers WHERE rowid NOT IN "
+                                    "(SELECT rowid FROM answers ORDER BY rowid DESC LIMIT ?)", (self.max_entries,))
+        self.connection.execute("VACUUM")
+        self.compactions += 1
+
+    def component(self, component):
+        # View of the answers of one component, usable as a Teacher's store
+        return ComponentAnswers(self, component.fingerprint())
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+class ComponentAnswers:
+    """
+    Answers and verdicts of a single component within an AnswerStore - hits counts the answers found on disk
+    """
+
+    def __init__(self, store, fingerprint):
+        self.store = store
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.verdict_hits = 0
+
+    def get(self, word):
+        answer = self.store.get(self.fingerprint, word)
+        if answer is not None:
+            self.hits += 1
+        return answer
+
+    def put(self, word, answer):
+        self.store.put(self.fingerprint, word, answer)
+
+    def get_verdict(self, hypothesis, oracle):
+        known, counterexample = self.store.get_verdict(self.fingerprint, hypothesis, oracle)
+        if known:
+            self.verdict_hits += 1
+        return known, counterexample
+
+    def put_verdict(self, hypothesis, oracle, counterexample):
+        self.store.put_verdict(self.fingerprint, hypothesis, oracle, counterexample)
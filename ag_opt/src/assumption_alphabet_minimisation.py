@@ -1,7 +1,7 @@
 
 # ASSUMPTION ALPHABET MINIMISATION
 
-from angluin import Learner
+from angluin import BudgetExhausted, Learner
 from dfa import DFA
 
 def minimise_alphabet(assumption_dfa, system_alphabet):
@@ -115,13 +115,18 @@ def learn_dfa(teacher, system_alphabet, minimise_alphabet_flag=True):
         print(f"Accept States: {dfa.accept_states}")
         print(f"Transition Function: {dfa.transition_function}")
 
-        counterexample = teacher.find_counterexample(dfa)
-        if not counterexample:
-            if minimise_alphabet_flag:
-                dfa = minimise_alphabet(dfa, system_alphabet)
-            return dfa, iteration, learner.table
+        if not learner.verified:
+            return dfa, iteration, learner.table  # Query budget spent - unverified hypothesis is not minimised
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                if minimise_alphabet_flag:
+                    dfa = minimise_alphabet(dfa, system_alphabet)
+                return dfa, iteration, learner.table
 
-        process_counterexample(counterexample, learner.table, teacher.membership_query)
+            process_counterexample(counterexample, learner.table, teacher.membership_query)
+        except BudgetExhausted:
+            return learner.unverified_hypothesis(), iteration, learner.table
 
 def process_counterexample(counterexample, table, membership_query):
     """
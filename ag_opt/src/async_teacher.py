@@ -0,0 +1,184 @@
+# CONCURRENT MEMBERSHIP QUERIES
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from angluin import BudgetExhausted
+from sul import RunTreeNode, SULTeacher
+
+class AsyncSULTeacher(SULTeacher):
+    """
+    SUL teacher that keeps up to concurrency membership queries in flight over a pool of SUL instances
+
+    The observation table hands over every missing cell of a fill at once (membership_queries). Words are
+    answered from closure inference and the cache first, charged to the budget in table order, and the rest run
+    on the SULs from worker threads under an asyncio bounded semaphore, each SUL serving one query at a time.
+    Answers are recorded in table order whatever order they arrive in, so learning is deterministic and only
+    its wall time depends on the SULs. Batches of test words (test_queries, as drawn by the PAC oracle) run on
+    the pool the same way
+
+    A query that takes longer than timeout seconds is retried on another SUL, up to retries times, before
+    TimeoutError is raised. The SUL it was running on is only used again once that run has finished. A query
+    that fails cancels the rest of its batch, and the error is raised once every SUL of the batch is free again
+
+    With run_tree, words that are prefixes of earlier runs are answered from the tree and every run is
+    recorded in it. Runs always start from a reset - a pooled SUL has no single current run to continue
+    """
+
+    concurrent = True
+
+    def __init__(self, suls, alphabet, concurrency=None, timeout=None, retries=0, depth=20, budget=None, cache=None,
+                 inference=None, oracle=None, shortener=None, run_tree=False):
+        super().__init__(suls[0], alphabet, depth=depth, budget=budget, cache=cache, inference=inference,
+                         oracle=oracle, shortener=shortener, run_tree=run_tree)
+        self.suls = list(suls)
+        self.concurrency = min(concurrency or len(self.suls), len(self.suls)) # Queries in flight at most
+        self.timeout = timeout # Seconds per attempt, None to wait indefinitely
+        self.retries = retries # Further attempts after a timeout
+        self.executor = ThreadPoolExecutor(max_workers=len(self.suls))
+        self.idle = list(self.suls) # SULs free to take a query
+        self.retry_count = 0
+        self.peak_in_flight = 0
+
+    def membership_queries(self, words, record):
+        # Answers every word, calling record(index, answer) in index order - if the budget runs out, the words
+        # already paid for are still answered and recorded before BudgetExhausted is raised
+        pending = {} # Word still to be asked to its indices in words
+        for i, word in enumerate(words):
+            if word in pending:
+                pending[word].append(i)
+                continue
+            answer = self.known_answer(word)
+            if answer is None:
+                answer = self.tree_answer(word)
+                if answer is not None:
+                    self.record_answer(word, answer)
+            if answer is None:
+                pending[word] = [i]
+            else:
+                record(i, answer)
+
+        extended = set()
+        if self.run_tree is not None:
+            # A word that prefixes another word of the batch is read off that word's run - in sorted order, such
+            # a word is directly followed by a word it prefixes
+            ordered = sorted(pending)
+            extended = {word for word, following in zip(ordered, ordered[1:]) if following.startswith(word)}
+
+        paid, exhausted = [], None
+        for word in pending:
+            if word in extended:
+                continue
+            try:
+                if self.budget is not None:
+                    self.budget.charge(word)
+            except BudgetExhausted as reason:
+                exhausted = reason
+                break
+            self.membership_query_count += 1
+            self.membership_symbol_count += len(word)
+            paid.append(word)
+
+        answers = dict(zip(paid, asyncio.run(self.run_batch(paid))))
+        for word in extended:
+            answer = self.tree_answer(word)
+            if answer is not None:
+                answers[word] = answer
+        for word in pending:
+            if word in answers:
+                self.record_answer(word, answers[word])
+        for i, answer in sorted((i, answers[word]) for word in pending if word in answers for i in pending[word]):
+            record(i, answer)
+        if exhausted is not None:
+            raise exhausted
+
+    def test_queries(self, words):
+        # Test words not answered by the run tree run concurrently, like a table fill
+        if self.budget is not None:
+            self.budget.check_deadline()
+        self.test_query_count += len(words)
+        answers = {word: self.tree_answer(word) for word in dict.fromkeys(words)}
+        missing = [word for word, answer in answers.items() if answer is None]
+        answers.update(zip(missing, asyncio.run(self.run_batch(missing))))
+        return [answers[word] for word in words]
+
+    def run_sul(self, string, split=None):
+        # Single query (L#, lazy tables, counterexample handling) on the pool - a pooled SUL is reset for every
+        # run, so there is no snapshot to restore and split is not used
+        return asyncio.run(self.run_batch([string]))[0]
+
+    async def run_batch(self, words):
+        # Answers in the order of words
+        if not self.idle:
+            raise RuntimeError("Every SUL is still busy with a timed out query")
+        semaphore = asyncio.BoundedSemaphore(min(self.concurrency, len(self.idle)))
+        pool = asyncio.Queue()
+        for sul in self.idle:
+            pool.put_nowait(sul)
+        in_flight = 0
+        abandoned = [] # (thread future, SUL) of attempts that ended in an error rather than an answer or timeout
+
+        async def run(word):
+            nonlocal in_flight
+            async with semaphore:
+                for attempt in range(self.retries + 1):
+                    if pool.empty() and in_flight == 0:
+                        raise RuntimeError("Every SUL is still busy with a timed out query")
+                    sul = await pool.get()
+                    self.idle.remove(sul)
+                    self.reset_count += 1
+                    self.step_count += len(word)
+                    future = self.executor.submit(run_word, sul, word,
+                                                  self.run_tree is not None and self.run_tree.root is None)
+                    in_flight += 1
+                    self.peak_in_flight = max(self.peak_in_flight, in_flight)
+                    try:
+                        answer = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+                    except asyncio.TimeoutError:
+                        # The run goes on in its thread - its SUL is idle again (for later batches) once it ends
+                        future.add_done_callback(lambda _, sul=sul: self.idle.append(sul))
+                        if attempt < self.retries:
+                            self.retry_count += 1
+                        continue
+                    except BaseException:
+                        # Failed, or cancelled along with a failed query - handed back by the batch below
+                        abandoned.append((future, sul))
+                        raise
+                    finally:
+                        in_flight -= 1
+                    self.idle.append(sul)
+                    pool.put_nowait(sul)
+                    return self.record_run(word, *answer)
+                raise TimeoutError(f"SUL query timed out {self.retries + 1} times: {word!r}")
+
+        tasks = [asyncio.ensure_future(run(word)) for word in words]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            # A failed query cancels the others - the batch waits for the runs they leave behind, so every SUL is
+            # idle again before the error reaches the caller
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if abandoned:
+                await asyncio.wait([asyncio.wrap_future(future) for future, _ in abandoned])
+                self.idle.extend(sul for _, sul in abandoned)
+
+    def record_run(self, word, initial_output, outputs):
+        # Final output of a run, which is kept in the run tree if there is one
+        if self.run_tree is None:
+            return initial_output if not word else outputs[-1]
+        if self.run_tree.root is None:
+            self.run_tree.root = RunTreeNode(initial_output)
+        self.run_tree.record('', word, outputs)
+        return self.run_tree.output(word)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def run_word(sul, word, initial_output=False):
+    # One membership query on a SUL, run in a worker thread - the output before the first step is only read
+    # when it is asked for or the word is empty
+    sul.reset()
+    output = sul.output() if initial_output or not word else None
+    return output, [sul.step(symbol) for symbol in word]
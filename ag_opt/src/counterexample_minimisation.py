@@ -0,0 +1,88 @@
+# COUNTEREXAMPLE MINIMISATION
+
+class CounterexampleShortener:
+    """
+    Shortens counterexamples between the equivalence oracle and the learner
+
+    Every symbol of a counterexample becomes rows or columns of the observation table, so a shorter
+    counterexample saves membership queries in every later fill. A word is kept as long as the target and the
+    hypothesis still disagree on it, checked through the membership oracle. Stages, each optional:
+    - prefix_trimming: the shortest prefix the target and hypothesis already disagree on
+    - loop_removal: infixes that lead the hypothesis from a state back to the same state - the hypothesis
+      answer cannot change, so only the target has to be asked
+    - delta_debugging: removal of ever smaller chunks of symbols (ddmin) until no single symbol can go
+
+    symbols_saved and queries_spent weigh what shortening saves against the membership queries it costs
+    """
+
+    def __init__(self, prefix_trimming=True, loop_removal=True, delta_debugging=True):
+        self.prefix_trimming = prefix_trimming
+        self.loop_removal = loop_removal
+        self.delta_debugging = delta_debugging
+        self.shortened = 0 # Counterexamples that lost at least one symbol
+        self.symbols_saved = 0
+        self.queries_spent = 0 # Membership oracle calls made while shortening
+
+    def shorten(self, counterexample, hypothesis, membership_query):
+        def disagrees(word):
+            self.queries_spent += 1
+            return membership_query(word) != hypothesis.accepts(word)
+
+        word = counterexample
+        if self.prefix_trimming:
+            word = self.trim_prefix(word, disagrees)
+        if self.loop_removal:
+            word = self.remove_loops(word, hypothesis, disagrees)
+        if self.delta_debugging:
+            word = self.delta_debug(word, disagrees)
+        if len(word) < len(counterexample):
+            self.shortened += 1
+            self.symbols_saved += len(counterexample) - len(word)
+        return word
+
+    def trim_prefix(self, word, disagrees):
+        # Shortest prefix that is a counterexample - the whole word is one, so it is never asked
+        for length in range(len(word)):
+            if disagrees(word[:length]):
+                return word[:length]
+        return word
+
+    def remove_loops(self, word, hypothesis, disagrees):
+        # Cuts the longest hypothesis loop the target agrees to lose, until no loop can be cut
+        while True:
+            states = [hypothesis.start_state]
+            for symbol in word:
+                states.append(hypothesis.transition_function.get((states[-1], symbol)))
+            loops = sorted(((i, j) for i in range(len(word)) for j in range(i + 1, len(word) + 1)
+                            if states[i] is not None and states[i] == states[j]),
+                           key=lambda loop: loop[0] - loop[1])
+            for i, j in loops:
+                if disagrees(word[:i] + word[j:]):
+                    word = word[:i] + word[j:]
+                    break
+            else:
+                return word
+
+    def delta_debug(self, word, disagrees):
+        # ddmin over contiguous chunks - a successful removal keeps the granularity, a failed round refines it
+        granularity = 2
+        while len(word) > 0:
+            chunk = -(-len(word) // granularity)
+            for start in range(0, len(word), chunk):
+                candidate = word[:start] + word[start + chunk:]
+                if disagrees(candidate):
+                    word = candidate
+                    granularity = max(granularity - 1, 2)
+                    break
+            else:
+                if chunk == 1:
+                    return word
+                granularity = min(granularity * 2, len(word))
+        return word
+
+
+def build_shortener(settings):
+    # Shortener described by the training.counterexample_minimisation settings - None when disabled
+    if not settings or not settings.get('enabled', False):
+        return None
+    return CounterexampleShortener(**{key: value for key, value in settings.items() if key != 'enabled'})
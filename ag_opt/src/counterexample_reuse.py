@@ -1,29 +1,37 @@
 # COUNTEREXAMPLE REUSE FOR DFA LEARNING
 
-from angluin import Learner
+from angluin import BudgetExhausted, Learner
 
-def learn_dfa(teacher, system_alphabet, reuse_counterexamples=False):
+def learn_dfa(teacher, system_alphabet, reuse_counterexamples=False, counterexample_mode="prefix"):
     """
     Learns the DFA using the provided teacher and system alphabet
     Optionally reuses counterexamples to improve learning efficiency
     """
-    learner = Learner(teacher, system_alphabet)
+    learner = Learner(teacher, system_alphabet, counterexample_mode)
     previous_counterexamples = set()  # Set to store previously found counterexamples
     iteration = 0
 
     while True:
         iteration += 1
         dfa = learner.learn()
-        counterexample = teacher.find_counterexample(dfa)
-        if not counterexample:
-            return dfa, iteration, learner.table  # Return the learned DFA if no counterexample is found
+        if not learner.verified:
+            return dfa, iteration, learner.table  # Query budget spent - return the unverified hypothesis
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                return dfa, iteration, learner.table  # Return the learned DFA if no counterexample is found
 
-        if reuse_counterexamples:
-            if counterexample in previous_counterexamples:
-                return dfa, iteration, learner.table  # Return if the counterexample was previously encountered
-            previous_counterexamples.add(counterexample)
+            if reuse_counterexamples:
+                if counterexample in previous_counterexamples:
+                    return dfa, iteration, learner.table  # Return if the counterexample was previously encountered
+                previous_counterexamples.add(counterexample)
 
-        process_counterexample(counterexample, learner.table, teacher.membership_query)
+            if counterexample_mode == "suffix":
+                learner.handle_counterexample(counterexample)  # Keep S free of prefixes in suffix mode
+            else:
+                process_counterexample(counterexample, learner.table, teacher.membership_query)
+        except BudgetExhausted:
+            return learner.unverified_hypothesis(), iteration, learner.table
 
 def process_counterexample(counterexample, table, membership_query):
     """
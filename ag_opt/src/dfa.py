@@ -1,6 +1,10 @@
 
 # DFA CLASS DEFINITION
 
+import hashlib
+import random
+from collections import deque
+
 class DFA:
     """
     Specified DFA is defined by a set of states, input alphabet, transition function, start state, and set of 
@@ -26,6 +30,80 @@ class DFA:
                 return False
         return current_state in self.accept_states
 
+    def run(self, string, state=None):
+        # State reached on the string from the given state (start state by default) - None once a transition is missing
+        current_state = self.start_state if state is None else state
+        for symbol in string:
+            current_state = self.transition_function.get((current_state, symbol))
+            if current_state is None:
+                return None
+        return current_state
+
+    def access_sequences(self):
+        # Shortest (then alphabetically first) word reaching every reachable state
+        access = {self.start_state: ''}
+        queue = deque([self.start_state])
+        while queue:
+            state = queue.popleft()
+            for symbol in sorted(self.alphabet):
+                next_state = self.transition_function.get((state, symbol))
+                if next_state is not None and next_state not in access:
+                    access[next_state] = access[state] + symbol
+                    queue.append(next_state)
+        return access
+
+    def distinguishing_suffix(self, state1, state2):
+        # Shortest suffix accepted from exactly one of the two states - None if they are equivalent
+        # A missing transition leads to an implicit rejecting sink, represented by None
+        seen = {(state1, state2)}
+        queue = deque([(state1, state2, '')])
+        while queue:
+            q1, q2, suffix = queue.popleft()
+            if (q1 in self.accept_states) != (q2 in self.accept_states):
+                return suffix
+            for symbol in sorted(self.alphabet):
+                pair = (self.transition_function.get((q1, symbol)), self.transition_function.get((q2, symbol)))
+                if pair not in seen:
+                    seen.add(pair)
+                    queue.append((pair[0], pair[1], suffix + symbol))
+        return None
+
+    def characterising_set(self):
+        # Suffixes that together tell apart every pair of inequivalent reachable states, always starting with ''
+        states = list(self.access_sequences())
+        suffixes = ['']
+        for i, state1 in enumerate(states):
+            for state2 in states[i + 1:]:
+                if not any((self.run(e, state1) in self.accept_states) != (self.run(e, state2) in self.accept_states)
+                           for e in suffixes):
+                    suffix = self.distinguishing_suffix(state1, state2)
+                    if suffix is not None:
+                        suffixes.append(suffix)
+        return suffixes
+
+    def to_compact(self):
+        # Plain, picklable description of the DFA - used to return hypotheses from worker processes
+        return {
+            'states': sorted(self.states, key=str),
+            'alphabet': sorted(self.alphabet),
+            'transitions': sorted(((state, symbol, dest) for (state, symbol), dest in self.transition_function.items()),
+                                  key=str),
+            'start_state': self.start_state,
+            'accept_states': sorted(self.accept_states, key=str)
+        }
+
+    def fingerprint(self):
+        # Stable identity hash of the automaton - equal for DFAs with identical states, transitions and acceptance
+        return hashlib.sha256(repr(self.to_compact()).encode()).hexdigest()
+
+    @classmethod
+    def from_compact(cls, compact):
+        # Rebuild a DFA from the output of to_compact
+        return cls(states=set(compact['states']), alphabet=set(compact['alphabet']),
+            transition_function={(state, symbol): dest for state, symbol, dest in compact['transitions']},
+            start_state=compact['start_state'],
+            accept_states=set(compact['accept_states']))
+
     def intersect(self, other):
         # Intersection of multiple DFAs - new transition function specified
         new_states = {(s1, s2) for s1 in self.states for s2 in other.states}
@@ -46,3 +124,21 @@ class DFA:
             transition_function=new_transition_function,
             start_state=new_start_state,
             accept_states=new_accept_states)
+
+
+def generate_random_dfa(num_states, alphabet, accept_ratio=0.5, seed=None):
+    """
+    Generates a complete DFA with uniformly random transitions over the given alphabet
+
+    Used to benchmark learners beyond the bundled DFA configurations - the same seed always
+    reproduces the same automaton
+    """
+    rng = random.Random(seed)
+    states = ['q' + str(i) for i in range(num_states)]
+    alphabet = sorted(alphabet)
+    transition_function = {(state, symbol): rng.choice(states) for state in states for symbol in alphabet}
+    accept_states = {state for state in states if rng.random() < accept_ratio}
+    return DFA(states=set(states), alphabet=set(alphabet),
+        transition_function=transition_function,
+        start_state=states[0],
+        accept_states=accept_states)
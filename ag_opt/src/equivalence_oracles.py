@@ -0,0 +1,341 @@
+# CONFORMANCE TESTING EQUIVALENCE ORACLES
+
+import inspect
+import itertools
+import math
+import random
+from abc import ABC, abstractmethod
+from sharded_enumeration import ShardedEnumerator
+
+class ConformanceOracle(ABC):
+    """
+    Equivalence oracle that runs the test words of test_words(hypothesis) on the target through the teacher,
+    stopping at the first word the target and hypothesis disagree on - subclasses have to provide test_words
+    """
+
+    def find_counterexample(self, teacher, hypothesis):
+        # First suite word the target and hypothesis disagree on, or None when the hypothesis passes
+        for word in self.test_words(hypothesis):
+            self.tests_run += 1
+            if teacher.test_query(word) != hypothesis.accepts(word):
+                return word
+        return None
+
+    @abstractmethod
+    def test_words(self, hypothesis):
+        # Test words for a hypothesis, in the order they are run
+        raise NotImplementedError
+
+    def key(self):
+        # Identifies the test suite for stored verdicts - None when verdicts cannot be reproduced (sampling)
+        return None
+
+    def guarantee(self):
+        # (epsilon, delta) bound on the error of the last hypothesis that passed - None when the oracle gives none
+        return None
+
+    def close(self):
+        # Releases what the oracle holds on to between equivalence queries
+        pass
+
+
+class ExhaustiveOracle(ConformanceOracle):
+    """
+    Every word of length 1 to depth over the given alphabet (the hypothesis alphabet by default), shortest first
+
+    Words are streamed, never collected - only the word under test is held in memory
+    """
+
+    def __init__(self, depth, alphabet=None):
+        self.depth = depth
+        self.alphabet = alphabet
+        self.tests_run = 0
+
+    def key(self):
+        return f"exhaustive:{self.depth}:{sorted(self.alphabet) if self.alphabet is not None else None}"
+
+    def test_words(self, hypothesis):
+        alphabet = self.alphabet if self.alphabet is not None else hypothesis.alphabet
+        for length in range(1, self.depth + 1):
+            for symbols in itertools.product(alphabet, repeat=length):
+                yield ''.join(symbols)
+
+
+class ShardedExhaustiveOracle(ExhaustiveOracle):
+    """
+    Exhaustive search up to depth (the teacher's depth by default) sharded over worker processes by the first
+    prefix_length symbols (see ShardedEnumerator)
+
+    The target is shipped to the workers once and kept as long as the teacher's target and alphabet stay the
+    same - each hypothesis travels with its shard jobs. The counterexample is the shortest, lexicographically
+    smallest one, whatever order the shards finish in. Needs a white-box teacher, as the workers run the target
+    """
+
+    def __init__(self, depth=None, alphabet=None, workers=2, prefix_length=1):
+        super().__init__(depth, alphabet)
+        self.workers = workers
+        self.prefix_length = prefix_length
+        self.enumerator = None
+        self.target = None # Target and alphabet the workers hold
+        self.target_alphabet = None
+
+    def key(self):
+        if self.depth is None:
+            return None
+        return f"sharded:{self.depth}:{sorted(self.alphabet) if self.alphabet is not None else None}"
+
+    def find_counterexample(self, teacher, hypothesis):
+        if teacher.budget is not None:
+            teacher.budget.check_deadline()
+        alphabet = set(self.alphabet if self.alphabet is not None else teacher.input_alphabet())
+        if self.enumerator is None or self.target is not teacher.target_dfa or self.target_alphabet != alphabet:
+            self.close()
+            self.enumerator = ShardedEnumerator([teacher.target_dfa], alphabet, self.workers, self.prefix_length)
+            self.target, self.target_alphabet = teacher.target_dfa, alphabet
+        checked = self.enumerator.words_checked
+        counterexample = self.enumerator.find(self.depth if self.depth is not None else teacher.depth,
+                                              extra=[hypothesis])
+        self.tests_run += self.enumerator.words_checked - checked
+        teacher.test_query_count += self.enumerator.words_checked - checked
+        return counterexample
+
+    def close(self):
+        if self.enumerator is not None:
+            self.enumerator.close()
+            self.enumerator = None
+
+
+class WMethodOracle(ConformanceOracle):
+    """
+    Equivalence oracle built from the hypothesis alone, for targets that can only be tested
+
+    Tests every word p.m.w, where p is taken from the transition cover P (access sequences of the hypothesis
+    and their one-symbol extensions), m is any word of length at most extra_states and w is taken from the
+    characterising set W of the hypothesis. If the target has at most extra_states more states than the
+    hypothesis, a hypothesis passing the whole suite is equivalent to the target
+
+    Words are generated lazily, shortest middle parts first, and the search stops at the first counterexample
+    """
+
+    def __init__(self, extra_states=1):
+        self.extra_states = extra_states # Assumed bound on target states beyond those of the hypothesis
+        self.tests_run = 0
+
+    def key(self):
+        return f"{type(self).__name__}:{self.extra_states}"
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        access = hypothesis.access_sequences()
+        transition_cover = list(access.values()) + [p + a for p in access.values() for a in alphabet]
+        characterising = hypothesis.characterising_set()
+        seen = set()
+        for middle in middle_words(alphabet, self.extra_states):
+            for prefix in transition_cover:
+                for suffix in characterising:
+                    word = prefix + middle + suffix
+                    if word not in seen:
+                        seen.add(word)
+                        yield word
+
+
+class WpMethodOracle(WMethodOracle):
+    """
+    Wp-method: the W-method guarantee with a smaller suite
+
+    Phase one tests the state cover Q with the full characterising set W. Phase two only tests the remaining
+    transition cover words with the identifying set of the hypothesis state they reach - the suffixes of W
+    needed to tell that state apart from every other one
+    """
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        access = hypothesis.access_sequences()
+        state_cover = list(access.values())
+        transitions = [p + a for p in state_cover for a in alphabet if p + a not in state_cover]
+        characterising = hypothesis.characterising_set()
+        identifying = identifying_sets(hypothesis, list(access), characterising)
+        seen = set()
+        for middle in middle_words(alphabet, self.extra_states):
+            words = [prefix + middle + suffix for prefix in state_cover for suffix in characterising]
+            for prefix in transitions:
+                state = hypothesis.run(prefix + middle)
+                words.extend(prefix + middle + suffix for suffix in identifying.get(state, characterising))
+            for word in words:
+                if word not in seen:
+                    seen.add(word)
+                    yield word
+
+
+class RandomWordOracle(ConformanceOracle):
+    """
+    Sampling equivalence oracle for alphabets too large for complete suites
+
+    Tests up to max_tests random words whose length is geometrically distributed with the given mean. The
+    seed fixes the whole sequence of words drawn over a learning run, so runs are reproducible. Passing the
+    sample is no proof of equivalence - it only bounds how likely a wrong hypothesis survives
+    """
+
+    def __init__(self, max_tests=1000, mean_length=8, seed=0):
+        self.max_tests = max_tests # Test words per equivalence query
+        self.mean_length = mean_length
+        self.rng = random.Random(seed)
+        self.tests_run = 0
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        for _ in range(self.max_tests):
+            yield self.random_word(alphabet, self.mean_length)
+
+    def random_word(self, alphabet, mean_length):
+        # Geometric length: every further symbol is added with probability mean_length / (mean_length + 1)
+        symbols = []
+        while self.rng.random() < mean_length / (mean_length + 1):
+            symbols.append(self.rng.choice(alphabet))
+        return ''.join(symbols)
+
+
+class RandomWalkOracle(RandomWordOracle):
+    """
+    Random walk over the hypothesis that checks every word it passes through
+
+    Each step appends a random symbol and tests the extended word; with probability reset_probability the
+    walk restarts from the empty word. max_tests bounds the steps per equivalence query
+    """
+
+    def __init__(self, max_tests=1000, reset_probability=0.1, seed=0):
+        super().__init__(max_tests=max_tests, seed=seed)
+        self.reset_probability = reset_probability
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        word = ''
+        for _ in range(self.max_tests):
+            if self.rng.random() < self.reset_probability:
+                word = ''
+            word += self.rng.choice(alphabet)
+            yield word
+
+
+class RandomWMethodOracle(RandomWordOracle):
+    """
+    Randomised W-method: the access sequence of a random hypothesis state, a random infix of geometric
+    length and a random suffix of the characterising set
+
+    Aims the sample at telling states apart rather than at arbitrary words
+    """
+
+    def __init__(self, max_tests=1000, mean_length=3, seed=0):
+        super().__init__(max_tests=max_tests, mean_length=mean_length, seed=seed)
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        access = sorted(hypothesis.access_sequences().values(), key=lambda p: (len(p), p))
+        characterising = hypothesis.characterising_set()
+        for _ in range(self.max_tests):
+            yield self.rng.choice(access) + self.random_word(alphabet, self.mean_length) + \
+                self.rng.choice(characterising)
+
+
+class PACOracle(RandomWordOracle):
+    """
+    Angluin's PAC equivalence oracle - sample sizes follow from the accepted error instead of a search depth
+
+    Round i (the i-th hypothesis checked, from 1) draws ceil((ln(1/delta) + i ln 2) / epsilon) words from the
+    word distribution and passes the hypothesis when the target agrees on all of them. Round i fails to catch
+    a hypothesis with error above epsilon with probability at most delta / 2^i, so with probability at least
+    1 - delta the hypothesis that passes disagrees with the target on a set of words of probability at most
+    epsilon - guarantee() gives (epsilon, delta) once a hypothesis passed
+
+    Distributions: geometric (length geometric with mean_length) or uniform (length uniform from 0 to
+    max_word_length), symbols uniform over the alphabet. Words are evaluated batch_size at a time through
+    the teacher's test_queries, so a concurrent teacher runs a whole batch at once - the shortest disagreeing
+    word of the first failing batch is returned
+    """
+
+    def __init__(self, epsilon=0.05, delta=0.05, distribution="geometric", mean_length=8, max_word_length=16,
+                 batch_size=64, seed=0):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("PAC oracle needs epsilon and delta between 0 and 1")
+        if distribution not in ("geometric", "uniform"):
+            raise ValueError(f"Unknown word distribution: {distribution}")
+        super().__init__(mean_length=mean_length, seed=seed)
+        self.epsilon = epsilon # Accepted probability of a word the hypothesis gets wrong
+        self.delta = delta # Accepted probability that a hypothesis with larger error passes
+        self.distribution = distribution
+        self.max_word_length = max_word_length
+        self.batch_size = batch_size # Test words handed to the teacher at once
+        self.rounds = 0
+        self.passed = False # Whether the last checked hypothesis passed its sample
+
+    def sample_size(self, round_number):
+        return math.ceil((math.log(1 / self.delta) + round_number * math.log(2)) / self.epsilon)
+
+    def find_counterexample(self, teacher, hypothesis):
+        self.rounds += 1
+        self.passed = False
+        words = self.test_words(hypothesis)
+        while True:
+            batch = list(itertools.islice(words, self.batch_size))
+            if not batch:
+                self.passed = True
+                return None
+            self.tests_run += len(batch)
+            failing = [word for word, answer in zip(batch, teacher.test_queries(batch))
+                       if answer != hypothesis.accepts(word)]
+            if failing:
+                return min(failing, key=lambda word: (len(word), word))
+
+    def test_words(self, hypothesis):
+        alphabet = sorted(hypothesis.alphabet)
+        for _ in range(self.sample_size(max(self.rounds, 1))):
+            yield self.random_word(alphabet, self.mean_length) if self.distribution == "geometric" else \
+                ''.join(self.rng.choice(alphabet) for _ in range(self.rng.randint(0, self.max_word_length)))
+
+    def guarantee(self):
+        return (self.epsilon, self.delta) if self.passed else None
+
+
+def middle_words(alphabet, max_length):
+    # Every word of length at most max_length, shortest first
+    for length in range(max_length + 1):
+        for symbols in itertools.product(alphabet, repeat=length):
+            yield ''.join(symbols)
+
+def identifying_sets(hypothesis, states, characterising):
+    # State to the suffixes of the characterising set that separate it from every other reachable state
+    def accepts_from(state, suffix):
+        return hypothesis.run(suffix, state) in hypothesis.accept_states
+
+    identifying = {}
+    for state in states:
+        suffixes = ['']
+        for other in states:
+            if other != state and all(accepts_from(state, e) == accepts_from(other, e) for e in suffixes):
+                separating = next((e for e in characterising if accepts_from(state, e) != accepts_from(other, e)),
+                                  None)
+                if separating is not None:
+                    suffixes.append(separating)
+        identifying[state] = suffixes
+    return identifying
+
+ORACLES = {
+    'w': WMethodOracle,
+    'wp': WpMethodOracle,
+    'random_words': RandomWordOracle,
+    'random_walk': RandomWalkOracle,
+    'random_w': RandomWMethodOracle,
+    'pac': PACOracle,
+    'sharded': ShardedExhaustiveOracle,
+}
+
+def build_oracle(settings):
+    # Oracle described by the training.equivalence_oracle settings - None keeps the exhaustive depth search
+    # Settings the selected oracle does not take (those of the other methods) are ignored
+    if not settings or settings.get('method', "exhaustive") == "exhaustive":
+        return None
+    if settings['method'] not in ORACLES:
+        raise ValueError(f"Unknown equivalence oracle: {settings['method']}")
+    oracle_class = ORACLES[settings['method']]
+    parameters = inspect.signature(oracle_class).parameters
+    return oracle_class(**{key: value for key, value in settings.items() if key in parameters})
@@ -0,0 +1,255 @@
+# L# LEARNING ON AN OBSERVATION TREE
+
+from collections import deque
+from angluin import BudgetExhausted
+from dfa import DFA
+
+# OBSERVATION TREE CLASS DEFINITION
+
+class ObservationTreeNode:
+    """
+    Single node of the observation tree - represents the word spelled along the path from the root
+
+    Output remains None until that exact word has been answered by a membership query
+    """
+
+    def __init__(self, access):
+        self.access = access # Word leading from the root to this node
+        self.output = None # Membership answer for the access word, if known
+        self.children = {} # Symbol to child node
+
+
+class ObservationTree:
+    """
+    Prefix tree storing every membership query answered so far
+
+    Replaces the S x E rectangle of the observation table - only words that were actually asked are
+    stored, and two nodes are distinguished (apart) as soon as any common extension of both has
+    differing answers
+    """
+
+    def __init__(self, alphabet):
+        self.alphabet = alphabet
+        self.root = ObservationTreeNode('')
+        self.size = 1
+
+    def get_node(self, word, node=None):
+        # Node for the given word (read from node, the root by default), or None if not in the tree
+        node = self.root if node is None else node
+        for symbol in word:
+            node = node.children.get(symbol)
+            if node is None:
+                return None
+        return node
+
+    def add_word(self, word):
+        # Insert the path for the given word and return its final node
+        node = self.root
+        for symbol in word:
+            child = node.children.get(symbol)
+            if child is None:
+                child = ObservationTreeNode(node.access + symbol)
+                node.children[symbol] = child
+                self.size += 1
+            node = child
+        return node
+
+    def query(self, word, membership_query):
+        # Answer from the tree when known, otherwise ask the oracle once and record the answer
+        node = self.add_word(word)
+        if node.output is None:
+            node.output = membership_query(word)
+        return node.output
+
+    def apartness_witness(self, node1, node2):
+        # Shortest suffix on which both nodes have recorded, differing answers - None if not apart
+        queue = deque([(node1, node2, '')])
+        while queue:
+            n1, n2, suffix = queue.popleft()
+            if n1.output is not None and n2.output is not None and n1.output != n2.output:
+                return suffix
+            for symbol, c1 in n1.children.items():
+                c2 = n2.children.get(symbol)
+                if c2 is not None:
+                    queue.append((c1, c2, suffix + symbol))
+        return None
+
+    def is_apart(self, node1, node2):
+        return self.apartness_witness(node1, node2) is not None
+
+
+# L# LEARNER CLASS DEFINITION
+
+class LSharpLearner:
+    """
+    Implementation of the L# learning algorithm (Vaandrager et al., 2022)
+
+    States are identified through apartness on the observation tree rather than by equality of full
+    observation table rows - a basis of pairwise apart nodes forms the hypothesis states and every
+    frontier node (one-symbol extension of the basis) must be matched to exactly one basis node
+
+    Shares the Teacher interface with Learner, so query and symbol counts are directly comparable
+    """
+
+    def __init__(self, teacher, alphabet):
+        self.teacher = teacher
+        self.alphabet = sorted(alphabet)
+        self.tree = ObservationTree(self.alphabet)
+        self.basis = [self.tree.root]
+        self.hypothesis = None
+        self.state_access = {} # Hypothesis state name to access word of its basis node
+        self.verified = False # Whether the last hypothesis returned by learn() passed the equivalence query
+
+    def membership_query(self, word):
+        return self.tree.query(word, self.teacher.membership_query)
+
+    def learn(self):
+        # Execution of L# until hypothesis DFA is equivalent to target DFA, or until the query budget is spent
+        self.verified = False
+        try:
+            self.membership_query('')
+            while True:
+                self.stabilise()
+                hypothesis_dfa = self.construct_dfa()
+
+                # Conflicts with answers already in the tree are resolved without an equivalence query
+                counterexample = self.find_tree_conflict(hypothesis_dfa)
+                if counterexample is None:
+                    counterexample = self.teacher.equivalence_query(hypothesis_dfa)
+                    if counterexample is None:
+                        self.verified = True
+                        return hypothesis_dfa
+                self.process_counterexample(counterexample)
+        except BudgetExhausted as reason:
+            print(f"Query budget exhausted ({reason}) - returning unverified hypothesis")
+            if self.hypothesis is None:
+                # Single state that repeats the answer for the empty word, if it is known
+                self.hypothesis = DFA(states={"state_0"}, alphabet=set(self.alphabet),
+                    transition_function={("state_0", a): "state_0" for a in self.alphabet},
+                    start_state="state_0",
+                    accept_states={"state_0"} if self.tree.root.output else set())
+            return self.hypothesis
+
+    def stabilise(self):
+        # Apply extension, promotion and separation until every frontier node has one candidate
+        while True:
+            for node in list(self.basis):
+                for a in self.alphabet:
+                    self.membership_query(node.access + a)
+            if self.promote():
+                continue
+            if self.separate():
+                continue
+            return
+
+    def frontier(self):
+        # One-symbol extensions of basis nodes that are not basis nodes themselves
+        basis = set(self.basis)
+        children = [self.tree.get_node(a, node) for node in self.basis for a in self.alphabet]
+        return [child for child in children if child not in basis]
+
+    def candidates(self, node):
+        # Basis nodes the given node is not (yet) apart from
+        return [b for b in self.basis if not self.tree.is_apart(node, b)]
+
+    def promote(self):
+        # Frontier node apart from the whole basis is a new state
+        for node in self.frontier():
+            if not self.candidates(node):
+                self.basis.append(node)
+                return True
+        return False
+
+    def separate(self):
+        # Frontier node compatible with two basis nodes is queried on their witness
+        for node in self.frontier():
+            candidates = self.candidates(node)
+            if len(candidates) > 1:
+                witness = self.tree.apartness_witness(candidates[0], candidates[1])
+                self.membership_query(node.access + witness)
+                return True
+        return False
+
+    def construct_dfa(self):
+        # Constructs DFA from the basis and the unique candidate of every frontier node
+        state_names = {node: "state_" + str(i) for i, node in enumerate(self.basis)}
+        transition_function = {}
+        for node in self.basis:
+            for a in self.alphabet:
+                child = self.tree.get_node(a, node)
+                target = child if child in state_names else self.candidates(child)[0]
+                transition_function[(state_names[node], a)] = state_names[target]
+
+        self.state_access = {name: node.access for node, name in state_names.items()}
+        self.hypothesis = DFA(states=set(state_names.values()), alphabet=set(self.alphabet),
+            transition_function=transition_function,
+            start_state=state_names[self.tree.root],
+            accept_states={name for node, name in state_names.items() if node.output})
+        return self.hypothesis
+
+    def run_hypothesis(self, word):
+        # Hypothesis state reached by the given word
+        state = self.hypothesis.start_state
+        for symbol in word:
+            state = self.hypothesis.transition_function.get((state, symbol), state)
+        return state
+
+    def find_tree_conflict(self, hypothesis_dfa):
+        # Any recorded answer the hypothesis disagrees with is a free counterexample
+        queue = deque([(self.tree.root, hypothesis_dfa.start_state)])
+        while queue:
+            node, state = queue.popleft()
+            if node.output is not None and node.output != (state in hypothesis_dfa.accept_states):
+                return node.access
+            for symbol, child in node.children.items():
+                next_state = hypothesis_dfa.transition_function.get((state, symbol))
+                if next_state is not None:
+                    queue.append((child, next_state))
+        return None
+
+    def process_counterexample(self, counterexample):
+        """
+        Binary search (Rivest & Schapire) for the split point at which the hypothesis goes wrong
+
+        Word i replaces the first i symbols of the counterexample by the access word of the hypothesis
+        state they lead to - word 0 is the counterexample itself and the last word is answered exactly
+        as the hypothesis predicts, so two adjacent words must disagree. Both words end up in the tree,
+        leaving a frontier node apart from the basis node it was matched to
+        """
+        if self.membership_query(counterexample) == self.hypothesis.accepts(counterexample):
+            return
+
+        def split_answer(i):
+            access = self.state_access[self.run_hypothesis(counterexample[:i])]
+            return self.membership_query(access + counterexample[i:])
+
+        target = split_answer(0)
+        low, high = 0, len(counterexample)
+        while high - low > 1:
+            mid = (low + high) // 2
+            if split_answer(mid) == target:
+                low = mid
+            else:
+                high = mid
+
+
+def learn_dfa(teacher, system_alphabet):
+    """
+    Learns the DFA using the L# learner in place of the observation table based Learner
+    """
+    learner = LSharpLearner(teacher, system_alphabet)
+    iteration = 0
+
+    while True:
+        iteration += 1
+        dfa = learner.learn()
+        if not learner.verified:
+            return dfa, iteration, learner.tree
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                return dfa, iteration, learner.tree
+
+            learner.process_counterexample(counterexample)
+        except BudgetExhausted:
+            return dfa, iteration, learner.tree
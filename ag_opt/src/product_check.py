@@ -0,0 +1,157 @@
+# EXACT PRODUCT CHECKING
+
+from collections import deque
+
+def shortest_trace(start, alphabet, successor, is_goal):
+    # Breadth-first search for the shortest (then alphabetically first) trace from start to a goal state -
+    # successor(state, symbol) gives None for a pruned move. Returns (trace, states explored), trace None if none
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        if is_goal(state):
+            trace = []
+            while parents[state] is not None:
+                state, symbol = parents[state]
+                trace.append(symbol)
+            return ''.join(reversed(trace)), len(parents)
+        for symbol in alphabet:
+            next_state = successor(state, symbol)
+            if next_state is not None and next_state not in parents:
+                parents[next_state] = (state, symbol)
+                queue.append(next_state)
+    return None, len(parents)
+
+class ProductExplorer:
+    """
+    On-the-fly search of the product of components and a property for a violating state
+
+    The product is never built: every DFA is compiled once to integer transition tables (states numbered from
+    0, -1 for the rejecting sink of missing transitions), a product state is a tuple of these ints and its
+    successors are generated one symbol at a time as the search reaches it. The search stops at the first
+    violating state it reaches
+
+    - check: violation (every component accepts, the property does not) or disagreement ("every component
+      accepts" differs from the property - the question the bounded verify loops ask)
+    - strategy: bfs finds a shortest (then alphabetically first) trace; dfs keeps only the current path on its
+      stack and often reaches a violation deep in the product sooner
+
+    States that can no longer lead to a violation are not expanded. states_visited counts the product states
+    reached, peak_visited the largest size of the visited set and peak_frontier that of the queue or stack
+    """
+
+    CHECKS = ("violation", "disagreement")
+    STRATEGIES = ("bfs", "dfs")
+
+    def __init__(self, components, property_dfa, alphabet, strategy="bfs", check="violation"):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        if check not in self.CHECKS:
+            raise ValueError(f"Unknown product check: {check}")
+        self.symbols = sorted(alphabet)
+        self.automata = [compile_dfa(dfa, self.symbols) for dfa in list(components) + [property_dfa]]
+        self.strategy = strategy
+        self.check = check
+        self.states_visited = 0
+        self.peak_visited = 0
+        self.peak_frontier = 0
+
+    def start(self):
+        return tuple(automaton[0] for automaton in self.automata)
+
+    def successors(self, state):
+        # Symbol index and product state after it, for every move that can still lead to a violation
+        for symbol in range(len(self.symbols)):
+            next_state = tuple(-1 if q < 0 else table[q][symbol] for (_, table, _), q in zip(self.automata, state))
+            if not self.dead(next_state):
+                yield symbol, next_state
+
+    def dead(self, state):
+        # A component in the sink can no longer accept - only a property that may still accept can disagree
+        if self.check == "violation":
+            return -1 in state[:-1]
+        return -1 in state[:-1] and state[-1] < 0
+
+    def violates(self, state):
+        components_accept = all(q >= 0 and accepting[q] for (_, _, accepting), q in zip(self.automata, state[:-1]))
+        _, _, accepting = self.automata[-1]
+        property_accepts = state[-1] >= 0 and accepting[state[-1]]
+        if self.check == "violation":
+            return components_accept and not property_accepts
+        return components_accept != property_accepts
+
+    def run(self):
+        # Trace to the first violation found, None when no reachable state violates
+        start = self.start()
+        if self.strategy == "bfs":
+            return self.breadth_first(start)
+        return self.depth_first(start)
+
+    def breadth_first(self, start):
+        parents = {start: None} # Visited states, each with the state and symbol index it was reached by
+        queue = deque([start])
+        try:
+            while queue:
+                self.peak_frontier = max(self.peak_frontier, len(queue))
+                state = queue.popleft()
+                if self.violates(state):
+                    trace = []
+                    while parents[state] is not None:
+                        state, symbol = parents[state]
+                        trace.append(self.symbols[symbol])
+                    return ''.join(reversed(trace))
+                for symbol, next_state in self.successors(state):
+                    if next_state not in parents:
+                        parents[next_state] = (state, symbol)
+                        queue.append(next_state)
+            return None
+        finally:
+            self.states_visited = self.peak_visited = len(parents)
+
+    def depth_first(self, start):
+        visited = {start}
+        path = [] # Symbol index taken from each state on the stack
+        stack = [(start, self.successors(start))]
+        try:
+            if self.violates(start):
+                return ''
+            while stack:
+                self.peak_frontier = max(self.peak_frontier, len(stack))
+                state, successors = stack[-1]
+                for symbol, next_state in successors:
+                    if next_state in visited:
+                        continue
+                    visited.add(next_state)
+                    path.append(symbol)
+                    if self.violates(next_state):
+                        return ''.join(self.symbols[symbol] for symbol in path)
+                    stack.append((next_state, self.successors(next_state)))
+                    break
+                else:
+                    stack.pop()
+                    if path:
+                        path.pop()
+            return None
+        finally:
+            self.states_visited = self.peak_visited = len(visited)
+
+
+def compile_dfa(dfa, symbols):
+    # (start, transition table, acceptance) over integer states - table[state][symbol index] is -1 for the sink
+    states = sorted(set(dfa.states) | {dfa.start_state} | set(dfa.transition_function.values()), key=str)
+    number = {state: i for i, state in enumerate(states)}
+    table = [tuple(number.get(dfa.transition_function.get((state, symbol)), -1) for symbol in symbols)
+             for state in states]
+    return number[dfa.start_state], table, [state in dfa.accept_states for state in states]
+
+def find_disagreement(components, reference, alphabet):
+    """
+    Shortest (then alphabetically first) word on which "every component accepts" differs from the reference DFA,
+    or None when they agree on every word - together with the number of product states explored
+
+    Decides exactly what comparing all(component.accepts(w)) with reference.accepts(w) over every word w decides,
+    by a breadth-first ProductExplorer search - the time is linear in the reachable product rather than
+    exponential in a word length. Missing transitions lead to the rejecting sink, as in DFA.accepts
+    """
+    explorer = ProductExplorer(components, reference, alphabet, strategy="bfs", check="disagreement")
+    return explorer.run(), explorer.states_visited
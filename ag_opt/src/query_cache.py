@@ -0,0 +1,73 @@
+# BOUNDED MEMBERSHIP QUERY CACHE
+
+from collections import OrderedDict
+
+MAX_SHARED_CACHES = 8 # Component caches kept per process - the least recently used one is dropped beyond this
+SHARED_CACHES = OrderedDict() # Component fingerprint to the cache shared by every teacher of that component
+
+class MembershipCache:
+    """
+    Bounded store of membership query answers placed in front of a membership oracle
+
+    Words repeated by table filling, counterexample processing and consistency fixes are answered from the
+    cache instead of reaching the system under test again. Once max_size answers are stored, the least
+    recently used (lru) or the oldest (fifo) answer is evicted - a max_size of None keeps every answer
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, max_size=None, policy="lru"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown cache eviction policy: {policy}")
+        self.max_size = max_size
+        self.policy = policy
+        self.answers = OrderedDict() # Word to membership answer, in eviction order
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, word):
+        # Cached answer for the word, or None when it has to be asked
+        answer = self.answers.get(word)
+        if answer is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == "lru":
+            self.answers.move_to_end(word)
+        return answer
+
+    def put(self, word, answer):
+        self.answers[word] = answer
+        self.answers.move_to_end(word)
+        while self.max_size is not None and len(self.answers) > self.max_size:
+            self.answers.popitem(last=False)
+            self.evictions += 1
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.answers)}
+
+
+def shared_cache(component, max_size=None, policy="lru"):
+    """
+    Returns the cache shared by all learners of the given component, creating it on first use
+
+    Caches are keyed by the component's fingerprint, so a changed component never sees answers recorded for
+    its previous version. At most MAX_SHARED_CACHES caches are kept, dropping the least recently used one.
+    Caches live per process - worker processes build their own
+    """
+    fingerprint = component.fingerprint()
+    cache = SHARED_CACHES.get(fingerprint)
+    if cache is None:
+        cache = SHARED_CACHES[fingerprint] = MembershipCache(max_size, policy)
+        while len(SHARED_CACHES) > MAX_SHARED_CACHES:
+            SHARED_CACHES.popitem(last=False)
+    elif (cache.max_size, cache.policy) != (max_size, policy):
+        raise ValueError(f"Shared cache already exists with max_size={cache.max_size} and policy={cache.policy}")
+    SHARED_CACHES.move_to_end(fingerprint)
+    return cache
+
+
+def discard_shared_cache(component):
+    # Drops the cache of a component version that is no longer in use
+    SHARED_CACHES.pop(component.fingerprint(), None)
@@ -0,0 +1,101 @@
+# MEMBERSHIP QUERY INFERENCE FOR CLOSED LANGUAGES
+
+class KnowledgeTrieNode:
+    """
+    Single node of a knowledge trie - represents the word spelled along the path from the root
+    """
+
+    def __init__(self):
+        self.children = {} # Symbol to child node
+        self.rejects_extensions = False # Word and every extension of it are known to be rejected
+        self.accepted_extension = False # Some known accepted word extends (or is) this word
+
+
+class KnowledgeTrie:
+    """
+    Prefix tree of answered words that only keeps what closure reasoning needs
+
+    A rejected word marks its node as rejecting every extension, an accepted word marks its whole path as
+    having an accepted extension
+    """
+
+    def __init__(self):
+        self.root = KnowledgeTrieNode()
+
+    def add_word(self, word):
+        # Insert the path for the given word and return every node along it, root first
+        node = self.root
+        path = [node]
+        for symbol in word:
+            node = node.children.setdefault(symbol, KnowledgeTrieNode())
+            path.append(node)
+        return path
+
+    def reject_extensions(self, word):
+        self.add_word(word)[-1].rejects_extensions = True
+
+    def accept_prefixes(self, word):
+        for node in self.add_word(word):
+            node.accepted_extension = True
+
+    def infer(self, word, accept_prefixes=True):
+        # False when a prefix of the word rejects its extensions, True when a known accepted word extends it
+        node = self.root
+        for symbol in word:
+            if node.rejects_extensions:
+                return False
+            node = node.children.get(symbol)
+            if node is None:
+                return None
+        if node.rejects_extensions:
+            return False
+        if accept_prefixes and node.accepted_extension:
+            return True
+        return None
+
+
+class ClosureInference:
+    """
+    Answers membership queries implied by earlier answers on components with declared closure properties
+
+    - prefix_closed: every prefix of an accepted word is accepted, so every extension of a rejected word is
+      rejected
+    - suffix_closed: every suffix of an accepted word is accepted, so a word with a rejected suffix is
+      rejected
+    - sink_prefixes: words known to lead into a rejecting sink, so all their extensions are rejected
+
+    Declarations are trusted, not checked - a wrong declaration yields wrong answers
+    """
+
+    def __init__(self, prefix_closed=False, suffix_closed=False, sink_prefixes=()):
+        self.prefix_closed = prefix_closed
+        self.suffix_closed = suffix_closed
+        self.forward = KnowledgeTrie() # Words as asked - prefix closure and sinks
+        self.backward = KnowledgeTrie() # Reversed words - suffix closure
+        for word in sink_prefixes:
+            self.forward.reject_extensions(word)
+        self.saved_queries = 0
+        self.saved_symbols = 0
+
+    def infer(self, word):
+        # Implied answer for the word, or None when it has to be asked
+        answer = self.forward.infer(word, accept_prefixes=self.prefix_closed)
+        if answer is None and self.suffix_closed:
+            answer = self.backward.infer(word[::-1])
+        if answer is not None:
+            self.saved_queries += 1
+            self.saved_symbols += len(word)
+        return answer
+
+    def record(self, word, answer):
+        # Learn from an answer given by the oracle
+        if self.prefix_closed:
+            if answer:
+                self.forward.accept_prefixes(word)
+            else:
+                self.forward.reject_extensions(word)
+        if self.suffix_closed:
+            if answer:
+                self.backward.accept_prefixes(word[::-1])
+            else:
+                self.backward.reject_extensions(word[::-1])
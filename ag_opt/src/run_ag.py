@@ -220,6 +220,8 @@ import tracemalloc
 import yaml
 import os
 from ag_reasoning import AssumeGuarantee
+from angluin import QueryBudget
+from answer_store import AnswerStore
 from dfa import DFA
 import hydra
 from omegaconf import DictConfig
@@ -247,12 +249,32 @@ def create_dfa(dfa_config):
     print(f"Transition Function: {transitions}")
     return DFA(states, alphabet, transitions, start_state, accept_states)
 
-def run_ag_reasoning(target_dfa, property_dfa, optimisation_method, search_depth, max_length, selective_threshold=0.5):
+def run_ag_reasoning(target_dfa, property_dfa, optimisation_method, search_depth, max_length, selective_threshold=0.5,
+                     counterexample_mode="prefix", parallel_workers=0, budget_limits=None, query_cache=None,
+                     closure=None, equivalence_oracle=None, counterexample_minimisation=None,
+                     answer_store=None, assumption_rule="component", property_check="bounded",
+                     search_strategy="bfs", enumeration=None):
     system_components = [target_dfa]
     system_alphabet = target_dfa.alphabet
     property_to_verify = property_dfa
 
-    ag = AssumeGuarantee(system_components, system_alphabet, property_to_verify, search_depth, max_length)
+    # A fresh budget per run, so every run gets the full query allowance and its own deadline
+    budget = QueryBudget(**budget_limits) if budget_limits and any(v is not None for v in budget_limits.values()) \
+        else None
+    query_cache = query_cache or {}
+    enumeration = enumeration or {}
+    # Opened per run, so every run commits its answers for the next one
+    store = AnswerStore(hydra.utils.to_absolute_path(answer_store['path']), answer_store.get('max_entries'),
+                        answer_store.get('batch_size', 256)) if answer_store and answer_store.get('path') else None
+    ag = AssumeGuarantee(system_components, system_alphabet, property_to_verify, search_depth, max_length,
+                         counterexample_mode=counterexample_mode, parallel_workers=parallel_workers, budget=budget,
+                         use_query_cache=query_cache.get('enabled', False), cache_size=query_cache.get('max_size'),
+                         cache_policy=query_cache.get('policy', "lru"),
+                         component_closures={0: closure} if closure and any(closure.values()) else None,
+                         oracle_settings=equivalence_oracle, shortening=counterexample_minimisation,
+                         answer_store=store, assumption_rule=assumption_rule, property_check=property_check,
+                         search_strategy=search_strategy, enumeration_workers=enumeration.get('workers', 0),
+                         shard_prefix_length=enumeration.get('prefix_length', 1))
     
     tracemalloc.start()
     start_time = time.time()
@@ -263,16 +285,34 @@ def run_ag_reasoning(target_dfa, property_dfa, optimisation_method, search_depth
     end_time = time.time()
     current, peak = tracemalloc.get_traced_memory()
     tracemalloc.stop()
+    if store is not None:
+        store.close()
     
-    return {
+    results = {
         'iterations': ag.total_iterations,
         'membership_queries': ag.total_membership_queries,
+        'membership_symbols': ag.total_membership_symbols,
         'equivalence_queries': ag.total_equivalence_queries,
+        'cache_hits': ag.total_cache_hits,
+        'inferred_queries': ag.total_inferred_queries,
+        'counterexample_symbols_saved': ag.total_symbols_saved,
+        'store_hits': ag.total_store_hits,
         'dfa_size': ag.hypothesis_dfa_size,
         'counterexamples_count': len(ag.counterexamples),  # Display count of counterexamples
+        'unverified_assumptions': len(ag.unverified_assumptions),
         'time_taken': end_time - start_time,
         'peak_memory': peak / 1024 / 1024
     }
+    confidence = ag.confidence()
+    if confidence is not None:
+        # PAC oracle: every assumption is epsilon-approximately correct with the given confidence
+        results['pac_error_bound'], results['pac_confidence'] = confidence
+    if property_check == "exact":
+        results['product_states_visited'] = ag.product_states
+        results['peak_visited_states'] = ag.peak_visited
+    if assumption_rule != "component":
+        results['property_holds'] = float(bool(ag.property_holds))
+    return results
 
 def average_results(results_list):
     avg_results = {}
@@ -287,6 +327,18 @@ def main(cfg: DictConfig):
     max_length = cfg.training.max_length
     num_runs = cfg.training.extend_runs
     selective_threshold = cfg.training.get("selective_threshold", 0.5)
+    counterexample_mode = cfg.training.get("counterexample_mode", "prefix")
+    parallel_workers = cfg.training.get("parallel_workers", 0)
+    budget_limits = dict(cfg.training.get("budget", {}))
+    query_cache = dict(cfg.training.get("query_cache", {}))
+    closure = dict(cfg.training.get("closure", {}))
+    equivalence_oracle = dict(cfg.training.get("equivalence_oracle", {}))
+    counterexample_minimisation = dict(cfg.training.get("counterexample_minimisation", {}))
+    answer_store = dict(cfg.training.get("answer_store", {}))
+    assumption_rule = cfg.training.get("assumption_rule", "component")
+    property_check = cfg.training.get("property_check", "bounded")
+    search_strategy = cfg.training.get("search_strategy", "bfs")
+    enumeration = dict(cfg.training.get("enumeration", {}))
 
     target_dfa_path = cfg.dfas.target_dfa
     property_dfa_path = cfg.dfas.property_dfa
@@ -314,24 +366,54 @@ def main(cfg: DictConfig):
     all_results_reuse = []
     all_results_selective = []
     all_results_minimised = []
+    all_results_lsharp = []
 
     for _ in range(num_runs):
-        results_reuse = run_ag_reasoning(target_dfa, property_dfa, "reuse", search_depth, max_length)
-        results_selective = run_ag_reasoning(target_dfa, property_dfa, "selective", search_depth, max_length, selective_threshold)
-        results_minimised = run_ag_reasoning(target_dfa, property_dfa, "minimised", search_depth, max_length)
+        results_reuse = run_ag_reasoning(target_dfa, property_dfa, "reuse", search_depth, max_length,
+                                         counterexample_mode=counterexample_mode, parallel_workers=parallel_workers,
+                                         budget_limits=budget_limits, query_cache=query_cache, closure=closure,
+                                         equivalence_oracle=equivalence_oracle,
+                                         counterexample_minimisation=counterexample_minimisation,
+                                         answer_store=answer_store, assumption_rule=assumption_rule,
+                                         property_check=property_check, search_strategy=search_strategy,
+                                         enumeration=enumeration)
+        results_selective = run_ag_reasoning(target_dfa, property_dfa, "selective", search_depth, max_length, selective_threshold,
+                                             budget_limits=budget_limits, query_cache=query_cache, closure=closure,
+                                             equivalence_oracle=equivalence_oracle,
+                                             counterexample_minimisation=counterexample_minimisation,
+                                             answer_store=answer_store, assumption_rule=assumption_rule,
+                                             property_check=property_check, search_strategy=search_strategy,
+                                             enumeration=enumeration)
+        results_minimised = run_ag_reasoning(target_dfa, property_dfa, "minimised", search_depth, max_length,
+                                             budget_limits=budget_limits, query_cache=query_cache, closure=closure,
+                                             equivalence_oracle=equivalence_oracle,
+                                             counterexample_minimisation=counterexample_minimisation,
+                                             answer_store=answer_store, assumption_rule=assumption_rule,
+                                             property_check=property_check, search_strategy=search_strategy,
+                                             enumeration=enumeration)
+        results_lsharp = run_ag_reasoning(target_dfa, property_dfa, "lsharp", search_depth, max_length,
+                                          budget_limits=budget_limits, query_cache=query_cache, closure=closure,
+                                          equivalence_oracle=equivalence_oracle,
+                                          counterexample_minimisation=counterexample_minimisation,
+                                          answer_store=answer_store, assumption_rule=assumption_rule,
+                                          property_check=property_check, search_strategy=search_strategy,
+                                          enumeration=enumeration)
         
         all_results_reuse.append(results_reuse)
         all_results_selective.append(results_selective)
         all_results_minimised.append(results_minimised)
+        all_results_lsharp.append(results_lsharp)
 
     avg_results_reuse = average_results(all_results_reuse)
     avg_results_selective = average_results(all_results_selective)
     avg_results_minimised = average_results(all_results_minimised)
+    avg_results_lsharp = average_results(all_results_lsharp)
 
     print("Summary of Results:")
     print(f"With Counterexample Reuse Optimisation: {avg_results_reuse}")
     print(f"With Selective Membership Query Optimisation: {avg_results_selective}")
     print(f"With Assumption Alphabet Minimisation Optimisation: {avg_results_minimised}")
+    print(f"With L# Observation Tree Learning: {avg_results_lsharp}")
 
 if __name__ == "__main__":
     main()
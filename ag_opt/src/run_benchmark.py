@@ -0,0 +1,100 @@
+# L* VERSUS L# LEARNER BENCHMARK
+
+import contextlib
+import functools
+import io
+import os
+import time
+from angluin import Learner, Teacher, create_dfa, load_dfa_config
+from dfa import generate_random_dfa
+from lsharp import LSharpLearner
+from async_teacher import AsyncSULTeacher
+from sul import LocalSimulator, SULTeacher
+import hydra
+from omegaconf import DictConfig
+
+LEARNERS = {
+    'lstar': Learner,
+    'lstar_lazy': functools.partial(Learner, counterexample_mode="suffix", lazy_table=True),
+    'lsharp': LSharpLearner,
+}
+
+def benchmark_learner(learner_class, target_dfa, search_depth, simulator=None):
+    """
+    Learns the target DFA once with the given learner class and reports its query costs
+
+    With simulator settings, the target is served by LocalSimulator processes and the resets and steps the
+    simulators executed are reported as well - with a concurrency above 1, that many simulators answer table
+    fills concurrently. Learner output is suppressed so that only the summary lines are printed
+    """
+    if simulator:
+        concurrency = simulator.get('concurrency', 1)
+        with contextlib.ExitStack() as stack:
+            suls = [stack.enter_context(LocalSimulator(target_dfa, simulator.get('latency', 0.0)))
+                    for _ in range(concurrency)]
+            if concurrency > 1:
+                teacher = AsyncSULTeacher(suls, target_dfa.alphabet, concurrency, simulator.get('timeout'),
+                                          simulator.get('retries', 0), depth=search_depth,
+                                          run_tree=simulator.get('run_tree', False))
+                stack.callback(teacher.close)
+            else:
+                teacher = SULTeacher(suls[0], target_dfa.alphabet, depth=search_depth,
+                                     run_tree=simulator.get('run_tree', False),
+                                     snapshot_cache_size=simulator.get('snapshot_cache_size', 0))
+            results = run_learner(learner_class, teacher, target_dfa.alphabet)
+        results.update({'resets': teacher.reset_count, 'steps': teacher.step_count,
+                        'resets_saved': teacher.resets_saved, 'steps_saved': teacher.steps_saved,
+                        'restores': teacher.restore_count})
+        return results
+    teacher = Teacher(target_dfa, depth=search_depth)
+    results = run_learner(learner_class, teacher, target_dfa.alphabet)
+    results['target_steps'] = teacher.target_step_count
+    return results
+
+def run_learner(learner_class, teacher, alphabet):
+    learner = learner_class(teacher, list(alphabet))
+
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        learned_dfa = learner.learn()
+    end_time = time.time()
+
+    return {
+        'membership_queries': teacher.membership_query_count,
+        'membership_symbols': teacher.membership_symbol_count,
+        'equivalence_queries': teacher.equivalence_query_count,
+        'dfa_size': len(learned_dfa.states),
+        'time_taken': end_time - start_time
+    }
+
+def benchmark_targets(cfg):
+    # Bundled DFA configurations followed by seeded random DFAs
+    project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    for dfa_key, dfa_relative_path in cfg.dfas.items():
+        if dfa_relative_path:
+            yield dfa_key, create_dfa(load_dfa_config(os.path.join(project_root, 'conf', dfa_relative_path)))
+
+    generated = cfg.benchmark.generated
+    for i in range(generated.count):
+        yield f"generated_{i}", generate_random_dfa(generated.num_states, generated.alphabet, seed=generated.seed + i)
+
+@hydra.main(config_path="../conf", config_name="config", version_base="1.1")
+def main(cfg: DictConfig):
+    search_depth = cfg.benchmark.search_depth
+    simulator = cfg.benchmark.get("simulator")
+    simulator = dict(simulator) if simulator and simulator.get("enabled", False) else None
+    totals = {name: {} for name in LEARNERS}
+
+    for target_key, target_dfa in benchmark_targets(cfg):
+        for name, learner_class in LEARNERS.items():
+            results = benchmark_learner(learner_class, target_dfa, search_depth, simulator)
+            for key, value in results.items():
+                totals[name][key] = totals[name].get(key, 0) + value
+            print(f"{target_key} ({name}): {results}")
+
+    print("Summary of Results:")
+    for name, results in totals.items():
+        print(f"{name}: {results}")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 # SELECTIVE MEMBERSHIP QUERY
 
 import random
-from angluin import Learner
+from angluin import BudgetExhausted, Learner
 
 # Function to selectively perform membership queries based on a threshold
 def selective_membership_query(query, membership_query, selective_threshold=0.5):
@@ -23,11 +23,16 @@ def learn_dfa(teacher, system_alphabet, selective_threshold=0.5):
     while True:
         iteration += 1
         dfa = learner.learn()
-        counterexample = teacher.find_counterexample(dfa)
-        if not counterexample:
+        if not learner.verified:
             return dfa, iteration, learner.table
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                return dfa, iteration, learner.table
 
-        process_counterexample(counterexample, learner.table, teacher.membership_query, selective_threshold)
+            process_counterexample(counterexample, learner.table, teacher.membership_query, selective_threshold)
+        except BudgetExhausted:
+            return learner.unverified_hypothesis(), iteration, learner.table
 
 # Function to process counterexamples found during learning with selective membership queries
 def process_counterexample(counterexample, table, membership_query, selective_threshold):
@@ -44,5 +49,6 @@ def process_counterexample(counterexample, table, membership_query, selective_th
         if prefix not in table.S:
             table.S.append(prefix)
             for e in table.E:
-                if selective_membership_query(prefix + e, membership_query, selective_threshold) is not None:
-                    table.T[(prefix, e)] = membership_query(prefix + e)
+                answer = selective_membership_query(prefix + e, membership_query, selective_threshold)
+                if answer is not None:
+                    table.T[(prefix, e)] = answer
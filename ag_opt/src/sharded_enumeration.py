@@ -0,0 +1,135 @@
+# SHARDED BOUNDED ENUMERATION
+
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from product_check import compile_dfa
+
+worker_automata = [] # Fixed automata of this worker process, compiled and shipped once by init_worker
+worker_cancel = None # Shared shard index - shards after it stop, as a counterexample was found before them
+
+def init_worker(automata, cancel):
+    global worker_automata, worker_cancel
+    worker_automata = automata
+    worker_cancel = cancel
+
+def search_shard(job):
+    """
+    Worker entry point - enumerates the words of one length that start with the shard prefix, in lexicographic
+    order, and returns the first on which "every component accepts" differs from the reference (the last
+    automaton). Returns (shard index, word or None, words checked)
+
+    Automata states are advanced along the current word only, so a word costs one step rather than a full run.
+    A word prefix on which a component and the reference are both in the sink is not extended
+    """
+    index, prefix, length, extra, symbols = job
+    automata = worker_automata + extra
+
+    def advance(state, symbol):
+        return tuple(-1 if q < 0 else table[q][symbol] for (_, table, _), q in zip(automata, state))
+
+    def dead(state):
+        return state[-1] < 0 and -1 in state[:-1]
+
+    def disagrees(state):
+        components_accept = all(q >= 0 and accepting[q] for (_, _, accepting), q in zip(automata, state[:-1]))
+        return components_accept != (state[-1] >= 0 and automata[-1][2][state[-1]])
+
+    state = tuple(start for start, _, _ in automata)
+    for symbol in prefix:
+        state = advance(state, symbol)
+    if dead(state):
+        return index, None, 0
+    checked = 0
+    path = list(prefix)
+    stack = [(state, iter(range(len(symbols))))] if len(prefix) < length else []
+    if not stack:
+        return index, (''.join(symbols[s] for s in path) if disagrees(state) else None), 1
+    while stack:
+        state, moves = stack[-1]
+        symbol = next(moves, None)
+        if symbol is None:
+            stack.pop()
+            if len(path) > len(prefix):
+                path.pop()
+            continue
+        next_state = advance(state, symbol)
+        if dead(next_state):
+            continue
+        path.append(symbol)
+        if len(path) < length:
+            stack.append((next_state, iter(range(len(symbols)))))
+            continue
+        checked += 1
+        if disagrees(next_state):
+            return index, ''.join(symbols[s] for s in path), checked
+        path.pop()
+        if checked % 4096 == 0 and worker_cancel.value < index:
+            return index, None, checked
+    return index, None, checked
+
+
+class ShardedEnumerator:
+    """
+    Bounded enumeration of every word up to a length, sharded by the first prefix_length symbols over a process
+    pool - for comparisons that have to stay bounded, such as black-box components
+
+    The fixed automata are compiled once and shipped to every worker when the pool starts; automata that change
+    between searches (hypotheses) travel with the shard jobs. Lengths are searched in turn, every length as one
+    job per prefix. Once a shard finds a word, the shards after it are cancelled - pending ones never start and
+    running ones stop at their next check - while the shards before it finish, so the result is the same
+    shortest, lexicographically smallest word a sequential search finds. words_checked counts the words tested
+    """
+
+    def __init__(self, automata, alphabet, workers=2, prefix_length=1):
+        self.symbols = sorted(alphabet)
+        self.fixed = [compile_dfa(dfa, self.symbols) for dfa in automata]
+        self.workers = workers
+        self.prefix_length = prefix_length # Symbols fixed per shard - |alphabet|^prefix_length shards per length
+        self.cancel = multiprocessing.Value('i', 0)
+        self.executor = None
+        self.futures = [] # Shard jobs of the length under search
+        self.words_checked = 0
+
+    def find(self, max_length, extra=(), min_length=1):
+        # First word, shortest then lexicographically smallest, of length min_length to max_length on which every
+        # automaton but the last (fixed automata, then extra ones) accepting differs from the last one accepting
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(self.fixed, self.cancel))
+        extra = [compile_dfa(dfa, self.symbols) for dfa in extra]
+        for length in range(min_length, max_length + 1):
+            prefixes = list(itertools.product(range(len(self.symbols)), repeat=min(self.prefix_length, length)))
+            self.cancel.value = len(prefixes)
+            self.futures = futures = [self.executor.submit(search_shard, (index, prefix, length, extra, self.symbols))
+                                      for index, prefix in enumerate(prefixes)]
+            found = {}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                index, word, checked = future.result()
+                self.words_checked += checked
+                if word is not None:
+                    found[index] = word
+                    with self.cancel.get_lock():
+                        self.cancel.value = min(self.cancel.value, index)
+                    for later in futures[index + 1:]:
+                        later.cancel()
+            if found:
+                return found[min(found)]
+        return None
+
+    def close(self):
+        # Shards that have not started are cancelled here - shutdown only takes cancel_futures from Python 3.9
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,367 @@
+# BLACK-BOX SYSTEMS UNDER TEST
+
+import argparse
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from angluin import Teacher
+from dfa import DFA
+
+class SUL(ABC):
+    """
+    System under test driven one symbol at a time - subclasses have to provide reset, step and output
+
+    - reset(): returns the system to its initial state
+    - step(symbol): applies one input symbol and returns whether the system now accepts
+    - output(): whether the system accepts in its current state, without applying an input
+
+    A membership query for a word is a reset followed by one step per symbol. Systems that can checkpoint
+    derive from SnapshotSUL instead
+    """
+
+    supports_snapshots = False
+
+    @abstractmethod
+    def reset(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def step(self, symbol):
+        raise NotImplementedError
+
+    @abstractmethod
+    def output(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SnapshotSUL(SUL):
+    """
+    SUL that can checkpoint - subclasses also have to provide save_state(), returning a token for the current
+    state, and restore_state(token), returning to it. release_state(token) frees a token and does nothing unless
+    overridden
+    """
+
+    supports_snapshots = True
+
+    @abstractmethod
+    def save_state(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def restore_state(self, token):
+        raise NotImplementedError
+
+    def release_state(self, token):
+        pass
+
+
+class DFASUL(SnapshotSUL):
+    """
+    In-process SUL simulated by a DFA, with an optional delay per reset, step, save and restore
+
+    A missing transition leads to a rejecting sink, as in DFA.accepts. Snapshot tokens are DFA states
+    """
+
+    def __init__(self, dfa, latency=0.0):
+        self.dfa = dfa
+        self.latency = latency # Seconds spent on every reset and step
+        self.state = dfa.start_state
+
+    def reset(self):
+        self.delay()
+        self.state = self.dfa.start_state
+
+    def step(self, symbol):
+        self.delay()
+        if self.state is not None:
+            self.state = self.dfa.transition_function.get((self.state, symbol))
+        return self.output()
+
+    def output(self):
+        return self.state in self.dfa.accept_states
+
+    def save_state(self):
+        self.delay()
+        return self.state
+
+    def restore_state(self, token):
+        self.delay()
+        self.state = token
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class SocketSUL(SnapshotSUL):
+    """
+    SUL reached over a line-based socket protocol: RESET, STEP <symbol> and OUTPUT, each answered with one
+    line (OK, 1 or 0), and SAVE (answered with a token), RESTORE <token> and RELEASE <token> for snapshots
+    """
+
+    def __init__(self, host, port):
+        self.connection = socket.create_connection((host, port))
+        self.stream = self.connection.makefile('rw')
+
+    def request(self, command):
+        self.stream.write(command + '\n')
+        self.stream.flush()
+        return self.stream.readline().strip()
+
+    def reset(self):
+        self.request("RESET")
+
+    def step(self, symbol):
+        return self.request(f"STEP {symbol}") == '1'
+
+    def output(self):
+        return self.request("OUTPUT") == '1'
+
+    def save_state(self):
+        return self.request("SAVE")
+
+    def restore_state(self, token):
+        self.request(f"RESTORE {token}")
+
+    def release_state(self, token):
+        self.request(f"RELEASE {token}")
+
+    def close(self):
+        self.stream.close()
+        self.connection.close()
+
+
+class LocalSimulator:
+    """
+    Stand-in for a remote simulator - serves a DFA from a separate process over a local socket
+
+    Use as a context manager: entering starts the process and returns a connected SocketSUL, leaving
+    closes the connection and stops the process. latency is added by the server to every command, so
+    the round trip of the socket plus the configured delay is what every reset and step costs
+    """
+
+    def __init__(self, dfa, latency=0.0):
+        self.dfa = dfa
+        self.latency = latency
+        self.process = None
+        self.sul = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen([sys.executable, __file__, '--latency', str(self.latency)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.process.stdin.write(json.dumps(self.dfa.to_compact()) + '\n')
+        self.process.stdin.flush()
+        port = int(self.process.stdout.readline())
+        self.sul = SocketSUL('127.0.0.1', port)
+        return self.sul
+
+    def __exit__(self, *exc_info):
+        self.sul.close()
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self.process.wait()
+
+
+class RunTreeNode:
+    """
+    Word executed on the SUL, spelled along the path from the root, with the output the SUL gave after it
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.children = {} # Symbol to the node of the extended word
+
+
+class RunTree:
+    """
+    Prefix tree of every run executed on a SUL - each step of a run records the output of one prefix, so any
+    prefix of an executed run is answered without touching the SUL
+    """
+
+    def __init__(self):
+        self.root = None # Set by the first reset, once the output of the empty word is known
+
+    def output(self, word):
+        # Recorded output after the word, or None when no executed run passed through it
+        node = self.root
+        for symbol in word:
+            if node is None:
+                return None
+            node = node.children.get(symbol)
+        return None if node is None else node.output
+
+    def record(self, prefix, suffix, outputs):
+        # Stores the outputs seen after every step of suffix, run from the already recorded prefix
+        node = self.root
+        for symbol in prefix:
+            node = node.children[symbol]
+        for symbol, output in zip(suffix, outputs):
+            node = node.children.setdefault(symbol, RunTreeNode(output))
+
+
+class SULTeacher(Teacher):
+    """
+    Teacher for a black-box SUL - membership and test queries become a reset plus one step per symbol
+
+    Budget, cache, closure inference, equivalence oracle and counterexample shortening work as for Teacher.
+    reset_count and step_count give the cost as the system under test sees it. The target is not visible,
+    so the white-box prefix-state memo is not available
+
+    With run_tree, every executed run is kept in a RunTree. A word that is a prefix of an earlier run is
+    answered from the tree - it neither reaches the SUL nor counts against the budget - and a word that
+    extends the run the SUL has just executed continues from where the SUL stands instead of resetting.
+    resets_saved and steps_saved count both kinds of savings
+
+    With a snapshot_cache_size and a SUL that supports snapshots, table cells arrive split into access
+    prefix and suffix (cell_query). The SUL state after each access prefix is saved in a bounded, least
+    recently used cache keyed by the prefix, and later cells of the same row restore it and only execute
+    their suffix
+    """
+
+    def __init__(self, sul, alphabet, depth=20, budget=None, cache=None, inference=None, oracle=None,
+                 shortener=None, run_tree=False, snapshot_cache_size=0):
+        if snapshot_cache_size and not sul.supports_snapshots:
+            raise ValueError("Snapshot cache requested for a SUL without snapshot support")
+        super().__init__(None, depth=depth, budget=budget, cache=cache, inference=inference,
+                         memoise=bool(snapshot_cache_size), oracle=oracle, shortener=shortener)
+        self.sul = sul
+        self.alphabet = set(alphabet)
+        self.run_tree = RunTree() if run_tree else None
+        self.position = None # Word the SUL has executed since its last reset, tracked with a run tree
+        self.snapshot_cache_size = snapshot_cache_size # Snapshots kept at most, 0 to never save one
+        self.snapshots = OrderedDict() # Access prefix to the token of the SUL state after it, in LRU order
+        self.restore_count = 0
+        self.reset_count = 0
+        self.step_count = 0
+        self.resets_saved = 0
+        self.steps_saved = 0
+
+    def input_alphabet(self):
+        return self.alphabet
+
+    def ask_target(self, string, split=None):
+        answer = self.tree_answer(string)
+        if answer is not None:
+            return answer
+        if self.budget is not None:
+            self.budget.charge(string)
+        self.membership_query_count += 1
+        self.membership_symbol_count += len(string)
+        return self.run_sul(string, split)
+
+    def test_query(self, string):
+        if self.budget is not None:
+            self.budget.check_deadline()
+        self.test_query_count += 1
+        answer = self.tree_answer(string)
+        return answer if answer is not None else self.run_sul(string)
+
+    def tree_answer(self, string):
+        # Output recorded for the word by an earlier run, if any
+        if self.run_tree is None:
+            return None
+        answer = self.run_tree.output(string)
+        if answer is not None:
+            self.resets_saved += 1
+            self.steps_saved += len(string)
+        return answer
+
+    def run_sul(self, string, split=None):
+        # Answers one word from a fresh reset - or from the end of the SUL's current run (run tree) or a saved
+        # snapshot of its access prefix (snapshot cache), whichever skips more steps
+        snapshot = None
+        if self.snapshot_cache_size and split:
+            snapshot = self.snapshots.get(string[:split])
+        if self.run_tree is not None and self.position is not None and string.startswith(self.position) \
+                and (snapshot is None or len(self.position) >= split):
+            start = len(self.position)
+        elif snapshot is not None:
+            self.sul.restore_state(snapshot)
+            self.snapshots.move_to_end(string[:split])
+            self.restore_count += 1
+            start = split
+        else:
+            start = None
+            self.sul.reset()
+            self.reset_count += 1
+            if self.run_tree is not None and self.run_tree.root is None:
+                self.run_tree.root = RunTreeNode(self.sul.output())
+        if start is None:
+            start = 0
+        else:
+            self.resets_saved += 1
+            self.steps_saved += start
+
+        outputs = []
+        for i in range(start, len(string)):
+            if i == split:
+                self.take_snapshot(string[:split])
+            outputs.append(self.sul.step(string[i]))
+        if split == len(string) and start < split:
+            self.take_snapshot(string)
+        self.step_count += len(string) - start
+
+        if self.run_tree is not None:
+            self.run_tree.record(string[:start], string[start:], outputs)
+            self.position = string
+        return outputs[-1] if outputs else self.sul.output()
+
+    def take_snapshot(self, prefix):
+        # Saves the SUL state reached by an access prefix, releasing the least recently used snapshot beyond the cap
+        if not self.snapshot_cache_size or not prefix or prefix in self.snapshots:
+            return
+        self.snapshots[prefix] = self.sul.save_state()
+        while len(self.snapshots) > self.snapshot_cache_size:
+            _, token = self.snapshots.popitem(last=False)
+            self.sul.release_state(token)
+
+
+def serve(latency):
+    # Simulator process: reads a compact DFA from stdin, prints its port and serves one connection
+    dfa = DFA.from_compact(json.loads(sys.stdin.readline()))
+    sul = DFASUL(dfa, latency)
+    snapshots = {} # Token handed out by SAVE to the saved state
+    tokens = itertools.count()
+    with socket.socket() as server:
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        print(server.getsockname()[1], flush=True)
+        connection, _ = server.accept()
+        with connection, connection.makefile('rw') as stream:
+            for line in stream:
+                command, _, argument = line.strip().partition(' ')
+                if command == "RESET":
+                    sul.reset()
+                    reply = "OK"
+                elif command == "STEP":
+                    reply = '1' if sul.step(argument) else '0'
+                elif command == "OUTPUT":
+                    reply = '1' if sul.output() else '0'
+                elif command == "SAVE":
+                    token = next(tokens)
+                    snapshots[token] = sul.save_state()
+                    reply = str(token)
+                elif command == "RESTORE":
+                    sul.restore_state(snapshots[int(argument)])
+                    reply = "OK"
+                elif command == "RELEASE":
+                    snapshots.pop(int(argument), None)
+                    reply = "OK"
+                else:
+                    break
+                stream.write(reply + '\n')
+                stream.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local DFA simulator serving the SUL socket protocol")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every command")
+    serve(parser.parse_args().latency)
@@ -0,0 +1,1243 @@
+# test_ag_opt.py
+import itertools
+import os
+import tempfile
+import time
+import unittest
+from ag_reasoning import AssumeGuarantee, learn_with_method
+from angluin import DFA, Learner, ObservationTable, QueryBudget, Teacher
+from answer_store import AnswerStore
+from counterexample_minimisation import CounterexampleShortener
+from dfa import generate_random_dfa
+from equivalence_oracles import (ConformanceOracle, PACOracle, RandomWalkOracle, RandomWMethodOracle,
+                                 RandomWordOracle, ShardedExhaustiveOracle, WMethodOracle, WpMethodOracle,
+                                 build_oracle)
+from product_check import ProductExplorer, find_disagreement
+from sharded_enumeration import ShardedEnumerator
+from lsharp import LSharpLearner, learn_dfa as learn_dfa_lsharp
+from query_cache import MAX_SHARED_CACHES, SHARED_CACHES, MembershipCache, shared_cache
+from query_inference import ClosureInference
+from selective_membership_query import process_counterexample as process_counterexample_selective
+from sul import DFASUL, SUL, LocalSimulator, SnapshotSUL, SULTeacher
+from async_teacher import AsyncSULTeacher
+from warm_start import learn_dfa as learn_dfa_warm, stale_word_filter
+from weakest_assumption import SymmetricAssumptionTeacher, WeakestAssumptionTeacher, project
+
+def create_dfa(dfa_config):
+    """
+    Create a DFA from a configuration dictionary, using the (state, symbol) transition keys DFA.accepts expects.
+
+    Args:
+        dfa_config (dict): The DFA configuration.
+
+    Returns:
+        DFA: The created DFA object.
+    """
+    transitions = {}
+    for state, mapping in dfa_config['transitions'].items():
+        for symbol, dest in mapping.items():
+            transitions[(state, symbol)] = dest
+    return DFA(set(dfa_config['states']), set(dfa_config['alphabet']), transitions,
+               dfa_config['start_state'], set(dfa_config['accept_states']))
+
+class TestLearners(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a DFA accepting words whose third-last symbol is 'a'.
+        """
+        self.dfa_config = {
+            'states': ['q0', 'q1', 'q2', 'q3'],
+            'alphabet': ['a', 'b'],
+            'start_state': 'q0',
+            'accept_states': ['q3'],
+            'transitions': {
+                'q0': {'a': 'q1', 'b': 'q0'},
+                'q1': {'a': 'q2', 'b': 'q2'},
+                'q2': {'a': 'q3', 'b': 'q3'},
+                'q3': {'a': 'q1', 'b': 'q0'}
+            }
+        }
+        self.dfa = create_dfa(self.dfa_config)
+
+    def test_lstar_learns_equivalent_dfa(self):
+        """
+        Test that L* terminates with an equivalent hypothesis when consistency needs a multi-symbol suffix.
+        """
+        teacher = Teacher(self.dfa, depth=6)
+        learned_dfa = Learner(teacher, self.dfa.alphabet).learn()
+        self.assertIsNone(teacher.find_counterexample(learned_dfa))
+
+    def test_selective_counterexample_queries_each_word_once(self):
+        """
+        Test that selective counterexample processing asks once per chosen cell and records that answer.
+        """
+        table = ObservationTable(self.dfa.alphabet)
+        table.E = ['', 'a']
+        asked = []
+
+        def membership_query(word):
+            asked.append(word)
+            return self.dfa.accepts(word)
+
+        process_counterexample_selective('abab', table, membership_query, 1.0)
+        self.assertEqual(len(asked), len(table.T))
+        for (s, e), answer in table.T.items():
+            self.assertEqual(answer, self.dfa.accepts(s + e))
+
+    def test_suffix_mode_skips_consistency(self):
+        """
+        Test that suffix counterexample mode learns an equivalent DFA without any consistency check.
+        """
+        for target in [self.dfa] + [generate_random_dfa(6, ['a', 'b', 'c'], seed=seed) for seed in range(5)]:
+            teacher = Teacher(target, depth=6)
+            learner = Learner(teacher, target.alphabet, counterexample_mode="suffix")
+            learner.table.is_consistent = lambda: self.fail("consistency check in suffix mode")
+            learned_dfa = learner.learn()
+            self.assertIsNone(teacher.find_counterexample(learned_dfa))
+            rows = [learner.table.get_row(s) for s in learner.table.S]
+            self.assertEqual(len(rows), len(set(rows)))
+
+    def test_lazy_table_queries_fewer_cells(self):
+        """
+        Test that the lazy table learns equivalent DFAs with fewer membership queries than eager filling.
+        """
+        query_counts = [0, 0]
+        for target in [self.dfa] + [generate_random_dfa(10, ['a', 'b', 'c'], seed=seed) for seed in range(5)]:
+            for lazy_table in (False, True):
+                for counterexample_mode in Learner.COUNTEREXAMPLE_MODES:
+                    teacher = Teacher(target, depth=6)
+                    learned_dfa = Learner(teacher, target.alphabet, counterexample_mode, lazy_table=lazy_table).learn()
+                    self.assertIsNone(teacher.find_counterexample(learned_dfa))
+                    if counterexample_mode == "suffix":
+                        query_counts[lazy_table] += teacher.membership_query_count
+        self.assertLess(query_counts[1], query_counts[0])
+
+    def test_memoised_teacher_takes_fewer_target_steps(self):
+        """
+        Test that the prefix-state memo and suffix matrix give the same answers with fewer target transitions.
+        """
+        for target in [self.dfa] + [generate_random_dfa(10, ['a', 'b', 'c'], seed=seed) for seed in range(5)]:
+            for counterexample_mode in Learner.COUNTEREXAMPLE_MODES:
+                teachers = [Teacher(target, depth=6, memoise=memoise) for memoise in (False, True)]
+                learned = [Learner(teacher, target.alphabet, counterexample_mode).learn() for teacher in teachers]
+                self.assertEqual(learned[0].to_compact(), learned[1].to_compact())
+                self.assertEqual(teachers[0].membership_query_count, teachers[1].membership_query_count)
+                self.assertLess(teachers[1].target_step_count, teachers[0].target_step_count)
+
+    def test_lsharp_learns_equivalent_dfa(self):
+        """
+        Test that L# learns an equivalent DFA on bundled and generated targets.
+        """
+        for target in [self.dfa] + [generate_random_dfa(6, ['a', 'b', 'c'], seed=seed) for seed in range(5)]:
+            teacher = Teacher(target, depth=6)
+            learned_dfa, iterations, tree = learn_dfa_lsharp(teacher, target.alphabet)
+            self.assertIsNone(teacher.find_counterexample(learned_dfa))
+            self.assertLessEqual(len(learned_dfa.states), len(target.states))
+            self.assertGreater(teacher.membership_symbol_count, 0)
+
+    def test_lsharp_never_repeats_queries(self):
+        """
+        Test that every membership query issued by L# is recorded in the observation tree exactly once.
+        """
+        teacher = Teacher(self.dfa, depth=6)
+        asked = []
+        membership_query = teacher.membership_query
+        teacher.membership_query = lambda word: asked.append(word) or membership_query(word)
+        LSharpLearner(teacher, self.dfa.alphabet).learn()
+        self.assertEqual(len(asked), len(set(asked)))
+
+class TestWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a generated component and a copy with one redirected transition.
+        """
+        self.dfa = generate_random_dfa(10, ['a', 'b', 'c'], seed=3)
+        transitions = dict(self.dfa.transition_function)
+        transitions[('q4', 'b')] = 'q0'
+        self.changed_dfa = DFA(self.dfa.states, self.dfa.alphabet, transitions, self.dfa.start_state,
+                               self.dfa.accept_states)
+        self.learned_dfa, _, self.table = learn_dfa_warm(Teacher(self.dfa, depth=6), self.dfa.alphabet)
+
+    def test_unchanged_component_needs_no_queries(self):
+        """
+        Test that warm-starting on an unchanged component reuses every previous answer.
+        """
+        teacher = Teacher(self.dfa, depth=6)
+        learn_dfa_warm(teacher, self.dfa.alphabet, previous_table=self.table,
+                       is_stale=stale_word_filter(self.dfa, self.dfa))
+        self.assertEqual(teacher.membership_query_count, 0)
+
+    def test_changed_component_relearns_correctly(self):
+        """
+        Test that warm-starting from a table or a hypothesis learns the changed component correctly.
+        """
+        cold_teacher = Teacher(self.changed_dfa, depth=6)
+        learn_dfa_warm(cold_teacher, self.dfa.alphabet)
+        for previous in ({'previous_table': self.table, 'is_stale': stale_word_filter(self.dfa, self.changed_dfa)},
+                         {'previous_hypothesis': self.learned_dfa}):
+            teacher = Teacher(self.changed_dfa, depth=6)
+            learned_dfa, _, _ = learn_dfa_warm(teacher, self.dfa.alphabet, **previous)
+            self.assertIsNone(teacher.find_counterexample(learned_dfa))
+            if 'previous_table' in previous:
+                self.assertLess(teacher.membership_query_count, cold_teacher.membership_query_count)
+
+    def test_alphabet_growth_keeps_answers(self):
+        """
+        Test that adding a symbol to a live learner keeps every answer and relearns the extended component.
+        """
+        small_dfa = DFA(self.dfa.states, {'a', 'b'},
+                        {key: dest for key, dest in self.dfa.transition_function.items() if key[1] != 'c'},
+                        self.dfa.start_state, self.dfa.accept_states)
+        teacher = Teacher(small_dfa, depth=6)
+        learner = Learner(teacher, small_dfa.alphabet)
+        learner.learn()
+        previous_answers = dict(learner.table.T)
+
+        teacher.target_dfa = self.dfa
+        self.assertEqual(learner.add_symbols(['c', 'a']), ['c'])
+        learned_dfa = learner.learn()
+        self.assertTrue(all(learner.table.T[cell] == answer for cell, answer in previous_answers.items()))
+        self.assertIsNone(teacher.find_counterexample(learned_dfa))
+        self.assertEqual(small_dfa.alphabet, {'a', 'b'})
+
+    def test_relearning_replaces_assumptions(self):
+        """
+        Test that relearning after a component change and an alphabet growth keeps one assumption per component.
+        """
+        small_dfa = DFA(self.dfa.states, {'a', 'b'},
+                        {key: dest for key, dest in self.dfa.transition_function.items() if key[1] != 'c'},
+                        self.dfa.start_state, self.dfa.accept_states)
+        ag = AssumeGuarantee([small_dfa], {'a', 'b'}, small_dfa, 6, 3, warm_start=True)
+        self.assertTrue(ag.learn_assumptions("none"))
+        ag.update_component(0, self.dfa)
+        self.assertTrue(ag.extend_alphabet({'c'}, "none"))
+        self.assertEqual(len(ag.assumptions), 1)
+        self.assertIsNone(Teacher(self.dfa, depth=6).find_counterexample(ag.assumptions[0]))
+
+    def test_suffix_mode_warm_start_keeps_prefix_closed_prefixes(self):
+        """
+        Test that dropping duplicate rows in suffix mode never drops the prefix of a prefix that stays.
+        """
+        for seed in range(20):
+            dfa = generate_random_dfa(10, ['a', 'b', 'c'], seed=seed)
+            _, _, table = learn_dfa_warm(Teacher(dfa, depth=6), dfa.alphabet)
+            transitions = dict(dfa.transition_function)
+            transitions[('q4', 'b')] = 'q0'
+            changed_dfa = DFA(dfa.states, dfa.alphabet, transitions, dfa.start_state, dfa.accept_states)
+            teacher = Teacher(changed_dfa, depth=6)
+            learner = Learner(teacher, dfa.alphabet, counterexample_mode="suffix")
+            learner.warm_start(previous_table=table, is_stale=stale_word_filter(dfa, changed_dfa))
+            self.assertTrue(all(s[:-1] in learner.table.S for s in learner.table.S if s))
+            rows = [learner.table.get_row(s) for s in learner.table.S]
+            self.assertEqual(len(rows), len(set(rows)))
+            self.assertIsNone(teacher.find_counterexample(learner.learn()))
+
+class TestQueryBudget(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a generated component that needs several equivalence rounds.
+        """
+        self.dfa = generate_random_dfa(10, ['a', 'b', 'c'], seed=2)
+
+    def test_budget_returns_unverified_hypothesis(self):
+        """
+        Test that query, symbol and time limits stop L* and L# with an unverified hypothesis within the budget.
+        """
+        for limits in ({'max_queries': 20}, {'max_symbols': 60}, {'max_seconds': 0}):
+            for learner_class in (Learner, LSharpLearner):
+                budget = QueryBudget(**limits)
+                teacher = Teacher(self.dfa, depth=6, budget=budget)
+                learner = learner_class(teacher, self.dfa.alphabet)
+                hypothesis = learner.learn()
+                self.assertFalse(learner.verified)
+                self.assertTrue(budget.exhausted)
+                self.assertIsInstance(hypothesis, DFA)
+                self.assertLessEqual(budget.queries, limits.get('max_queries', budget.queries))
+                self.assertLessEqual(budget.symbols, limits.get('max_symbols', budget.symbols))
+
+    def test_generous_budget_verifies(self):
+        """
+        Test that a budget which is never reached leaves learning unchanged.
+        """
+        teacher = Teacher(self.dfa, depth=6, budget=QueryBudget(max_queries=10 ** 6, max_seconds=600))
+        learner = Learner(teacher, self.dfa.alphabet)
+        learned_dfa = learner.learn()
+        self.assertTrue(learner.verified)
+        self.assertIsNone(teacher.find_counterexample(learned_dfa))
+
+    def test_shared_budget_marks_unverified_assumptions(self):
+        """
+        Test that AG learning finishes under a shared budget and reports which assumptions are unverified.
+        """
+        components = [self.dfa, generate_random_dfa(8, ['a', 'b', 'c'], seed=4)]
+        ag = AssumeGuarantee(components, {'a', 'b', 'c'}, self.dfa, 6, 3, budget=QueryBudget(max_queries=50))
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertEqual(len(ag.assumptions), 2)
+        self.assertIn(1, ag.unverified_assumptions)
+        self.assertLessEqual(ag.total_membership_queries, 50)
+
+    def test_parallel_learning_splits_budget(self):
+        """
+        Test that worker processes together stay within a shared budget and charge their use back to it.
+        """
+        components = [self.dfa, generate_random_dfa(8, ['a', 'b', 'c'], seed=4)]
+        budget = QueryBudget(max_queries=50)
+        ag = AssumeGuarantee(components, {'a', 'b', 'c'}, self.dfa, 6, 3, parallel_workers=2, budget=budget)
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertLessEqual(ag.total_membership_queries, 50)
+        self.assertEqual(budget.queries, ag.total_membership_queries)
+        self.assertTrue(budget.exhausted)
+
+    def test_exhausted_learner_uses_every_answer(self):
+        """
+        Test that the unverified hypothesis is rebuilt from the final table rather than the last refuted one.
+        """
+        for max_queries in (30, 60, 90):
+            teacher = Teacher(self.dfa, depth=6, budget=QueryBudget(max_queries=max_queries))
+            learner = Learner(teacher, self.dfa.alphabet)
+            hypothesis = learner.learn()
+            self.assertFalse(learner.verified)
+            representatives = learner.table.representatives()
+            self.assertEqual(len(hypothesis.states), len(representatives))
+            self.assertEqual({s for s in representatives if learner.table.get_value(s, '')},
+                             {learner.state_access[state] for state in hypothesis.accept_states})
+
+    def test_learn_loops_keep_answers_of_cut_round(self):
+        """
+        Test that learn_dfa loops cut inside counterexample processing return a hypothesis of the final table.
+        """
+        class LateTeacher(Teacher):
+            # Passes every hypothesis inside the learner, so counterexamples only reach the learn_dfa loops
+            def equivalence_query(self, hypothesis):
+                self.equivalence_query_count += 1
+                return None
+
+            def find_counterexample(self, hypothesis_dfa):
+                return Teacher(self.target_dfa, depth=6).find_counterexample(hypothesis_dfa)
+
+        exhausted = 0
+        for method in ("none", "reuse", "selective", "minimised"):
+            for max_queries in range(10, 80, 5):
+                teacher = LateTeacher(self.dfa, budget=QueryBudget(max_queries=max_queries))
+                dfa, _, table = learn_with_method(teacher, self.dfa.alphabet, method)
+                representatives = table.representatives()
+                self.assertEqual(len(dfa.states), len(representatives))
+                self.assertEqual(len(dfa.accept_states), sum(table.get_value(s, '') for s in representatives))
+                exhausted += teacher.budget.exhausted
+        self.assertGreater(exhausted, 0)
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a generated component and start without any shared caches.
+        """
+        self.dfa = generate_random_dfa(8, ['a', 'b', 'c'], seed=5)
+        SHARED_CACHES.clear()
+
+    def test_eviction_policies(self):
+        """
+        Test that a bounded cache evicts the least recently used or the oldest answer.
+        """
+        for policy, kept in (("lru", 'a'), ("fifo", 'b')):
+            cache = MembershipCache(max_size=2, policy=policy)
+            cache.put('a', True)
+            cache.put('b', False)
+            self.assertTrue(cache.get('a'))
+            cache.put('c', True)
+            self.assertEqual(set(cache.answers), {kept, 'c'})
+            self.assertEqual(cache.statistics(), {'hits': 1, 'misses': 0, 'evictions': 1, 'size': 2})
+
+    def test_cache_never_repeats_target_queries(self):
+        """
+        Test that a second learner sharing the cache learns the same DFA without reaching the target.
+        """
+        cache = MembershipCache()
+        teachers = [Teacher(self.dfa, depth=6, cache=cache) for _ in range(2)]
+        learned = [Learner(teacher, self.dfa.alphabet).learn() for teacher in teachers]
+        self.assertEqual(teachers[0].membership_query_count, len(cache.answers))
+        self.assertEqual(teachers[1].membership_query_count, 0)
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(sorted(learned[0].to_compact()['transitions']), sorted(learned[1].to_compact()['transitions']))
+
+    def test_cache_shared_across_assume_guarantee_runs(self):
+        """
+        Test that AG runs on the same component share one cache, while a changed component gets its own.
+        """
+        runs = [AssumeGuarantee([self.dfa], {'a', 'b', 'c'}, self.dfa, 6, 3, use_query_cache=True) for _ in range(2)]
+        for ag in runs:
+            self.assertTrue(ag.learn_assumptions("none"))
+        self.assertEqual(runs[1].total_membership_queries, 0)
+        self.assertEqual(len(SHARED_CACHES), 1)
+
+        transitions = dict(self.dfa.transition_function)
+        transitions[('q1', 'a')] = 'q0'
+        changed_dfa = DFA(self.dfa.states, self.dfa.alphabet, transitions, self.dfa.start_state, self.dfa.accept_states)
+        AssumeGuarantee([changed_dfa], {'a', 'b', 'c'}, changed_dfa, 6, 3, use_query_cache=True).learn_assumptions("none")
+        self.assertEqual(len(SHARED_CACHES), 2)
+
+    def test_shared_caches_are_bounded(self):
+        """
+        Test that shared caches are capped in number, released on component updates and reject conflicting settings.
+        """
+        components = [generate_random_dfa(4, ['a', 'b'], seed=seed) for seed in range(MAX_SHARED_CACHES + 2)]
+        for component in components:
+            shared_cache(component, 100)
+        self.assertEqual(len(SHARED_CACHES), MAX_SHARED_CACHES)
+        with self.assertRaises(ValueError):
+            shared_cache(components[-1], 200)
+
+        ag = AssumeGuarantee([self.dfa], {'a', 'b', 'c'}, self.dfa, 6, 3, use_query_cache=True)
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertIn(self.dfa.fingerprint(), SHARED_CACHES)
+        ag.update_component(0, components[0])
+        self.assertNotIn(self.dfa.fingerprint(), SHARED_CACHES)
+
+class TestClosureInference(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a prefix-closed component (every state accepting except a trap) and a language that is closed under
+        both prefixes and suffixes (no 'ab' factor).
+        """
+        dfa = generate_random_dfa(8, ['a', 'b', 'c'], seed=6)
+        transitions = dict(dfa.transition_function)
+        transitions.update({('q7', symbol): 'q7' for symbol in dfa.alphabet})
+        self.prefix_closed_dfa = DFA(dfa.states, dfa.alphabet, transitions, 'q0', dfa.states - {'q7'})
+        self.factor_closed_dfa = create_dfa({
+            'states': ['q0', 'q1', 'q2'],
+            'alphabet': ['a', 'b'],
+            'start_state': 'q0',
+            'accept_states': ['q0', 'q1'],
+            'transitions': {
+                'q0': {'a': 'q1', 'b': 'q0'},
+                'q1': {'a': 'q1', 'b': 'q2'},
+                'q2': {'a': 'q2', 'b': 'q2'}
+            }
+        })
+
+    def test_inference_saves_queries(self):
+        """
+        Test that declared closure properties answer queries without the oracle and leave learning unchanged.
+        """
+        for target, closure in ((self.prefix_closed_dfa, {'prefix_closed': True}),
+                                (self.factor_closed_dfa, {'suffix_closed': True})):
+            plain_teacher = Teacher(target, depth=6)
+            plain_dfa = Learner(plain_teacher, target.alphabet).learn()
+            inference = ClosureInference(**closure)
+            teacher = Teacher(target, depth=6, inference=inference)
+            learned_dfa = Learner(teacher, target.alphabet).learn()
+            self.assertEqual(sorted(learned_dfa.to_compact()['transitions']),
+                             sorted(plain_dfa.to_compact()['transitions']))
+            self.assertGreater(inference.saved_queries, 0)
+            self.assertEqual(teacher.membership_query_count + inference.saved_queries,
+                             plain_teacher.membership_query_count)
+
+    def test_declared_sink_saves_queries(self):
+        """
+        Test that a declared sink word answers every extension of it without the oracle.
+        """
+        target = self.prefix_closed_dfa
+        self.assertEqual(target.run('b'), 'q7')
+        plain_teacher = Teacher(target, depth=6)
+        plain_dfa = Learner(plain_teacher, target.alphabet).learn()
+        inference = ClosureInference(sink_prefixes=['b'])
+        teacher = Teacher(target, depth=6, inference=inference)
+        learned_dfa = Learner(teacher, target.alphabet).learn()
+        self.assertEqual(sorted(learned_dfa.to_compact()['transitions']), sorted(plain_dfa.to_compact()['transitions']))
+        self.assertGreater(inference.saved_queries, 0)
+        self.assertEqual(teacher.membership_query_count + inference.saved_queries, plain_teacher.membership_query_count)
+
+    def test_assume_guarantee_reports_inferred_queries(self):
+        """
+        Test that AG learning uses the closure declared for a component and reports the saved queries.
+        """
+        ag = AssumeGuarantee([self.prefix_closed_dfa], {'a', 'b', 'c'}, self.prefix_closed_dfa, 6, 3,
+                             component_closures={0: {'prefix_closed': True}})
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertGreater(ag.total_inferred_queries, 0)
+
+class TestParallelLearning(unittest.TestCase):
+
+    def test_parallel_matches_sequential(self):
+        """
+        Test that learning components in a process pool gives the same assumptions and counters as learning in turn.
+        """
+        components = [generate_random_dfa(num_states, ['a', 'b'], seed=num_states) for num_states in (3, 7, 5)]
+        results = []
+        for parallel_workers in (0, 2):
+            ag = AssumeGuarantee(list(components), {'a', 'b'}, components[0], 6, 3, parallel_workers=parallel_workers)
+            self.assertTrue(ag.learn_assumptions("none"))
+            results.append(([sorted(a.to_compact()['transitions']) for a in ag.assumptions],
+                            ag.total_membership_queries, ag.total_equivalence_queries))
+        self.assertEqual(results[0], results[1])
+
+    def test_parallel_workers_use_cache_and_closures(self):
+        """
+        Test that worker processes share the component caches and closure declarations of sequential learning.
+        """
+        SHARED_CACHES.clear()
+        components = [generate_random_dfa(num_states, ['a', 'b'], seed=num_states) for num_states in (3, 7, 5)]
+        # Prefix-closed version of the first component: every state accepting except a trap
+        transitions = dict(components[0].transition_function)
+        transitions.update({('q2', 'a'): 'q2', ('q2', 'b'): 'q2'})
+        components[0] = DFA(components[0].states, {'a', 'b'}, transitions, 'q0', {'q0', 'q1'})
+        runs = []
+        for _ in range(2):
+            ag = AssumeGuarantee(list(components), {'a', 'b'}, components[0], 6, 3, parallel_workers=2,
+                                 use_query_cache=True, component_closures={0: {'prefix_closed': True}})
+            self.assertTrue(ag.learn_assumptions("none"))
+            runs.append(ag)
+        self.assertGreater(runs[0].total_membership_queries, 0)
+        self.assertEqual(runs[1].total_membership_queries, 0)
+        self.assertGreater(runs[1].total_cache_hits, 0)
+        self.assertGreater(runs[0].total_inferred_queries, 0)
+
+class TestEquivalenceOracles(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up random targets that need several equivalence rounds to learn.
+        """
+        self.targets = [generate_random_dfa(8, ['a', 'b', 'c'], seed=seed) for seed in range(5)]
+
+    def test_conformance_oracles_learn_equivalent_dfas(self):
+        """
+        Test that L* with W-method and Wp-method oracles learns DFAs the exhaustive search cannot refute.
+        """
+        for target in self.targets:
+            for oracle in (WMethodOracle(extra_states=1), WpMethodOracle(extra_states=1)):
+                learned_dfa = Learner(Teacher(target, oracle=oracle), target.alphabet).learn()
+                self.assertIsNone(Teacher(target, depth=7).find_counterexample(learned_dfa))
+
+    def test_wp_suite_is_smaller_than_w_suite(self):
+        """
+        Test that the Wp-method refutes every wrong hypothesis the W-method refutes, with fewer test words.
+        """
+        hypothesis = generate_random_dfa(4, ['a', 'b', 'c'], seed=3)
+        w_words = list(WMethodOracle(extra_states=2).test_words(hypothesis))
+        wp_words = list(WpMethodOracle(extra_states=2).test_words(hypothesis))
+        self.assertLess(len(wp_words), len(w_words))
+        self.assertLess(len(w_words), sum(3 ** length for length in range(7)))
+        for target in self.targets:
+            teacher = Teacher(target)
+            w_found = WMethodOracle(extra_states=2).find_counterexample(teacher, hypothesis)
+            wp_found = WpMethodOracle(extra_states=2).find_counterexample(teacher, hypothesis)
+            self.assertEqual(w_found is None, wp_found is None)
+
+    def test_sampling_oracles_are_seeded_and_bounded(self):
+        """
+        Test that sampling oracles learn the targets, repeat their tests for a seed and stop at their test budget.
+        """
+        for oracle_class in (RandomWordOracle, RandomWalkOracle, RandomWMethodOracle):
+            for target in self.targets:
+                learned_dfa = Learner(Teacher(target, oracle=oracle_class(max_tests=2000, seed=1)), target.alphabet).learn()
+                self.assertIsNone(Teacher(target, depth=7).find_counterexample(learned_dfa))
+            hypothesis = generate_random_dfa(3, ['a', 'b', 'c'], seed=0)
+            words = [list(oracle_class(max_tests=50, seed=4).test_words(hypothesis)) for _ in range(2)]
+            self.assertEqual(words[0], words[1])
+            self.assertEqual(len(words[0]), 50)
+            teacher = Teacher(hypothesis)
+            self.assertIsNone(oracle_class(max_tests=50, seed=4).find_counterexample(teacher, hypothesis))
+            self.assertEqual(teacher.test_query_count, 50)
+
+    def test_learn_dfa_variants_check_each_hypothesis_once(self):
+        """
+        Test that the learn_dfa loops reuse the learner's verdict instead of searching its final hypothesis again.
+        """
+        target = self.targets[0]
+        for method, learner_class in (("none", Learner), ("reuse", Learner), ("selective", Learner),
+                                      ("minimised", Learner), ("lsharp", LSharpLearner)):
+            single = Teacher(target, depth=5)
+            learner_class(single, target.alphabet).learn()
+            teacher = Teacher(target, depth=5)
+            learn_with_method(teacher, target.alphabet, method)
+            self.assertEqual(teacher.test_query_count, single.test_query_count)
+            self.assertEqual(teacher.verdict_hit_count, 1)
+        teacher = Teacher(target, depth=5)
+        learn_dfa_warm(teacher, target.alphabet)
+        self.assertEqual(teacher.verdict_hit_count, 1)
+
+    def test_oracle_selected_from_settings(self):
+        """
+        Test that oracle settings build the configured oracle and that exhaustive search needs none.
+        """
+        self.assertIsNone(build_oracle({'method': "exhaustive"}))
+        self.assertIsInstance(build_oracle({'method': "wp", 'extra_states': 2}), WpMethodOracle)
+        oracle = build_oracle({'method': "random_walk", 'extra_states': 1, 'max_tests': 10, 'mean_length': 8,
+                               'reset_probability': 0.5, 'seed': 3})
+        self.assertEqual((oracle.max_tests, oracle.reset_probability), (10, 0.5))
+        with self.assertRaises(ValueError):
+            build_oracle({'method': "unknown"})
+        ag = AssumeGuarantee([self.targets[0]], {'a', 'b', 'c'}, self.targets[0], 6, 3,
+                             oracle_settings={'method': "w", 'extra_states': 1})
+        self.assertTrue(ag.learn_assumptions("none"))
+
+    def test_oracle_without_test_words_rejected(self):
+        """
+        Test that an oracle class without test_words cannot be instantiated.
+        """
+        class IncompleteOracle(ConformanceOracle):
+            def key(self):
+                return "incomplete"
+
+        with self.assertRaises(TypeError):
+            IncompleteOracle()
+
+    def test_pac_oracle_sample_sizes_and_confidence(self):
+        """
+        Test that the PAC oracle draws the derived sample per round, batches it and bounds every assumption.
+        """
+        oracle = PACOracle(epsilon=0.1, delta=0.05)
+        self.assertEqual([oracle.sample_size(i) for i in (1, 2, 10)], [37, 44, 100])
+        for distribution in ("geometric", "uniform"):
+            for target in self.targets:
+                oracle = PACOracle(epsilon=0.01, delta=0.01, distribution=distribution, max_word_length=10, seed=1)
+                teacher = Teacher(target, oracle=oracle)
+                learned_dfa = Learner(teacher, target.alphabet).learn()
+                self.assertIsNone(Teacher(target, depth=7).find_counterexample(learned_dfa))
+                self.assertEqual(oracle.guarantee(), (0.01, 0.01))
+                self.assertEqual(oracle.rounds, teacher.equivalence_query_count)
+                self.assertEqual(teacher.test_query_count, oracle.tests_run)
+                self.assertLessEqual(oracle.tests_run, sum(oracle.sample_size(i) for i in range(1, oracle.rounds + 1)))
+
+        wrong = DFA({'h'}, {'a', 'b', 'c'}, {('h', a): 'h' for a in 'abc'}, 'h', set())
+        oracle = PACOracle(epsilon=0.05, delta=0.05, batch_size=16)
+        counterexample = oracle.find_counterexample(Teacher(self.targets[0]), wrong)
+        self.assertTrue(self.targets[0].accepts(counterexample))
+        self.assertEqual(oracle.tests_run % 16, 0)
+        self.assertIsNone(oracle.guarantee())
+
+        settings = {'method': "pac", 'epsilon': 0.05, 'delta': 0.01, 'seed': 0}
+        ag = AssumeGuarantee(self.targets[:2], {'a', 'b', 'c'}, self.targets[0], 6, 3, oracle_settings=settings)
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertEqual(ag.confidence(), (0.05, 0.98))
+        self.assertIsNone(AssumeGuarantee(self.targets[:1], {'a', 'b', 'c'}, self.targets[0], 6, 3).confidence())
+
+class TestCounterexampleMinimisation(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up random targets and a wrong single-state hypothesis rejecting everything.
+        """
+        self.targets = [generate_random_dfa(8, ['a', 'b', 'c'], seed=seed) for seed in range(5)]
+        self.hypothesis = DFA({'h'}, {'a', 'b', 'c'}, {('h', a): 'h' for a in 'abc'}, 'h', set())
+
+    def test_shortened_counterexamples_still_refute(self):
+        """
+        Test that every stage keeps a counterexample and that delta debugging leaves no removable symbol.
+        """
+        for target in self.targets:
+            word = next(w for w in RandomWalkOracle(max_tests=5000, seed=2).test_words(self.hypothesis)
+                        if len(w) > 12 and target.accepts(w))
+            for stages in ((True, False, False), (False, True, False), (False, False, True), (True, True, True)):
+                shortener = CounterexampleShortener(*stages)
+                shortened = shortener.shorten(word, self.hypothesis, target.accepts)
+                self.assertTrue(target.accepts(shortened))
+                self.assertLessEqual(len(shortened), len(word))
+                self.assertEqual(shortener.symbols_saved, len(word) - len(shortened))
+                if stages[2]:
+                    for i in range(len(shortened)):
+                        self.assertFalse(target.accepts(shortened[:i] + shortened[i + 1:]))
+
+    def test_shortening_between_oracle_and_learner(self):
+        """
+        Test that learning with long random-walk counterexamples stays correct and reports the symbols saved.
+        """
+        shortener = CounterexampleShortener()
+        for target in self.targets:
+            teacher = Teacher(target, oracle=RandomWalkOracle(max_tests=3000, reset_probability=0.02, seed=1),
+                              shortener=shortener)
+            learned_dfa = Learner(teacher, target.alphabet).learn()
+            self.assertIsNone(Teacher(target, depth=7).find_counterexample(learned_dfa))
+        self.assertGreater(shortener.shortened, 0)
+        self.assertGreater(shortener.symbols_saved, shortener.shortened)
+
+class TestSystemUnderTest(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a random target whose learning needs several equivalence rounds.
+        """
+        self.target = generate_random_dfa(8, ['a', 'b', 'c'], seed=1)
+
+    def test_sul_teacher_matches_dfa_teacher(self):
+        """
+        Test that a SUL teacher learns the same DFA as a DFA teacher, paying one reset per query and one step per symbol,
+        and that a SUL without step and output cannot be instantiated.
+        """
+        dfa_teacher = Teacher(self.target, depth=5)
+        expected = Learner(dfa_teacher, self.target.alphabet).learn()
+        teacher = SULTeacher(DFASUL(self.target), self.target.alphabet, depth=5)
+        learned_dfa = Learner(teacher, self.target.alphabet).learn()
+        self.assertEqual(learned_dfa.to_compact(), expected.to_compact())
+        self.assertEqual(teacher.membership_query_count, dfa_teacher.membership_query_count)
+        self.assertEqual(teacher.reset_count, teacher.membership_query_count + teacher.test_query_count)
+        self.assertGreater(teacher.step_count, teacher.membership_symbol_count)
+
+        class IncompleteSUL(SUL):
+            def reset(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            IncompleteSUL()
+
+    def test_run_tree_saves_resets_and_steps(self):
+        """
+        Test that the run tree answers prefixes of executed runs and continues runs, with the same results.
+        """
+        plain = SULTeacher(DFASUL(self.target), self.target.alphabet, depth=4)
+        expected = Learner(plain, self.target.alphabet).learn()
+        for teacher in (SULTeacher(DFASUL(self.target), self.target.alphabet, depth=4, run_tree=True),
+                        AsyncSULTeacher([DFASUL(self.target) for _ in range(3)], self.target.alphabet, depth=4,
+                                        run_tree=True)):
+            learned_dfa = Learner(teacher, self.target.alphabet).learn()
+            self.assertEqual(learned_dfa.to_compact(), expected.to_compact())
+            self.assertLess(teacher.reset_count, plain.reset_count)
+            self.assertLess(teacher.step_count, plain.step_count)
+            self.assertLessEqual(teacher.reset_count + teacher.resets_saved, plain.reset_count)
+            self.assertGreater(teacher.steps_saved, 0)
+
+        teacher = SULTeacher(DFASUL(self.target), self.target.alphabet, run_tree=True)
+        self.assertEqual([teacher.test_query(word) for word in ('ab', 'abc', 'a', '')],
+                         [self.target.accepts(word) for word in ('ab', 'abc', 'a', '')])
+        self.assertEqual((teacher.reset_count, teacher.step_count), (1, 3))
+        self.assertEqual((teacher.resets_saved, teacher.steps_saved), (3, 3))
+
+    def test_snapshots_skip_prefix_replay(self):
+        """
+        Test that restoring snapshots of access prefixes gives the same DFA with fewer resets and steps.
+        """
+        target = self.target
+        plain = SULTeacher(DFASUL(target), target.alphabet, depth=4)
+        expected = Learner(plain, target.alphabet).learn()
+        for snapshot_cache_size in (3, 100):
+            teacher = SULTeacher(DFASUL(target), target.alphabet, depth=4, snapshot_cache_size=snapshot_cache_size)
+            learned_dfa = Learner(teacher, target.alphabet).learn()
+            self.assertEqual(learned_dfa.to_compact(), expected.to_compact())
+            self.assertGreater(teacher.restore_count, 0)
+            self.assertLess(teacher.reset_count, plain.reset_count)
+            self.assertLess(teacher.step_count, plain.step_count)
+            self.assertLessEqual(len(teacher.snapshots), snapshot_cache_size)
+
+        class PlainSUL(SUL):
+            def reset(self):
+                pass
+
+            def step(self, symbol):
+                return False
+
+            def output(self):
+                return False
+
+        with self.assertRaises(ValueError):
+            SULTeacher(PlainSUL(), target.alphabet, snapshot_cache_size=10)
+
+        class NoRestoreSUL(SnapshotSUL, PlainSUL):
+            def save_state(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            NoRestoreSUL()
+
+    def test_local_simulator_serves_queries(self):
+        """
+        Test that learning through the local simulator process yields an equivalent DFA, with snapshots.
+        """
+        with LocalSimulator(self.target, latency=0.0) as sul:
+            teacher = SULTeacher(sul, self.target.alphabet, depth=4, run_tree=True, snapshot_cache_size=10)
+            learned_dfa = Learner(teacher, self.target.alphabet).learn()
+        self.assertIsNone(Teacher(self.target, depth=7).find_counterexample(learned_dfa))
+        self.assertGreater(teacher.restore_count, 0)
+
+class TestAsyncTeacher(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a random target and a SUL that stalls on its first query.
+        """
+        self.target = generate_random_dfa(8, ['a', 'b', 'c'], seed=1)
+
+        class StallingSUL(DFASUL):
+            stalled = False
+
+            def reset(self):
+                if not StallingSUL.stalled:
+                    StallingSUL.stalled = True
+                    time.sleep(0.3)
+                super().reset()
+
+        self.stalling_sul = StallingSUL
+
+    def test_concurrent_fills_learn_the_same_dfa(self):
+        """
+        Test that concurrent table fills give the sequential hypothesis with no more queries, up to K in flight.
+        """
+        sequential = SULTeacher(DFASUL(self.target), self.target.alphabet, depth=4)
+        expected = Learner(sequential, self.target.alphabet).learn()
+        teacher = AsyncSULTeacher([DFASUL(self.target, latency=0.0005) for _ in range(6)], self.target.alphabet,
+                                  concurrency=4, depth=4)
+        learned_dfa = Learner(teacher, self.target.alphabet).learn()
+        teacher.close()
+        self.assertEqual(learned_dfa.to_compact(), expected.to_compact())
+        self.assertLessEqual(teacher.membership_query_count, sequential.membership_query_count)
+        self.assertEqual(teacher.peak_in_flight, 4)
+
+    def test_single_queries_run_on_the_pool(self):
+        """
+        Test that L# and lazy tables, which ask one word at a time, learn the sequential DFA through the pool.
+        """
+        for make_learner in (lambda teacher: LSharpLearner(teacher, self.target.alphabet),
+                             lambda teacher: Learner(teacher, self.target.alphabet, "suffix", lazy_table=True)):
+            expected = make_learner(SULTeacher(DFASUL(self.target), self.target.alphabet, depth=4)).learn()
+            teacher = AsyncSULTeacher([DFASUL(self.target) for _ in range(2)], self.target.alphabet, depth=4)
+            learned_dfa = make_learner(teacher).learn()
+            teacher.close()
+            self.assertEqual(learned_dfa.to_compact(), expected.to_compact())
+            self.assertEqual(teacher.reset_count, teacher.membership_query_count + teacher.test_query_count)
+
+    def test_test_word_batches_run_concurrently(self):
+        """
+        Test that a PAC oracle batch is answered by the SUL pool in one concurrent run.
+        """
+        teacher = AsyncSULTeacher([DFASUL(self.target, latency=0.002) for _ in range(4)], self.target.alphabet)
+        words = ['', 'ab', 'abc', 'ab', 'cca']
+        self.assertEqual(teacher.test_queries(words), [self.target.accepts(word) for word in words])
+        self.assertEqual(teacher.test_query_count, 5)
+        self.assertEqual(teacher.reset_count, 4)
+        self.assertGreater(teacher.peak_in_flight, 1)
+        teacher.close()
+
+    def test_timed_out_queries_are_retried(self):
+        """
+        Test that a stalled query is retried on another SUL and that the budget cut keeps every paid answer.
+        """
+        teacher = AsyncSULTeacher([self.stalling_sul(self.target), DFASUL(self.target)], self.target.alphabet,
+                                  timeout=0.05, retries=1, depth=4)
+        learned_dfa = Learner(teacher, self.target.alphabet).learn()
+        teacher.close()
+        self.assertEqual(teacher.retry_count, 1)
+        self.assertIsNone(Teacher(self.target, depth=7).find_counterexample(learned_dfa))
+
+        teacher = AsyncSULTeacher([DFASUL(self.target) for _ in range(3)], self.target.alphabet,
+                                  budget=QueryBudget(max_queries=10), depth=4)
+        learner = Learner(teacher, self.target.alphabet)
+        learner.learn()
+        teacher.close()
+        self.assertFalse(learner.verified)
+        self.assertEqual(len(learner.table.T), 10)
+
+    def test_failed_query_returns_every_sul(self):
+        """
+        Test that a query failing on its SUL leaves every SUL of the pool free for the next batch.
+        """
+        class FailingSUL(DFASUL):
+            def step(self, symbol):
+                if symbol == 'c':
+                    raise ConnectionError("SUL lost")
+                time.sleep(0.01)
+                return super().step(symbol)
+
+        teacher = AsyncSULTeacher([FailingSUL(self.target) for _ in range(3)], self.target.alphabet)
+        with self.assertRaises(ConnectionError):
+            teacher.test_queries(['ab', 'ba', 'c', 'abab', 'baba'])
+        self.assertEqual(len(teacher.idle), 3)
+        words = ['ab', 'ba', 'aab']
+        self.assertEqual(teacher.test_queries(words), [self.target.accepts(word) for word in words])
+        teacher.close()
+
+class TestAnswerStore(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a temporary store file and random components.
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "answers.sqlite")
+        self.components = [generate_random_dfa(num_states, ['a', 'b'], seed=num_states) for num_states in (4, 6)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_second_run_needs_almost_no_oracle_calls(self):
+        """
+        Test that a rerun on unchanged components is answered from disk, sequentially and in worker processes.
+        """
+        runs = []
+        for parallel_workers in (0, 0, 2):
+            store = AnswerStore(self.path, batch_size=16)
+            ag = AssumeGuarantee(list(self.components), {'a', 'b'}, self.components[0], 5, 3,
+                                 parallel_workers=parallel_workers, answer_store=store)
+            self.assertTrue(ag.learn_assumptions("none"))
+            store.close()
+            runs.append(ag)
+        self.assertGreater(runs[0].total_membership_queries, 0)
+        for ag in runs[1:]:
+            self.assertEqual(ag.total_membership_queries, 0)
+            self.assertGreater(ag.total_store_hits, 0)
+            self.assertEqual([a.to_compact() for a in ag.assumptions], [a.to_compact() for a in runs[0].assumptions])
+
+        changed = generate_random_dfa(5, ['a', 'b'], seed=9)
+        store = AnswerStore(self.path)
+        teacher = Teacher(changed, depth=5, store=store.component(changed))
+        learned_dfa = Learner(teacher, changed.alphabet).learn()
+        store.close()
+        plain = Teacher(changed, depth=5)
+        Learner(plain, changed.alphabet).learn()
+        self.assertIsNone(plain.find_counterexample(learned_dfa))
+        self.assertEqual(teacher.membership_query_count + teacher.store.hits, plain.membership_query_count)
+
+    def test_size_cap_compacts_oldest_answers(self):
+        """
+        Test that writes are batched and that compaction keeps only the newest answers within the cap.
+        """
+        store = AnswerStore(self.path, max_entries=10, batch_size=4)
+        view = store.component(self.components[0])
+        for i in range(3):
+            view.put('a' * i, True)
+        self.assertEqual(store.size(), 0)
+        self.assertTrue(view.get('aa'))
+        for i in range(3, 30):
+            view.put('a' * i, i % 2 == 0)
+        store.flush()
+        self.assertLessEqual(store.size(), 10)
+        self.assertGreater(store.compactions, 0)
+        self.assertIsNone(view.get(''))
+        self.assertFalse(view.get('a' * 29))
+        store.close()
+
+class TestWeakestAssumption(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up the input/output example: Output (send, out, ack) must only output after Input (in, send, ack)
+        took an input. A faulty Input may also send without any input.
+        """
+        def cycle(symbols, extra=()):
+            states = {f'q{i}' for i in range(len(symbols))}
+            transitions = {(f'q{i}', symbol): f'q{(i + 1) % len(symbols)}' for i, symbol in enumerate(symbols)}
+            transitions.update(extra)
+            return DFA(states, set(symbols), transitions, 'q0', set(states))
+
+        self.output = cycle('soa')
+        self.input = cycle('isa')
+        self.faulty_input = cycle('isa', {('q0', 's'): 'q2'})
+        self.property = cycle('io')
+
+    def in_composition(self, trace, components):
+        return all(component.accepts(project(trace, component.alphabet)) for component in components)
+
+    def test_property_proven_with_small_assumption(self):
+        """
+        Test that the learned interface assumption proves the property, which bounded search of the system confirms.
+        """
+        teacher = WeakestAssumptionTeacher(self.output, [self.input], self.property)
+        assumption = Learner(teacher, teacher.interface).learn()
+        self.assertEqual(teacher.outcome, "holds")
+        self.assertEqual(teacher.interface, {'i', 's', 'a'})
+        self.assertLessEqual(len(assumption.states), len(self.output.states) + len(self.input.states))
+        for length in range(8):
+            for symbols in itertools.product('ioas', repeat=length):
+                trace = ''.join(symbols)
+                if self.in_composition(trace, [self.output, self.input]):
+                    self.assertTrue(self.property.accepts(project(trace, self.property.alphabet)))
+
+    def test_real_violation_ends_learning(self):
+        """
+        Test that a faulty environment yields the shortest violating system trace instead of an assumption.
+        """
+        ag = AssumeGuarantee([self.output, self.faulty_input], {'i', 'o', 's', 'a'}, self.property, 5, 3,
+                             assumption_rule="weakest")
+        self.assertFalse(ag.verify("none"))
+        self.assertIs(ag.property_holds, False)
+        self.assertEqual(ag.violation, "so")
+        self.assertTrue(self.in_composition(ag.violation, [self.output, self.faulty_input]))
+        self.assertFalse(self.property.accepts(project(ag.violation, self.property.alphabet)))
+
+    def test_weakest_rule_through_assume_guarantee(self):
+        """
+        Test that the weakest rule decides the property with every learning method.
+        """
+        for method in ("none", "reuse", "selective", "lsharp"):
+            ag = AssumeGuarantee([self.output, self.input], {'i', 'o', 's', 'a'}, self.property, 5, 3,
+                                 assumption_rule="weakest")
+            self.assertTrue(ag.verify(method))
+            self.assertEqual(len(ag.assumptions), 1)
+            self.assertIsNone(ag.violation)
+        with self.assertRaises(ValueError):
+            AssumeGuarantee([self.output], {'a'}, self.property, 5, 3, assumption_rule="unknown")
+
+class TestSymmetricRule(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up a three-stage pipeline passing an input on to an output and acknowledging it back, and a faulty
+        middle stage that may pass on without having received anything.
+        """
+        def cycle(symbols, extra=()):
+            states = {f'q{i}' for i in range(len(symbols))}
+            transitions = {(f'q{i}', symbol): f'q{(i + 1) % len(symbols)}' for i, symbol in enumerate(symbols)}
+            transitions.update(extra)
+            return DFA(states, set(symbols), transitions, 'q0', set(states))
+
+        self.pipeline = [cycle('isa'), cycle('sta'), cycle('toa')]
+        self.faulty_pipeline = [cycle('isa'), cycle('sta', {('q0', 't'): 'q2'}), cycle('toa')]
+        self.property = cycle('io')
+
+    def test_symmetric_rule_proves_and_refutes(self):
+        """
+        Test that the symmetric rule proves the property of the pipeline and finds the shortest violation of the
+        faulty one.
+        """
+        ag = AssumeGuarantee(list(self.pipeline), {'i', 's', 't', 'o', 'a'}, self.property, 5, 3,
+                             assumption_rule="symmetric")
+        self.assertTrue(ag.verify("none"))
+        self.assertEqual(len(ag.assumptions), 3)
+        self.assertIsNone(ag.violation)
+        self.assertGreater(ag.product_states, 0)
+
+        ag = AssumeGuarantee(list(self.faulty_pipeline), {'i', 's', 't', 'o', 'a'}, self.property, 5, 3,
+                             assumption_rule="symmetric")
+        self.assertFalse(ag.verify("none"))
+        self.assertEqual(ag.violation, "to")
+        self.assertTrue(all(component.accepts(project(ag.violation, component.alphabet))
+                            for component in self.faulty_pipeline))
+        self.assertFalse(self.property.accepts(project(ag.violation, self.property.alphabet)))
+
+    def test_assumptions_learned_in_parallel(self):
+        """
+        Test that worker processes learn the same assumptions and reach the same verdict as learning in turn.
+        """
+        runs = []
+        for parallel_workers in (0, 3):
+            ag = AssumeGuarantee(list(self.faulty_pipeline), {'i', 's', 't', 'o', 'a'}, self.property, 5, 3,
+                                 parallel_workers=parallel_workers, assumption_rule="symmetric")
+            ag.verify("none")
+            runs.append(ag)
+        self.assertEqual([a.to_compact() for a in runs[0].assumptions], [a.to_compact() for a in runs[1].assumptions])
+        self.assertEqual(runs[0].violation, runs[1].violation)
+        self.assertEqual(runs[0].total_membership_queries, runs[1].total_membership_queries)
+
+    def test_exact_assumptions_match_weakest_assumption(self):
+        """
+        Test that every learned assumption agrees with the weakest assumption on all short interface words.
+        """
+        for index, component in enumerate(self.pipeline):
+            teacher = SymmetricAssumptionTeacher(component, self.pipeline[:index] + self.pipeline[index + 1:],
+                                                 self.property)
+            assumption = Learner(teacher, teacher.interface).learn()
+            for length in range(6):
+                for symbols in itertools.product(sorted(teacher.interface), repeat=length):
+                    word = ''.join(symbols)
+                    self.assertEqual(assumption.accepts(word), teacher.safe(teacher.reach(word)))
+
+class TestExactPropertyCheck(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up random components, their composition and a DFA counting a's up to six.
+        """
+        self.components = [generate_random_dfa(4, ['a', 'b'], seed=seed) for seed in range(3)]
+        self.composition = self.components[0].intersect(self.components[1]).intersect(self.components[2])
+        states = {f'c{i}' for i in range(7)}
+        transitions = {(f'c{i}', 'a'): f'c{min(i + 1, 6)}' for i in range(7)}
+        transitions.update({(f'c{i}', 'b'): f'c{i}' for i in range(7)})
+        self.counter = DFA(states, {'a', 'b'}, transitions, 'c0', {'c6'})
+
+    def brute_force(self, components, reference, max_length):
+        for length in range(max_length + 1):
+            for symbols in itertools.product('ab', repeat=length):
+                word = ''.join(symbols)
+                if all(c.accepts(word) for c in components) != reference.accepts(word):
+                    return word
+        return None
+
+    def test_shortest_disagreement_matches_enumeration(self):
+        """
+        Test that the product search finds exactly the shortest, alphabetically first word enumeration finds.
+        """
+        for seed in range(10):
+            reference = generate_random_dfa(5, ['a', 'b'], seed=seed + 10)
+            word, explored = find_disagreement(self.components, reference, {'a', 'b'})
+            self.assertEqual(word, self.brute_force(self.components, reference, 8))
+            self.assertLessEqual(explored, 4 ** 3 * 5 + 1)
+        word, _ = find_disagreement(self.components, self.composition, {'a', 'b'})
+        self.assertIsNone(word)
+
+    def test_exact_check_sees_beyond_max_length(self):
+        """
+        Test that exact checking refutes a property bounded checking up to max_length accepts.
+        """
+        ones = DFA({'u'}, {'a', 'b'}, {('u', a): 'u' for a in 'ab'}, 'u', {'u'})
+        # Accepts every word with fewer than six a's
+        almost = DFA(self.counter.states, {'a', 'b'}, self.counter.transition_function, 'c0',
+                     set(self.counter.states) - {'c6'})
+        bounded = AssumeGuarantee([ones], {'a', 'b'}, almost, 3, 4)
+        exact = AssumeGuarantee([ones], {'a', 'b'}, almost, 3, 4, property_check="exact")
+        self.assertTrue(bounded.verify_system_property())
+        self.assertFalse(exact.verify_system_property())
+        self.assertEqual(exact.disagreement, 'aaaaaa')
+        self.assertTrue(exact.verify_system_property_with_combined_assumptions(almost))
+        with self.assertRaises(ValueError):
+            AssumeGuarantee([ones], {'a', 'b'}, almost, 3, 4, property_check="unknown")
+
+    def test_exact_checks_through_learning(self):
+        """
+        Test that learned assumptions pass the exact individual and combined checks for a matching property.
+        """
+        ag = AssumeGuarantee(list(self.components), {'a', 'b'}, self.composition, 6, 3, property_check="exact")
+        self.assertTrue(ag.learn_assumptions("none"))
+        self.assertTrue(ag.verify_system_property())
+        self.assertTrue(ag.verify_system_property_with_combined_assumptions(ag.combine_assumptions()))
+        self.assertGreater(ag.product_states, 0)
+
+class TestProductExplorer(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up random components and random properties over a shared alphabet.
+        """
+        self.components = [generate_random_dfa(6, ['a', 'b', 'c'], seed=seed) for seed in range(4, 7)]
+        self.properties = [generate_random_dfa(5, ['a', 'b', 'c'], seed=seed) for seed in range(10, 20)]
+
+    def test_violations_found_by_both_strategies(self):
+        """
+        Test that BFS finds the shortest violation, that DFS finds a valid one, and that both agree when none exists.
+        """
+        for property_dfa in self.properties:
+            shortest = None
+            for length in range(7):
+                for symbols in itertools.product('abc', repeat=length):
+                    word = ''.join(symbols)
+                    if shortest is None and all(c.accepts(word) for c in self.components) and \
+                            not property_dfa.accepts(word):
+                        shortest = word
+            bfs = ProductExplorer(self.components, property_dfa, {'a', 'b', 'c'}, strategy="bfs")
+            dfs = ProductExplorer(self.components, property_dfa, {'a', 'b', 'c'}, strategy="dfs")
+            self.assertEqual(bfs.run(), shortest)
+            found = dfs.run()
+            self.assertEqual(found is None, shortest is None)
+            if found is not None:
+                self.assertTrue(all(c.accepts(found) for c in self.components))
+                self.assertFalse(property_dfa.accepts(found))
+
+        everything = DFA({'u'}, {'a', 'b', 'c'}, {('u', a): 'u' for a in 'abc'}, 'u', {'u'})
+        for strategy in ("bfs", "dfs"):
+            explorer = ProductExplorer(self.components, everything, {'a', 'b', 'c'}, strategy=strategy)
+            self.assertIsNone(explorer.run())
+            self.assertEqual(explorer.states_visited, explorer.peak_visited)
+            self.assertLessEqual(explorer.peak_visited, 6 ** 3 + 1)
+            self.assertGreater(explorer.peak_frontier, 0)
+
+    def test_search_stops_at_first_violation(self):
+        """
+        Test that a violation reachable early is found after visiting a small part of the product.
+        """
+        rejecting = DFA({'u'}, {'a', 'b', 'c'}, {('u', a): 'u' for a in 'abc'}, 'u', set())
+        full = ProductExplorer(self.components, DFA({'u'}, {'a', 'b', 'c'}, {('u', a): 'u' for a in 'abc'}, 'u',
+                                                    {'u'}), {'a', 'b', 'c'})
+        full.run()
+        for strategy in ("bfs", "dfs"):
+            explorer = ProductExplorer(self.components, rejecting, {'a', 'b', 'c'}, strategy=strategy)
+            word = explorer.run()
+            self.assertIsNotNone(word)
+            self.assertTrue(all(c.accepts(word) for c in self.components))
+            self.assertLess(explorer.states_visited, full.states_visited)
+        with self.assertRaises(ValueError):
+            ProductExplorer(self.components, rejecting, {'a'}, strategy="astar")
+
+    def test_disagreement_check_and_assume_guarantee(self):
+        """
+        Test that disagreement checks match find_disagreement and drive exact AssumeGuarantee checks with DFS.
+        """
+        for property_dfa in self.properties:
+            word, _ = find_disagreement(self.components, property_dfa, {'a', 'b', 'c'})
+            dfs = ProductExplorer(self.components, property_dfa, {'a', 'b', 'c'}, strategy="dfs", check="disagreement")
+            found = dfs.run()
+            self.assertEqual(found is None, word is None)
+            if found is not None:
+                self.assertNotEqual(all(c.accepts(found) for c in self.components), property_dfa.accepts(found))
+        ag = AssumeGuarantee(list(self.components), {'a', 'b', 'c'}, self.properties[0], 6, 3,
+                             property_check="exact", search_strategy="dfs")
+        self.assertFalse(ag.verify_system_property())
+        self.assertGreater(ag.peak_visited, 0)
+
+class TestShardedEnumeration(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up random components and random references over a shared alphabet.
+        """
+        self.components = [generate_random_dfa(5, ['a', 'b', 'c'], seed=seed) for seed in range(3)]
+        self.references = [generate_random_dfa(4, ['a', 'b', 'c'], seed=seed) for seed in range(20, 26)]
+
+    def first_disagreement(self, components, reference, max_length):
+        for length in range(1, max_length + 1):
+            for symbols in itertools.product('abc', repeat=length):
+                word = ''.join(symbols)
+                if all(c.accepts(word) for c in components) != reference.accepts(word):
+                    return word
+        return None
+
+    def test_sharded_search_matches_sequential_order(self):
+        """
+        Test that the sharded search reports the shortest, alphabetically first disagreement for any shard size.
+        """
+        for prefix_length in (1, 2):
+            with ShardedEnumerator(self.components, {'a', 'b', 'c'}, workers=2,
+                                   prefix_length=prefix_length) as enumerator:
+                for reference in self.references:
+                    self.assertEqual(enumerator.find(5, extra=[reference]),
+                                     self.first_disagreement(self.components, reference, 5))
+                agreeing = self.components[0].intersect(self.components[1]).intersect(self.components[2])
+                self.assertIsNone(enumerator.find(5, extra=[agreeing]))
+
+    def test_later_shards_cancelled(self):
+        """
+        Test that a counterexample in the first shard stops the search before every word is checked.
+        """
+        ones = DFA({'u'}, {'a', 'b', 'c'}, {('u', a): 'u' for a in 'abc'}, 'u', {'u'})
+        # Rejects only the words starting with 'a' of length eight
+        states = {f'q{i}' for i in range(9)} | {'r'}
+        transitions = {('q0', 'a'): 'q1', ('q0', 'b'): 'r', ('q0', 'c'): 'r'}
+        transitions.update({(f'q{i}', a): f'q{i + 1}' for i in range(1, 8) for a in 'abc'})
+        transitions.update({(s, a): 'r' for s in ('q8', 'r') for a in 'abc'})
+        reference = DFA(states, {'a', 'b', 'c'}, transitions, 'q0', states - {'q8'})
+        with ShardedEnumerator([ones, reference], {'a', 'b', 'c'}, workers=3) as enumerator:
+            self.assertEqual(enumerator.find(9), 'a' * 8)
+            self.assertLess(enumerator.words_checked, sum(3 ** length for length in range(1, 9)))
+
+    def test_sharded_oracle_learns_target(self):
+        """
+        Test that the sharded oracle learns an equivalent DFA with the counterexamples of the sequential search.
+        """
+        for reference in self.references[:3]:
+            oracle = ShardedExhaustiveOracle(workers=2)
+            try:
+                teacher = Teacher(reference, depth=6, oracle=oracle)
+                wrong = DFA({'h'}, {'a', 'b', 'c'}, {('h', a): 'h' for a in 'abc'}, 'h', set())
+                self.assertEqual(oracle.find_counterexample(teacher, wrong),
+                                 self.first_disagreement([wrong], reference, 6))
+                learned_dfa = Learner(teacher, reference.alphabet).learn()
+            finally:
+                oracle.close()
+            self.assertIsNone(Teacher(reference, depth=7).find_counterexample(learned_dfa))
+            self.assertEqual(teacher.test_query_count, oracle.tests_run)
+        self.assertIsInstance(build_oracle({'method': "sharded", 'workers': 3, 'seed': 0}), ShardedExhaustiveOracle)
+
+    def test_sharded_checks_in_assume_guarantee(self):
+        """
+        Test that sharded bounded checks give the verdicts and failing words of the sequential bounded checks.
+        """
+        for reference in self.references[:3]:
+            sequential = AssumeGuarantee(list(self.components), {'a', 'b', 'c'}, reference, 4, 4)
+            sharded = AssumeGuarantee(list(self.components), {'a', 'b', 'c'}, reference, 4, 4, enumeration_workers=2)
+            self.assertEqual(sharded.verify_system_property(), sequential.verify_system_property())
+            self.assertEqual(sharded.disagreement, self.first_disagreement(self.components, reference, 4))
+            self.assertTrue(sharded.verify_system_property_with_combined_assumptions(reference))
+
+if __name__ == '__main__':
+    unittest.main()
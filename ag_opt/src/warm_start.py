@@ -0,0 +1,81 @@
+# WARM-START RELEARNING AFTER A COMPONENT CHANGE
+
+from angluin import BudgetExhausted, Learner
+
+def stale_word_filter(previous_dfa, current_dfa):
+    """
+    Returns a predicate telling whether the answer for a word may differ between two versions of a component
+
+    A word is unaffected when its run on the current DFA only uses transitions that are identical in the
+    previous DFA and ends in a state whose acceptance did not change - such answers can be reused without
+    asking the oracle again
+    """
+    if previous_dfa.start_state != current_dfa.start_state:
+        return lambda word: True
+
+    def is_stale(word):
+        state = current_dfa.start_state
+        for symbol in word:
+            next_state = current_dfa.transition_function.get((state, symbol))
+            if next_state != previous_dfa.transition_function.get((state, symbol)):
+                return True
+            if next_state is None:
+                return False  # Both versions reject through a missing transition
+            state = next_state
+        return (state in current_dfa.accept_states) != (state in previous_dfa.accept_states)
+
+    return is_stale
+
+def learn_dfa(teacher, system_alphabet, previous_table=None, previous_hypothesis=None, is_stale=None,
+              counterexample_mode="prefix"):
+    """
+    Learns the DFA starting from a previous table or hypothesis rather than an empty observation table
+
+    Args:
+        teacher (Teacher): The teacher for the (possibly changed) component.
+        system_alphabet (set): The alphabet of the system.
+        previous_table (ObservationTable): Table of an earlier run, reused cell by cell.
+        previous_hypothesis (DFA): Earlier hypothesis, used for its access and distinguishing sequences.
+        is_stale (function): Predicate marking words whose previous answers must be queried again.
+        counterexample_mode (str): Learner counterexample handling, prefix or suffix.
+
+    Returns:
+        DFA: The learned DFA.
+        int: The number of iterations.
+        ObservationTable: The final observation table.
+    """
+    learner = Learner(teacher, system_alphabet, counterexample_mode)
+    iteration = 0
+    try:
+        learner.warm_start(previous_table, previous_hypothesis, is_stale)
+    except BudgetExhausted:
+        pass # learn() below returns its first hypothesis unverified
+
+    while True:
+        iteration += 1
+        dfa = learner.learn()
+        if not learner.verified:
+            return dfa, iteration, learner.table
+        try:
+            counterexample = teacher.find_counterexample(dfa)
+            if not counterexample:
+                return dfa, iteration, learner.table
+
+            if counterexample_mode == "suffix":
+                learner.handle_counterexample(counterexample)
+            else:
+                process_counterexample(counterexample, learner.table, teacher.membership_query)
+        except BudgetExhausted:
+            return learner.unverified_hypothesis(), iteration, learner.table
+
+def process_counterexample(counterexample, table, membership_query):
+    """
+    Processes the counterexample by updating the observation table
+    """
+    prefixes = [counterexample[:i] for i in range(1, len(counterexample) + 1)]
+    for prefix in prefixes:
+        if prefix not in table.S:
+            table.S.append(prefix)
+        for e in table.E:
+            if (prefix, e) not in table.T:
+                table.T[(prefix, e)] = membership_query(prefix + e)
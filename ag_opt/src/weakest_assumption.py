@@ -0,0 +1,254 @@
+# WEAKEST ASSUMPTION LEARNING
+
+from collections import deque
+from angluin import Teacher
+from product_check import shortest_trace
+
+def step(dfa, state, symbol):
+    # Move of one DFA in a parallel composition - symbols outside its alphabet leave it where it is, a missing
+    # transition leads to the rejecting sink None
+    if state is None or symbol not in dfa.alphabet:
+        return state
+    return dfa.transition_function.get((state, symbol))
+
+def project(trace, alphabet):
+    # Trace restricted to the symbols of an alphabet
+    return ''.join(symbol for symbol in trace if symbol in alphabet)
+
+
+class WeakestAssumptionTeacher(Teacher):
+    """
+    Teacher for the assume-guarantee rule of Cobleigh, Giannakopoulou and Pasareanu: from <A> M1 <P> and
+    <true> M2 <A> follows <true> M1 || M2 <P>
+
+    Components run in parallel - every symbol of a component's alphabet has to be accepted by it, symbols outside
+    it leave it unchanged - and the property is a language over its own alphabet that every trace of the system
+    must keep. The assumption A is learned over the interface alphabet (alphabet of M1 and P shared with M2);
+    its target is the weakest assumption - the interface words after which M1 cannot have violated P
+
+    - Membership: a word is in the weakest assumption when M1 || P_err, with the symbols outside the interface
+      hidden, cannot reach a state where M1 accepts and P does not. The set of product states reached by every
+      queried prefix is memoised, so a query extends its parent prefix by one symbol
+    - Conjectures: premise one searches M1 || P_err || A for a violation A allows, whose interface word is a
+      counterexample. Premise two searches M2 || A for a trace of the environment A rejects - if its interface
+      word is in the weakest assumption, A was too strong; otherwise M1 || M2 really violates P
+
+    Learning ends early, with outcome set, as soon as a conjecture passes both premises ("holds") or a real
+    violation is found ("violated", violation holding the shortest such trace of M1 || M2) - the assumption
+    only has to be as precise as that decision needs. product_states counts the states both premise searches
+    explored
+    """
+
+    def __init__(self, component, environment, property_dfa, budget=None, cache=None, interface=None):
+        super().__init__(None, budget=budget, cache=cache, memoise=False)
+        self.component = component # M1
+        self.environment = list(environment) # Components composed in parallel as M2
+        self.property_dfa = property_dfa
+        self.local_alphabet = component.alphabet | property_dfa.alphabet
+        self.environment_alphabet = set().union(*(dfa.alphabet for dfa in self.environment))
+        # Alphabet of the assumption - symbols of M1 and P that M2 takes part in unless given
+        self.interface = self.local_alphabet & (self.environment_alphabet if interface is None else set(interface))
+        self.hidden = sorted(self.local_alphabet - self.interface) # Symbols only M1 and P take part in
+        self.reached = {'': self.closure({(component.start_state, property_dfa.start_state)})}
+        self.outcome = None # "holds" or "violated" once a conjecture settles the property
+        self.violation = None # Shortest trace of M1 || M2 that violates the property
+        self.product_states = 0
+
+    def input_alphabet(self):
+        return self.interface
+
+    def violates(self, state):
+        # M1 || P_err state in which M1 accepts and the property does not
+        component_state, property_state = state
+        return component_state in self.component.accept_states and \
+            property_state not in self.property_dfa.accept_states
+
+    def local_step(self, state, symbol):
+        # M1 || P_err move - None once M1 can no longer accept, as no violation lies beyond it
+        component_state = step(self.component, state[0], symbol)
+        return None if component_state is None else (component_state, step(self.property_dfa, state[1], symbol))
+
+    def closure(self, states):
+        # Product states reachable through hidden symbols
+        states, queue = set(states), deque(states)
+        while queue:
+            state = queue.popleft()
+            for symbol in self.hidden:
+                next_state = self.local_step(state, symbol)
+                if next_state is not None and next_state not in states:
+                    states.add(next_state)
+                    queue.append(next_state)
+        return frozenset(states)
+
+    def advance(self, states, symbol):
+        # Product states reachable from a set of states by one interface symbol and any hidden symbols after it
+        return self.closure({next_state for next_state in (self.local_step(state, symbol) for state in states)
+                             if next_state is not None})
+
+    def reach(self, word):
+        # Product states reachable by the traces of M1 || P_err whose interface projection is the word
+        if word not in self.reached:
+            self.reached[word] = self.advance(self.reach(word[:-1]), word[-1])
+        return self.reached[word]
+
+    def safe(self, states):
+        # Whether a set of product states is reached only by traces that keep the property
+        return not any(self.violates(state) for state in states)
+
+    def ask_target(self, string, split=None):
+        if self.budget is not None:
+            self.budget.charge(string)
+        self.membership_query_count += 1
+        self.membership_symbol_count += len(string)
+        return self.safe(self.reach(string))
+
+    def check_hypothesis(self, hypothesis):
+        fingerprint = hypothesis.fingerprint()
+        if fingerprint in self.verdicts:
+            self.verdict_hit_count += 1
+            return self.verdicts[fingerprint]
+        if self.budget is not None:
+            self.budget.check_deadline()
+        counterexample = self.check_premises(hypothesis)
+        self.verdicts[fingerprint] = counterexample
+        return counterexample
+
+    def check_premises(self, hypothesis):
+        # Counterexample for the learner, or None once the conjecture settles the property
+        trace = self.premise_one(hypothesis)
+        if trace is not None:
+            return project(trace, self.interface)
+        trace = self.premise_two(hypothesis)
+        if trace is None:
+            self.outcome = "holds"
+            return None
+        word = project(trace, self.interface)
+        if self.membership_query(word):
+            return word
+        self.outcome = "violated"
+        self.violation = self.merge(word, trace)
+        return None
+
+    def premise_one(self, hypothesis):
+        # Shortest trace of M1 || P_err that the assumption allows and that ends in a violation
+        def successor(state, symbol):
+            local_state = self.local_step(state[1:], symbol)
+            assumption_state = step(hypothesis, state[0], symbol)
+            if local_state is None or assumption_state is None:
+                return None
+            return (assumption_state,) + local_state
+
+        start = (hypothesis.start_state, self.component.start_state, self.property_dfa.start_state)
+        trace, explored = shortest_trace(start, sorted(self.local_alphabet), successor,
+                                         lambda state: state[0] in hypothesis.accept_states and
+                                         self.violates(state[1:]))
+        self.product_states += explored
+        return trace
+
+    def premise_two(self, hypothesis):
+        # Shortest accepted trace of M2 whose interface projection the assumption rejects
+        def successor(state, symbol):
+            environment_states = tuple(step(dfa, q, symbol) for dfa, q in zip(self.environment, state[1:]))
+            if None in environment_states:
+                return None
+            return (step(hypothesis, state[0], symbol),) + environment_states
+
+        start = (hypothesis.start_state,) + tuple(dfa.start_state for dfa in self.environment)
+        trace, explored = shortest_trace(start, sorted(self.environment_alphabet), successor,
+                                         lambda state: state[0] not in hypothesis.accept_states and
+                                         all(q in dfa.accept_states for dfa, q in zip(self.environment, state[1:])))
+        self.product_states += explored
+        return trace
+
+    def merge(self, word, environment_trace):
+        # Trace of M1 || M2 violating the property: a violating trace of M1 || P_err over the same interface word,
+        # interleaved with the environment trace between interface symbols
+        return interleave(word, [(self.witness(word), self.interface), (environment_trace, self.interface)])
+
+    def witness(self, word):
+        # Shortest trace of M1 || P_err that ends in a violation and projects onto the interface word - None when
+        # the word is in the weakest assumption
+        def successor(state, symbol):
+            position, local_state = state[0], state[1:]
+            if symbol in self.interface:
+                if position == len(word) or word[position] != symbol:
+                    return None
+                position += 1
+            local_state = self.local_step(local_state, symbol)
+            return None if local_state is None else (position,) + local_state
+
+        start = (0, self.component.start_state, self.property_dfa.start_state)
+        trace, _ = shortest_trace(start, sorted(self.local_alphabet), successor,
+                                  lambda state: state[0] == len(word) and self.violates(state[1:]))
+        return trace
+
+
+class SymmetricAssumptionTeacher(WeakestAssumptionTeacher):
+    """
+    Teacher for the assumption of one component under the symmetric rule for n components: from <A_i> M_i <P>
+    for every i and L(coA_1 || ... || coA_n) within L(P), where coA_i is the complement of A_i, follows
+    <true> M_1 || ... || M_n <P>
+
+    The assumption is the weakest one of M_i, over the property alphabet plus the symbols M_i shares with the
+    other components - so it only depends on M_i and P, and the assumptions of all components can be learned
+    independently. Conjectures are compared with the weakest assumption itself, searching pairs of hypothesis
+    state and set of M_i || P_err states on the fly; a passing conjecture is exact, which makes any trace the
+    last premise finds a real violation (see find_symmetric_violation)
+    """
+
+    def __init__(self, component, others, property_dfa, budget=None, cache=None):
+        shared = component.alphabet & set().union(*(dfa.alphabet for dfa in others))
+        super().__init__(component, others, property_dfa, budget=budget, cache=cache,
+                         interface=property_dfa.alphabet | shared)
+
+    def check_premises(self, hypothesis):
+        def successor(state, symbol):
+            return step(hypothesis, state[0], symbol), self.advance(state[1], symbol)
+
+        trace, explored = shortest_trace((hypothesis.start_state, self.reach('')), sorted(self.interface), successor,
+                                         lambda state: (state[0] in hypothesis.accept_states) != self.safe(state[1]))
+        self.product_states += explored
+        return trace
+
+
+def find_symmetric_violation(teachers, assumptions, property_dfa):
+    # Last premise of the symmetric rule - shortest trace every assumption rejects and the property does not keep,
+    # turned into a trace of the whole system (None when the premise holds). The assumptions are the exact
+    # weakest ones, so every component has a violating run over the trace that can be interleaved with the others
+    def successor(state, symbol):
+        return tuple(step(dfa, q, symbol) for dfa, q in zip(automata, state))
+
+    automata = list(assumptions) + [property_dfa]
+    alphabet = sorted(set().union(*(teacher.interface for teacher in teachers)))
+    trace, explored = shortest_trace(tuple(dfa.start_state for dfa in automata), alphabet, successor,
+                                     lambda state: not any(q in dfa.accept_states for dfa, q in zip(automata, state)))
+    if trace is None:
+        return None, explored
+    return interleave(trace, [(teacher.witness(project(trace, teacher.interface)), teacher.interface)
+                              for teacher in teachers]), explored
+
+
+def interleave(word, runs):
+    # Trace with projection word into which every (trace, alphabet) run inserts its symbols outside its alphabet -
+    # each run agrees with the word on its alphabet, and symbols outside it belong to that run alone
+    runs = [(segments(trace, alphabet), alphabet) for trace, alphabet in runs]
+    positions = [0] * len(runs)
+    merged = []
+    for symbol in word:
+        for i, (run_segments, alphabet) in enumerate(runs):
+            if symbol in alphabet:
+                merged.append(run_segments[positions[i]])
+                positions[i] += 1
+        merged.append(symbol)
+    merged.extend(run_segments[position] for (run_segments, _), position in zip(runs, positions))
+    return ''.join(merged)
+
+def segments(trace, interface):
+    # Runs of non-interface symbols before each interface symbol of a trace, and after the last one
+    runs = ['']
+    for symbol in trace:
+        if symbol in interface:
+            runs.append('')
+        else:
+            runs[-1] += symbol
+    return runs